@@ -0,0 +1,7 @@
+"""
+Benchmark suite of drevalpy.
+
+The benchmarks time the hot paths (CV splitting, feature lookup, reduce_to, evaluation, parsing of results and training
+and prediction of every model) on synthetic data of configurable scale, see synthetic.py. Run them from the repository
+root with ``python -m benchmarks.run_benchmarks --help``.
+"""
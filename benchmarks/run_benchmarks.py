@@ -0,0 +1,371 @@
+"""
+Times the hot paths of drevalpy on synthetic data and saves the timings as JSON.
+
+Usage, from the repository root::
+
+    python -m benchmarks.run_benchmarks --scale small --output benchmark_results.json
+    python -m benchmarks.run_benchmarks --scale gdsc --models ElasticNet SRMF --repeats 5
+
+Every benchmark is repeated and reported with its minimum, mean and all wall times in seconds. The JSON also contains
+the git commit, the package versions and the data scale, so results of different commits can be compared offline.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess  # noqa: S404
+import tempfile
+import time
+import traceback
+from collections.abc import Callable
+from datetime import datetime, timezone
+from importlib.metadata import PackageNotFoundError, version
+from typing import Any, Optional
+
+import numpy as np
+
+from drevalpy.datasets.dataset import DrugResponseDataset
+from drevalpy.evaluation import AVAILABLE_METRICS, evaluate
+from drevalpy.experiment import get_datasets_from_cv_split, prepare_training
+from drevalpy.models import MODEL_FACTORY, SINGLE_DRUG_MODEL_FACTORY
+from drevalpy.tracing import peak_rss_bytes
+from drevalpy.utils import get_response_transformation
+from drevalpy.visualization.utils import parse_results
+
+from .synthetic import SCALES, SyntheticData, generate_synthetic_data
+
+TEST_MODES = ["LPO", "LCO", "LDO"]
+# maximum number of rows fetched by the get_feature_matrix benchmark, roughly one batch of test pairs
+MAX_FEATURE_ROWS = 100000
+# some models have hyperparameters per dataset, e.g., variance thresholds. The synthetic data uses the values of:
+REFERENCE_DATASET = "GDSC1"
+
+
+def time_call(
+    func: Callable[..., Any], repeats: int, setup: Optional[Callable[[], tuple]] = None, quiet: bool = True
+) -> dict[str, Any]:
+    """
+    Times a function.
+
+    :param func: function to time
+    :param repeats: number of repetitions
+    :param setup: optional function returning the arguments of func. It is called before every repetition and not
+        timed, e.g., to copy a dataset that func modifies in place.
+    :param quiet: if True, the output of func is suppressed
+    :returns: minimum, mean and all wall times in seconds
+    """
+    times = []
+    for _ in range(repeats):
+        args = setup() if setup is not None else ()
+        with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+            start = time.perf_counter()
+            func(*args)
+            times.append(time.perf_counter() - start)
+    return {"min_s": min(times), "mean_s": float(np.mean(times)), "times_s": times}
+
+
+def benchmark_datasets(data: SyntheticData, repeats: int, n_cv_splits: int) -> dict[str, dict[str, Any]]:
+    """
+    Benchmarks the dataset operations: CV splitting, feature lookup and reduce_to.
+
+    :param data: synthetic data
+    :param repeats: number of repetitions
+    :param n_cv_splits: number of cross-validation splits
+    :returns: timings per benchmark
+    """
+    results = {}
+    for mode in TEST_MODES:
+        results[f"split_dataset_{mode}"] = time_call(
+            lambda dataset, mode=mode: dataset.split_dataset(n_cv_splits=n_cv_splits, mode=mode),
+            repeats,
+            setup=lambda: (data.response.copy(),),
+        )
+
+    cell_line_features = data.cell_line_features()
+    drug_features = data.drug_features()
+    n_rows = min(len(data.response), MAX_FEATURE_ROWS)
+    results["get_feature_matrix_gene_expression"] = time_call(
+        lambda: cell_line_features.get_feature_matrix("gene_expression", data.response.cell_line_ids[:n_rows]),
+        repeats,
+    )
+    results["get_feature_matrix_fingerprints"] = time_call(
+        lambda: drug_features.get_feature_matrix("fingerprints", data.response.drug_ids[:n_rows]), repeats
+    )
+    results["get_feature_matrix_gene_expression"]["n_rows"] = n_rows
+    results["get_feature_matrix_fingerprints"]["n_rows"] = n_rows
+
+    # keep 90% of the cell lines and drugs, like the removal of entities without features before training
+    cell_lines_to_keep = data.cell_line_ids[: int(0.9 * len(data.cell_line_ids))]
+    drugs_to_keep = data.drug_ids[: int(0.9 * len(data.drug_ids))]
+    results["reduce_to"] = time_call(
+        lambda dataset: dataset.reduce_to(cell_line_ids=cell_lines_to_keep, drug_ids=drugs_to_keep),
+        repeats,
+        setup=lambda: (data.response.copy(),),
+    )
+    return results
+
+
+def _with_predictions(response: DrugResponseDataset, random_state: int = 0) -> DrugResponseDataset:
+    """
+    Returns a copy of the response data with noisy predictions.
+
+    :param response: response data
+    :param random_state: random state of the noise
+    :returns: dataset with predictions
+    """
+    rng = np.random.default_rng(random_state)
+    return DrugResponseDataset(
+        response=response.response,
+        cell_line_ids=response.cell_line_ids,
+        drug_ids=response.drug_ids,
+        predictions=response.response + rng.normal(scale=1.0, size=len(response)),
+        dataset_name=response.dataset_name,
+    )
+
+
+def benchmark_evaluation(data: SyntheticData, repeats: int, n_cv_splits: int, path_results: str) -> dict[str, Any]:
+    """
+    Benchmarks the evaluation: all metrics, the partial correlation alone and parsing of result files.
+
+    :param data: synthetic data
+    :param repeats: number of repetitions
+    :param n_cv_splits: number of prediction files for parse_results
+    :param path_results: directory the prediction files are written to
+    :returns: timings per benchmark
+    """
+    predicted = _with_predictions(data.response)
+    results = {
+        "evaluate_all_metrics": time_call(lambda: evaluate(predicted, list(AVAILABLE_METRICS)), repeats),
+        "evaluate_partial_correlation": time_call(lambda: evaluate(predicted, "Partial_Correlation"), repeats),
+    }
+
+    prediction_dir = os.path.join(path_results, "LPO", "NaivePredictor", "predictions")
+    os.makedirs(prediction_dir, exist_ok=True)
+    for split_index in range(n_cv_splits):
+        _with_predictions(data.response, random_state=split_index).save(
+            os.path.join(prediction_dir, f"predictions_split_{split_index}.csv")
+        )
+    # without the evaluation cache, every repeat evaluates all files instead of loading the cached evaluations
+    results["parse_results"] = time_call(lambda: parse_results(path_results, use_cache=False), repeats)
+    results["parse_results"]["n_files"] = n_cv_splits
+    return results
+
+
+def benchmark_model(
+    model_name: str, data: SyntheticData, split: dict[str, DrugResponseDataset], path_data: str, repeats: int
+) -> dict[str, Any]:
+    """
+    Benchmarks loading the features, training and predicting of a model with its first hyperparameter configuration.
+
+    Single drug models are trained on the drug with the most responses.
+
+    :param model_name: name of the model in MODEL_FACTORY
+    :param data: synthetic data, written to path_data
+    :param split: one CV split of the response data
+    :param path_data: data directory
+    :param repeats: number of repetitions
+    :returns: timings of "load and prepare", "train" and "predict"
+    """
+    model_class = MODEL_FACTORY[model_name]
+    drug_id = None
+    if model_name in SINGLE_DRUG_MODEL_FACTORY:
+        drugs, counts = np.unique(split["train"].drug_ids, return_counts=True)
+        drug_id = drugs[np.argmax(counts)]
+    hyperparameters = {
+        key: (
+            {**value, data.dataset_name: value[REFERENCE_DATASET]}
+            if isinstance(value, dict) and REFERENCE_DATASET in value
+            else value
+        )
+        for key, value in model_class.get_hyperparameter_set()[0].items()
+    }
+    response_transformation = get_response_transformation("standard")
+    results: dict[str, Any] = {"hyperparameters": {key: str(value) for key, value in hyperparameters.items()}}
+    if drug_id is not None:
+        results["drug"] = str(drug_id)
+
+    timings: dict[str, list[float]] = {"load and prepare": [], "train": [], "predict": []}
+    for _ in range(repeats):
+        # the datasets are reduced and transformed in place
+        train_dataset, _, early_stopping_dataset, test_dataset = get_datasets_from_cv_split(
+            {name: dataset.copy() for name, dataset in split.items()}, model_class, model_name, drug_id
+        )
+        model = model_class()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            model.build_model(hyperparameters=hyperparameters)
+            cl_features, drug_features = prepare_training(
+                model=model,
+                path_data=path_data,
+                train_dataset=train_dataset,
+                prediction_dataset=test_dataset,
+                early_stopping_dataset=early_stopping_dataset,
+                response_transformation=response_transformation,
+            )
+            timings["load and prepare"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            model.train(
+                output=train_dataset,
+                cell_line_input=cl_features,
+                drug_input=drug_features,
+                output_earlystopping=early_stopping_dataset,
+            )
+            timings["train"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            model.predict(
+                cell_line_ids=test_dataset.cell_line_ids,
+                drug_ids=test_dataset.drug_ids,
+                cell_line_input=cl_features,
+                drug_input=drug_features,
+            )
+            timings["predict"].append(time.perf_counter() - start)
+    for stage, times in timings.items():
+        results[stage] = {"min_s": min(times), "mean_s": float(np.mean(times)), "times_s": times}
+    results["n_train"] = len(train_dataset)
+    results["n_test"] = len(test_dataset)
+    return results
+
+
+def benchmark_models(
+    model_names: list[str], data: SyntheticData, path_data: str, repeats: int, n_cv_splits: int
+) -> dict[str, dict[str, Any]]:
+    """
+    Benchmarks the models on the first LPO split. Errors are recorded instead of aborting the other benchmarks.
+
+    :param model_names: names of the models in MODEL_FACTORY
+    :param data: synthetic data
+    :param path_data: data directory the synthetic data is written to
+    :param repeats: number of repetitions
+    :param n_cv_splits: number of cross-validation splits, determines the size of the training set
+    :returns: timings per model
+    """
+    data.write(path_data)
+    split = data.response.copy().split_dataset(n_cv_splits=n_cv_splits, mode="LPO")[0]
+    results = {}
+    for model_name in model_names:
+        print(f"Benchmarking {model_name} ...")
+        try:
+            results[model_name] = benchmark_model(model_name, data, split, path_data, repeats)
+        except Exception as e:  # noqa: B902
+            traceback.print_exc()
+            results[model_name] = {"error": f"{type(e).__name__}: {e}"}
+    return results
+
+
+def get_metadata(args: argparse.Namespace) -> dict[str, Any]:
+    """
+    Collects the information needed to compare benchmark results across commits and machines.
+
+    :param args: command line arguments
+    :returns: git commit, timestamp, python, platform and package versions, data scale and arguments
+    """
+    try:
+        commit: Optional[str] = subprocess.run(  # noqa: S603, S607
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    versions = {}
+    for package in ["drevalpy", "numpy", "pandas", "scikit-learn", "scipy", "torch"]:
+        try:
+            versions[package] = version(package)
+        except PackageNotFoundError:
+            versions[package] = None
+    return {
+        "git_commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": versions,
+        "scale": {**SCALES[args.scale], "name": args.scale},
+        "arguments": vars(args),
+    }
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """
+    Returns the argument parser of the benchmark suite.
+
+    :returns: argument parser
+    """
+    parser = argparse.ArgumentParser(description="Benchmark drevalpy on synthetic data.")
+    parser.add_argument("--scale", type=str, default="small", choices=list(SCALES), help="Size of the synthetic data.")
+    parser.add_argument("--repeats", type=int, default=3, help="Number of repetitions of every benchmark.")
+    parser.add_argument("--n_cv_splits", type=int, default=5, help="Number of cross-validation splits.")
+    parser.add_argument(
+        "--models",
+        nargs="+",
+        default=list(MODEL_FACTORY),
+        help="Models to benchmark, all models of MODEL_FACTORY by default. Pass none to skip the models.",
+    )
+    parser.add_argument(
+        "--path_data",
+        type=str,
+        default=None,
+        help="Directory the synthetic data is written to. A temporary directory is used by default.",
+    )
+    parser.add_argument("--output", type=str, default="benchmark_results.json", help="Path of the JSON output.")
+    parser.add_argument("--random_state", type=int, default=42, help="Random state of the synthetic data.")
+    return parser
+
+
+def main(args: argparse.Namespace) -> dict[str, Any]:
+    """
+    Runs all benchmarks and saves the results.
+
+    :param args: command line arguments, see get_parser
+    :returns: metadata and timings per benchmark
+    :raises ValueError: if a model is not in MODEL_FACTORY
+    """
+    model_names = [] if args.models == ["none"] else args.models
+    for model_name in model_names:
+        if model_name not in MODEL_FACTORY:
+            raise ValueError(f"Invalid model name {model_name}. Available models are {list(MODEL_FACTORY)}.")
+
+    start = time.perf_counter()
+    data = generate_synthetic_data(args.scale, random_state=args.random_state)
+    generation_time = time.perf_counter() - start
+    print(f"Generated {len(data.response)} responses in {generation_time:.1f}s.")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path_data = args.path_data if args.path_data is not None else os.path.join(tmp_dir, "data")
+        results: dict[str, Any] = {"generate_synthetic_data": {"min_s": generation_time}}
+        print("Benchmarking datasets ...")
+        results.update(benchmark_datasets(data, args.repeats, args.n_cv_splits))
+        print("Benchmarking evaluation ...")
+        results.update(benchmark_evaluation(data, args.repeats, args.n_cv_splits, os.path.join(tmp_dir, "results")))
+        models = benchmark_models(model_names, data, path_data, args.repeats, args.n_cv_splits)
+
+    output = {
+        "metadata": get_metadata(args),
+        "results": results,
+        "models": models,
+        "peak_rss_mb": (peak_rss_bytes() or float("nan")) / 2**20,
+    }
+    output_dir = os.path.dirname(os.path.abspath(args.output))
+    os.makedirs(output_dir, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=2)
+    print(f"Saved benchmark results to {args.output}")
+    for name, timing in results.items():
+        print(f"{name:<40} {timing['min_s']:>10.4f}s")
+    for model_name, timing in models.items():
+        if "error" in timing:
+            print(f"{model_name:<40} {timing['error']}")
+        else:
+            print(f"{model_name:<40} train {timing['train']['min_s']:.4f}s, predict {timing['predict']['min_s']:.4f}s")
+    return output
+
+
+if __name__ == "__main__":
+    main(get_parser().parse_args())
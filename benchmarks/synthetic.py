@@ -0,0 +1,189 @@
+"""
+Generator for synthetic drug response data at configurable scale.
+
+The generated response data and features have the layout of the real datasets: responses are a
+DrugResponseDataset, cell line features and drug fingerprints are FeatureDatasets, and SyntheticData.write stores
+everything in the data directory layout the models load their features from (e.g., data/Synthetic/gene_expression.csv).
+The response is a noisy sum of a cell line effect driven by the gene expression and a drug effect, so models have
+something to learn.
+"""
+
+import os
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from drevalpy.datasets.dataset import DrugResponseDataset, FeatureDataset
+
+# number of cell lines, drugs, genes and fingerprint bits, the largest one is approximately GDSC scale
+SCALES: dict[str, dict[str, int]] = {
+    "tiny": {"n_cell_lines": 80, "n_drugs": 60, "n_genes": 200, "n_fingerprint_bits": 128},
+    "small": {"n_cell_lines": 200, "n_drugs": 60, "n_genes": 2000, "n_fingerprint_bits": 128},
+    "medium": {"n_cell_lines": 500, "n_drugs": 150, "n_genes": 10000, "n_fingerprint_bits": 128},
+    "gdsc": {"n_cell_lines": 1000, "n_drugs": 300, "n_genes": 20000, "n_fingerprint_bits": 128},
+}
+# sizes of the gene lists, like the ~1000 landmark genes of the real datasets
+N_LANDMARK_GENES = 978
+N_DRUG_TARGET_GENES = 500
+N_DIPK_GENES = 1000
+DIPK_PPI_DIMENSION = 512
+DIPK_MOLGNET_DIMENSION = 768
+
+
+class SyntheticData:
+    """Synthetic response data, cell line features and drug features of one dataset."""
+
+    def __init__(
+        self,
+        n_cell_lines: int,
+        n_drugs: int,
+        n_genes: int,
+        n_fingerprint_bits: int = 128,
+        missing_fraction: float = 0.1,
+        dataset_name: str = "Synthetic",
+        random_state: int = 42,
+    ):
+        """
+        Generates the data.
+
+        :param n_cell_lines: number of cell lines
+        :param n_drugs: number of drugs
+        :param n_genes: number of genes of the omics features
+        :param n_fingerprint_bits: length of the drug fingerprints
+        :param missing_fraction: fraction of cell line-drug pairs without a measured response
+        :param dataset_name: name of the dataset, also the name of its data directory
+        :param random_state: random state
+        :raises ValueError: if missing_fraction is not in [0, 1)
+        """
+        if not 0 <= missing_fraction < 1:
+            raise ValueError("missing_fraction must be in [0, 1).")
+        rng = np.random.default_rng(random_state)
+        self.dataset_name = dataset_name
+        self.cell_line_ids = np.array([f"CL-{i}" for i in range(n_cell_lines)])
+        self.cellosaurus_ids = np.array([f"CVCL_{i:04d}" for i in range(n_cell_lines)])
+        self.drug_ids = np.array([f"Drug-{i}" for i in range(n_drugs)])
+        self.genes = np.array([f"GENE{i}" for i in range(n_genes)])
+
+        self.gene_expression = rng.lognormal(mean=1.0, sigma=0.5, size=(n_cell_lines, n_genes)).astype(np.float32)
+        self.methylation = rng.random((n_cell_lines, n_genes), dtype=np.float32)
+        self.mutations = rng.random((n_cell_lines, n_genes)) < 0.05
+        self.copy_number_variation_gistic = rng.integers(-2, 3, size=(n_cell_lines, n_genes)).astype(np.float32)
+        self.fingerprints = rng.integers(0, 2, size=(n_drugs, n_fingerprint_bits)).astype(np.float32)
+
+        gene_weights = rng.normal(size=min(n_genes, 50))
+        cell_line_effect = np.log(self.gene_expression[:, : len(gene_weights)]) @ gene_weights
+        cell_line_effect = (cell_line_effect - cell_line_effect.mean()) / (cell_line_effect.std() + 1e-12)
+        drug_effect = rng.normal(scale=2.0, size=n_drugs)
+        response = (
+            cell_line_effect[:, None] + drug_effect[None, :] + rng.normal(scale=0.5, size=(n_cell_lines, n_drugs))
+        )
+        measured = rng.random((n_cell_lines, n_drugs)) >= missing_fraction
+        cell_line_index, drug_index = np.nonzero(measured)
+        self.response = DrugResponseDataset(
+            response=response[cell_line_index, drug_index],
+            cell_line_ids=self.cell_line_ids[cell_line_index],
+            drug_ids=self.drug_ids[drug_index],
+            dataset_name=dataset_name,
+        )
+        self._rng = rng
+
+    @property
+    def landmark_genes(self) -> np.ndarray:
+        """
+        Returns the landmark genes, a subset of the genes.
+
+        :returns: landmark gene names
+        """
+        return self.genes[:N_LANDMARK_GENES]
+
+    @property
+    def drug_target_genes(self) -> np.ndarray:
+        """
+        Returns the drug target genes, a subset of the genes overlapping the landmark genes.
+
+        :returns: drug target gene names
+        """
+        start = N_LANDMARK_GENES // 2
+        return self.genes[slice(start, start + N_DRUG_TARGET_GENES)]
+
+    def cell_line_features(self) -> FeatureDataset:
+        """
+        Returns the cell line omics features.
+
+        :returns: FeatureDataset with the views gene_expression, methylation, mutations and
+            copy_number_variation_gistic
+        """
+        views = ["gene_expression", "methylation", "mutations", "copy_number_variation_gistic"]
+        return FeatureDataset.from_matrices(
+            identifiers=self.cell_line_ids,
+            views={view: np.asarray(getattr(self, view), dtype=np.float32) for view in views},
+            meta_info={view: self.genes for view in views},
+        )
+
+    def drug_features(self) -> FeatureDataset:
+        """
+        Returns the drug fingerprints.
+
+        :returns: FeatureDataset with the view fingerprints
+        """
+        return FeatureDataset.from_matrices(identifiers=self.drug_ids, views={"fingerprints": self.fingerprints})
+
+    def write(self, path_data: str) -> str:
+        """
+        Writes the data in the layout of the real datasets, so the models can load their features from it.
+
+        :param path_data: data directory, e.g., data/. The files are written to path_data/dataset_name.
+        :returns: path of the dataset directory
+        """
+        path = os.path.join(path_data, self.dataset_name)
+        os.makedirs(os.path.join(path, "gene_lists"), exist_ok=True)
+        os.makedirs(os.path.join(path, "drug_fingerprints"), exist_ok=True)
+        os.makedirs(os.path.join(path, "DIPK_features", "Drugs"), exist_ok=True)
+
+        self.response.save(os.path.join(path, f"{self.dataset_name}.csv"))
+        for view in ["gene_expression", "methylation", "mutations", "copy_number_variation_gistic"]:
+            omics = pd.DataFrame(getattr(self, view), columns=self.genes)
+            omics.insert(0, "cell_line_name", self.cell_line_ids)
+            omics.insert(0, "cellosaurus_id", self.cellosaurus_ids)
+            omics.to_csv(os.path.join(path, f"{view}.csv"), index=False)
+        pd.DataFrame({"cellosaurus_id": self.cellosaurus_ids, "cell_line_name": self.cell_line_ids}).to_csv(
+            os.path.join(path, "cell_line_names.csv"), index=False
+        )
+        pd.DataFrame({"drug_name": self.drug_ids}).to_csv(os.path.join(path, "drug_names.csv"), index=False)
+        pd.DataFrame(self.fingerprints.T.astype(int), columns=self.drug_ids).to_csv(
+            os.path.join(path, "drug_fingerprints", "drug_name_to_demorgan_128_map.csv")
+        )
+        pd.DataFrame({"Symbol": self.landmark_genes}).to_csv(
+            os.path.join(path, "gene_lists", "landmark_genes.csv"), index=False
+        )
+        pd.DataFrame({"Symbol": self.drug_target_genes}).to_csv(
+            os.path.join(path, "gene_lists", "drug_target_genes_all_drugs.csv"), index=False
+        )
+
+        dipk_genes = self.genes[:N_DIPK_GENES]
+        with open(os.path.join(path, "DIPK_features", "gene_list_sel.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(dipk_genes))
+        pd.DataFrame(self._rng.normal(size=(len(dipk_genes), DIPK_PPI_DIMENSION)), index=dipk_genes).to_csv(
+            os.path.join(path, "DIPK_features", "human_ppi_features.tsv"), sep="\t"
+        )
+        for drug_id in self.drug_ids:
+            n_atoms = int(self._rng.integers(5, 40))
+            pd.DataFrame(self._rng.normal(size=(n_atoms, DIPK_MOLGNET_DIMENSION))).to_csv(
+                os.path.join(path, "DIPK_features", "Drugs", f"MolGNet_{drug_id}.csv"), sep="\t"
+            )
+        return path
+
+
+def generate_synthetic_data(scale: str = "small", **kwargs: Any) -> SyntheticData:
+    """
+    Generates synthetic data of one of the predefined scales.
+
+    :param scale: one of SCALES, e.g., "gdsc" for 1000 cell lines x 300 drugs, 20000 genes and 128 bit fingerprints
+    :param kwargs: further arguments of SyntheticData, they overwrite the sizes of the scale
+    :returns: synthetic data
+    :raises ValueError: if the scale is unknown
+    """
+    if scale not in SCALES:
+        raise ValueError(f"Invalid scale {scale}. Available scales are {list(SCALES)}.")
+    return SyntheticData(**{**SCALES[scale], **kwargs})
@@ -5,6 +5,7 @@ import os
 
 import pandas as pd
 
+from drevalpy.datasets.utils import RESULT_FORMATS
 from drevalpy.visualization import (
     CorrelationComparisonScatter,
     CriticalDifferencePlot,
@@ -267,6 +268,22 @@ def draw_per_grouping_algorithm_plots(
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Generate reports from evaluation results")
     parser.add_argument("--run_id", required=True, help="Run ID for the current execution")
+    parser.add_argument(
+        "--n_jobs", type=int, default=1, help="Number of result files to evaluate in parallel. Default is 1."
+    )
+    parser.add_argument(
+        "--no_cache",
+        action="store_true",
+        default=False,
+        help="Evaluate all result files again instead of reusing the evaluations cached in results/<run_id>/.cache.",
+    )
+    parser.add_argument(
+        "--result_format",
+        type=str,
+        default="csv",
+        choices=list(RESULT_FORMATS),
+        help="File format of the evaluation result tables, e.g., true_vs_pred.csv. Default is csv.",
+    )
     args = parser.parse_args()
     run_id = args.run_id
 
@@ -280,7 +297,7 @@ if __name__ == "__main__":
         evaluation_results_per_drug,
         evaluation_results_per_cell_line,
         true_vs_pred,
-    ) = parse_results(path_to_results=f"results/{run_id}")
+    ) = parse_results(path_to_results=f"results/{run_id}", n_jobs=args.n_jobs, use_cache=not args.no_cache)
 
     # part of pipeline: EVALUATE_FINAL, COLLECT_RESULTS
     (
@@ -301,6 +318,7 @@ if __name__ == "__main__":
         eval_results_per_drug=evaluation_results_per_drug,
         eval_results_per_cl=evaluation_results_per_cell_line,
         t_vs_p=true_vs_pred,
+        result_format=args.result_format,
     )
     """
     For debugging:
@@ -16,6 +16,7 @@ The FeatureDataset class can be used to randomize feature vectors.
 import copy
 import os
 from abc import ABC, abstractmethod
+from collections.abc import Iterator, MutableMapping
 from pathlib import Path
 from typing import Any, Callable
 
@@ -23,13 +24,16 @@ import networkx as nx
 import numpy as np
 import pandas as pd
 from sklearn.base import TransformerMixin
-from sklearn.model_selection import GroupKFold, train_test_split
+from sklearn.model_selection import train_test_split
 
 from ..pipeline_function import pipeline_function
-from .utils import permute_features, randomize_graph
+from .utils import is_result_file, randomize_graph, randomize_graphs, read_table, result_file_suffix, write_table
 
 np.set_printoptions(threshold=6)
 
+# row arrays of a DrugResponseDataset. Lazy subsets gather them from the dataset they were created from.
+_ROW_ATTRIBUTES = ("_response", "_cell_line_codes", "_drug_codes", "_predictions")
+
 
 class Dataset(ABC):
     """Abstract wrapper class for datasets."""
@@ -55,12 +59,27 @@ class Dataset(ABC):
 
 
 class DrugResponseDataset(Dataset):
-    """Drug response dataset."""
+    """
+    Drug response dataset.
+
+    The cell line and drug IDs are stored as integer codes into vocabularies of the unique IDs, like a pandas
+    Categorical. Masking, shuffling, splitting, reduce_to and hashing only touch the integer codes, and datasets
+    derived from each other share their vocabularies. The vocabularies are read-only and may contain IDs which are no
+    longer in the dataset, e.g., after reduce_to. The cell_line_ids and drug_ids properties decode the codes on demand.
+
+    Subsets, e.g., the datasets of the cross-validation folds and copies, are lazy: they only store the indices of
+    their rows in the row arrays of the dataset they were created from. Reading them, masking, shuffling and further
+    subsets only compute indices. The rows are copied (materialized) when the subset is changed otherwise, e.g., by
+    add_rows, transform or assigning predictions. Since the row arrays are never changed in place, changes of one
+    dataset never affect the others.
+    """
 
     _response: np.ndarray
-    _cell_line_ids: np.ndarray
-    _drug_ids: np.ndarray
-    _predictions: np.ndarray | None = None
+    _cell_line_codes: np.ndarray
+    _cell_line_vocabulary: np.ndarray
+    _drug_codes: np.ndarray
+    _drug_vocabulary: np.ndarray
+    _predictions: np.ndarray | None
     _cv_splits: list[dict[str, "DrugResponseDataset"]] = []
     _name: str
 
@@ -74,7 +93,8 @@ class DrugResponseDataset(Dataset):
         """
         Load a dataset from a csv file.
 
-        This function creates a DrugResponseDataset from a provided input file in csv format.
+        This function creates a DrugResponseDataset from a provided input file in csv format. Parquet and Feather files
+        written by save are read as well, the format is given by the file suffix.
         The following columns are required:
         - response:         the drug response values as floating point values
         - cell_line_ids:    a string identifier for cell lines
@@ -87,7 +107,7 @@ class DrugResponseDataset(Dataset):
 
         :returns: DrugResponseDataset object containing data from provided csv file.
         """
-        data = pd.read_csv(input_file)
+        data = read_table(input_file)
         if "predictions" in data.columns:
             predictions = data["predictions"].values
         else:
@@ -107,25 +127,25 @@ class DrugResponseDataset(Dataset):
 
         :returns: numpy array containing response values.
         """
-        return self._response
+        return self._rows("_response")
 
     @property
     def cell_line_ids(self) -> np.ndarray:
         """
-        Returns the cell_line_ids.
+        Returns the cell_line_ids. They are decoded from the integer codes, so the array is a new array on every call.
 
         :returns: numpy array containing cell_line_ids values.
         """
-        return self._cell_line_ids
+        return self._cell_line_vocabulary[self._rows("_cell_line_codes")]
 
     @property
     def drug_ids(self) -> np.ndarray:
         """
-        Returns the drug_ids.
+        Returns the drug_ids. They are decoded from the integer codes, so the array is a new array on every call.
 
         :returns: numpy array containing drug_ids values.
         """
-        return self._drug_ids
+        return self._drug_vocabulary[self._rows("_drug_codes")]
 
     @property
     def predictions(self) -> np.ndarray | None:
@@ -134,7 +154,7 @@ class DrugResponseDataset(Dataset):
 
         :returns: numpy array containing prediction values or None.
         """
-        return self._predictions
+        return self._rows("_predictions")
 
     @property
     def cv_splits(self) -> list[dict[str, "DrugResponseDataset"]]:
@@ -182,18 +202,186 @@ class DrugResponseDataset(Dataset):
         if predictions is not None and len(response) != len(predictions):
             raise AssertionError("Response and predictions have different lengths.")
         self._response = response
-        self._cell_line_ids = cell_line_ids
-        self._drug_ids = drug_ids
+        self._cell_line_vocabulary, self._cell_line_codes = _encode_ids(cell_line_ids)
+        self._drug_vocabulary, self._drug_codes = _encode_ids(drug_ids)
         self._predictions = predictions
         self._name = dataset_name
 
+    @classmethod
+    def _from_codes(
+        cls,
+        response: np.ndarray,
+        cell_line_codes: np.ndarray,
+        cell_line_vocabulary: np.ndarray,
+        drug_codes: np.ndarray,
+        drug_vocabulary: np.ndarray,
+        predictions: np.ndarray | None = None,
+        dataset_name: str = "unnamed",
+    ) -> "DrugResponseDataset":
+        """
+        Creates a dataset from encoded IDs without encoding them again, e.g., for subsets of a dataset.
+
+        :param response: drug response values per cell line and drug
+        :param cell_line_codes: indices of the cell line IDs in cell_line_vocabulary
+        :param cell_line_vocabulary: read-only array of cell line IDs
+        :param drug_codes: indices of the drug IDs in drug_vocabulary
+        :param drug_vocabulary: read-only array of drug IDs
+        :param predictions: optional. Predicted drug response values per cell line and drug
+        :param dataset_name: optional. Name of the dataset, default: "unnamed"
+        :returns: DrugResponseDataset sharing the vocabularies
+        """
+        dataset = cls.__new__(cls)
+        dataset._response = response
+        dataset._cell_line_codes = cell_line_codes
+        dataset._cell_line_vocabulary = cell_line_vocabulary
+        dataset._drug_codes = drug_codes
+        dataset._drug_vocabulary = drug_vocabulary
+        dataset._predictions = predictions
+        dataset._name = dataset_name
+        return dataset
+
+    def _subset(self, indices: np.ndarray) -> "DrugResponseDataset":
+        """
+        Returns the rows at the given indices as a lazy subset sharing the rows and vocabularies of this dataset.
+
+        The subset only stores the row indices, see the class documentation. Subsets of lazy subsets index the rows of
+        the original dataset directly.
+
+        :param indices: row indices or boolean mask
+        :returns: new DrugResponseDataset
+        """
+        indices = np.asarray(indices)
+        if indices.dtype == bool:
+            indices = np.flatnonzero(indices)
+        state = self.__dict__
+        if "_view_indices" in state:
+            rows = state["_view_rows"]
+            indices = state["_view_indices"][indices]
+        else:
+            rows = {name: state[name] for name in _ROW_ATTRIBUTES}
+        subset = DrugResponseDataset.__new__(DrugResponseDataset)
+        subset.__dict__.update(
+            {
+                "_view_indices": indices.astype(np.int32 if len(rows["_response"]) < 2**31 else np.int64),
+                "_view_rows": rows,
+                "_cell_line_vocabulary": self._cell_line_vocabulary,
+                "_drug_vocabulary": self._drug_vocabulary,
+                "_name": self._name,
+            }
+        )
+        return subset
+
+    def _rows(self, name: str) -> np.ndarray | None:
+        """
+        Returns a row array without materializing lazy subsets.
+
+        :param name: name of the row array, one of _ROW_ATTRIBUTES
+        :returns: row array, for lazy subsets a new array gathered from the rows of the original dataset
+        """
+        state = self.__dict__
+        if "_view_indices" not in state:
+            return state[name]
+        array = state["_view_rows"][name]
+        return None if array is None else array[state["_view_indices"]]
+
+    def _materialize(self) -> None:
+        """Copies the rows of a lazy subset, so it can be changed independently of the dataset it was created from."""
+        state = self.__dict__
+        indices = state.pop("_view_indices")
+        rows = state.pop("_view_rows")
+        for name, array in rows.items():
+            state[name] = None if array is None else array[indices]
+
+    def __getattr__(self, name: str) -> Any:
+        """
+        Materializes a lazy subset when one of its row arrays is accessed directly, e.g., by add_rows.
+
+        Only called for attributes which are not set, i.e., the row arrays of lazy subsets.
+
+        :param name: attribute name
+        :returns: attribute value
+        :raises AttributeError: if the attribute does not exist
+        """
+        state = self.__dict__
+        if name in _ROW_ATTRIBUTES and "_view_indices" in state:
+            self._materialize()
+            return state[name]
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        """
+        Materializes a lazy subset before one of its row arrays is replaced, e.g., by setting the predictions.
+
+        :param name: attribute name
+        :param value: attribute value
+        """
+        if name in _ROW_ATTRIBUTES and "_view_indices" in self.__dict__:
+            self._materialize()
+        super().__setattr__(name, value)
+
+    def __getstate__(self) -> dict[str, Any]:
+        """
+        Returns the state for pickling and deep copies. Lazy subsets only store their own rows.
+
+        :returns: state of the dataset
+        """
+        state = self.__dict__.copy()
+        if "_view_indices" in state:
+            indices = state.pop("_view_indices")
+            rows = state.pop("_view_rows")
+            state.update({name: None if array is None else array[indices] for name, array in rows.items()})
+        return state
+
+    def _select_rows(self, indices: np.ndarray) -> None:
+        """
+        Keeps only the rows at the given indices, in the given order. Lazy subsets stay lazy.
+
+        :param indices: row indices or boolean mask
+        """
+        state = self.__dict__
+        if "_view_indices" in state:
+            state["_view_indices"] = state["_view_indices"][indices]
+            return
+        self._response = self._response[indices]
+        self._cell_line_codes = self._cell_line_codes[indices]
+        self._drug_codes = self._drug_codes[indices]
+        if self._predictions is not None:
+            self._predictions = self._predictions[indices]
+
+    def factorize_ids(self, id_type: str) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the sorted unique cell line or drug IDs and the position of the ID of every row among them.
+
+        Gives the same result as np.unique(ids, return_inverse=True), but only the vocabulary is sorted, not the IDs of
+        all rows.
+
+        :param id_type: "cell_line" or "drug"
+        :returns: sorted unique IDs of the dataset and the index of the ID of every row into them
+        :raises ValueError: if id_type is not "cell_line" or "drug"
+        """
+        if id_type == "cell_line":
+            codes, vocabulary = self._rows("_cell_line_codes"), self._cell_line_vocabulary
+        elif id_type == "drug":
+            codes, vocabulary = self._rows("_drug_codes"), self._drug_vocabulary
+        else:
+            raise ValueError(f"Invalid id_type {id_type}. Choose from cell_line, drug.")
+        used = np.zeros(len(vocabulary), dtype=bool)
+        used[codes] = True
+        used_codes = np.flatnonzero(used)
+        order = np.argsort(vocabulary[used_codes], kind="stable")
+        position = np.empty(len(vocabulary), dtype=np.intp)
+        position[used_codes[order]] = np.arange(len(used_codes))
+        return vocabulary[used_codes[order]], position[codes]
+
     def __len__(self) -> int:
         """
         Overwrites the default length method.
 
         :returns: Number of samples in the dataset
         """
-        return len(self.response)
+        if "_view_indices" in self.__dict__:
+            return len(self.__dict__["_view_indices"])
+        return len(self._response)
 
     def __str__(self) -> str:
         """
@@ -230,9 +418,12 @@ class DrugResponseDataset(Dataset):
         """
         Stores the drug response dataset on disk.
 
+        The file format is given by the suffix of the path: .parquet and .feather store the ids as categoricals and the
+        values as float32, any other suffix stores a csv file.
+
         :param path: path to desired storage location
         """
-        self.to_dataframe().to_csv(path, index=False)
+        write_table(self.to_dataframe(), path)
 
     @pipeline_function
     def add_rows(self, other: "DrugResponseDataset") -> None:
@@ -242,8 +433,12 @@ class DrugResponseDataset(Dataset):
         :param other: other dataset
         """
         self._response = np.concatenate([self._response, other.response])
-        self._cell_line_ids = np.concatenate([self._cell_line_ids, other.cell_line_ids])
-        self._drug_ids = np.concatenate([self._drug_ids, other.drug_ids])
+        self._cell_line_vocabulary, self._cell_line_codes = _concatenate_codes(
+            self._cell_line_vocabulary, self._cell_line_codes, other._cell_line_vocabulary, other._cell_line_codes
+        )
+        self._drug_vocabulary, self._drug_codes = _concatenate_codes(
+            self._drug_vocabulary, self._drug_codes, other._drug_vocabulary, other._drug_codes
+        )
 
         if self.predictions is not None and other.predictions is not None:
             self._predictions = np.concatenate([self._predictions, other.predictions])
@@ -251,12 +446,7 @@ class DrugResponseDataset(Dataset):
     @pipeline_function
     def remove_nan_responses(self) -> None:
         """Removes rows with NaN values in the response."""
-        mask = np.isnan(self.response)
-        self._response = self.response[~mask]
-        self._cell_line_ids = self.cell_line_ids[~mask]
-        self._drug_ids = self.drug_ids[~mask]
-        if self.predictions is not None:
-            self._predictions = self.predictions[~mask]
+        self._select_rows(~np.isnan(self.response))
 
     @pipeline_function
     def shuffle(self, random_state: int = 42) -> None:
@@ -268,11 +458,7 @@ class DrugResponseDataset(Dataset):
         indices = np.arange(len(self))
         np.random.seed(random_state)
         np.random.shuffle(indices)
-        self._response = self.response[indices]
-        self._cell_line_ids = self.cell_line_ids[indices]
-        self._drug_ids = self.drug_ids[indices]
-        if self.predictions is not None:
-            self._predictions = self.predictions[indices]
+        self._select_rows(indices)
 
     def _remove_drugs(self, drugs_to_remove: str | list[str | int]) -> None:
         """
@@ -283,10 +469,8 @@ class DrugResponseDataset(Dataset):
         if isinstance(drugs_to_remove, str):
             drugs_to_remove = [drugs_to_remove]
 
-        mask = [drug not in drugs_to_remove for drug in self.drug_ids]
-        self._drug_ids = self.drug_ids[mask]
-        self._cell_line_ids = self.cell_line_ids[mask]
-        self._response = self.response[mask]
+        removed = np.isin(self._drug_vocabulary, np.asarray(drugs_to_remove, dtype=object))
+        self._select_rows(~removed[self._rows("_drug_codes")])
 
     def _remove_cell_lines(self, cell_lines_to_remove: str | list[str | int]) -> None:
         """
@@ -297,10 +481,8 @@ class DrugResponseDataset(Dataset):
         if isinstance(cell_lines_to_remove, str):
             cell_lines_to_remove = [cell_lines_to_remove]
 
-        mask = [cell_line not in cell_lines_to_remove for cell_line in self.cell_line_ids]
-        self._drug_ids = self.drug_ids[mask]
-        self._cell_line_ids = self.cell_line_ids[mask]
-        self._response = self.response[mask]
+        removed = np.isin(self._cell_line_vocabulary, np.asarray(cell_lines_to_remove, dtype=object))
+        self._select_rows(~removed[self._rows("_cell_line_codes")])
 
     def remove_rows(self, indices: np.ndarray) -> None:
         """
@@ -308,12 +490,9 @@ class DrugResponseDataset(Dataset):
 
         :param indices: indices of rows to remove
         """
-        indices = np.array(indices, dtype=int)
-        self._drug_ids = np.delete(self.drug_ids, indices)
-        self._cell_line_ids = np.delete(self.cell_line_ids, indices)
-        self._response = np.delete(self.response, indices)
-        if self.predictions is not None:
-            self._predictions = np.delete(self.predictions, indices)
+        keep = np.ones(len(self), dtype=bool)
+        keep[np.array(indices, dtype=int)] = False
+        self._select_rows(keep)
 
     def reduce_to(self, cell_line_ids: np.ndarray | None = None, drug_ids: np.ndarray | None = None) -> None:
         """
@@ -322,11 +501,14 @@ class DrugResponseDataset(Dataset):
         :param cell_line_ids: cell line IDs or None to keep all cell lines
         :param drug_ids: drug IDs or None to keep all cell lines
         """
+        keep = np.ones(len(self), dtype=bool)
         if drug_ids is not None:
-            self._remove_drugs(list(set(self.drug_ids) - set(drug_ids)))
-
+            keep &= np.isin(self._drug_vocabulary, np.asarray(drug_ids, dtype=object))[self._rows("_drug_codes")]
         if cell_line_ids is not None:
-            self._remove_cell_lines(list(set(self.cell_line_ids) - set(cell_line_ids)))
+            keep &= np.isin(self._cell_line_vocabulary, np.asarray(cell_line_ids, dtype=object))[
+                self._rows("_cell_line_codes")
+            ]
+        self._select_rows(keep)
 
     @pipeline_function
     def split_dataset(
@@ -351,20 +533,13 @@ class DrugResponseDataset(Dataset):
             Each fold is a dictionary with keys 'train', 'validation', 'test', 'validation_es', 'early_stopping'.
         :raises ValueError: if mode is not 'LPO', 'LCO', or 'LDO'
         """
-        cell_line_ids = self.cell_line_ids
-        drug_ids = self.drug_ids
-        response = self.response
-
         if mode == "LPO":
             cv_splits = _leave_pair_out_cv(
                 n_cv_splits,
-                response,
-                cell_line_ids,
-                drug_ids,
+                self,
                 split_validation,
                 validation_ratio,
                 random_state,
-                self.dataset_name,
             )
 
         elif mode in ["LCO", "LDO"]:
@@ -372,13 +547,10 @@ class DrugResponseDataset(Dataset):
             cv_splits = _leave_group_out_cv(
                 group=group,
                 n_cv_splits=n_cv_splits,
-                response=response,
-                cell_line_ids=cell_line_ids,
-                drug_ids=drug_ids,
+                dataset=self,
                 split_validation=split_validation,
                 validation_ratio=validation_ratio,
                 random_state=random_state,
-                dataset_name=self.dataset_name,
             )
         else:
             raise ValueError(f"Unknown split mode {mode!r}. Choose from 'LPO', 'LCO', 'LDO'.")
@@ -391,15 +563,17 @@ class DrugResponseDataset(Dataset):
         self._cv_splits = cv_splits
         return cv_splits
 
-    def save_splits(self, path: str):
+    def save_splits(self, path: str, result_format: str = "csv"):
         """
         Save cross validation splits to path/cv_split_0_train.csv and path/cv_split_0_test.csv.
 
         :param path: path to the directory where the cv split files are saved
+        :param result_format: file format of the splits, one of RESULT_FORMATS, e.g., "parquet"
         :raises AssertionError: if DrugResponseDataset was not split
         """
         if not self.cv_splits:
             raise AssertionError("Trying to save splits, but DrugResponseDataset was not split.")
+        suffix = result_file_suffix(result_format)
         os.makedirs(path, exist_ok=True)
         for i, split in enumerate(self.cv_splits):
 
@@ -411,18 +585,20 @@ class DrugResponseDataset(Dataset):
                 "early_stopping",
             ]:
                 if mode in split:
-                    split_path = os.path.join(path, f"cv_split_{i}_{mode}.csv")
+                    split_path = os.path.join(path, f"cv_split_{i}_{mode}{suffix}")
                     split[mode].save(path=split_path)
 
     def load_splits(self, path: str) -> None:
         """
         Load cross validation splits from path/cv_split_0_train.csv and path/cv_split_0_test.csv.
 
+        The splits can also be stored as Parquet or Feather files, see save_splits.
+
         :param path: path to the directory containing the cv split files
         :raises AssertionError: if no cv split files are found in path
         """
         files = os.listdir(path)
-        files = [file for file in files if (file.endswith(".csv") and file.startswith("cv_split"))]
+        files = [file for file in files if (is_result_file(file) and file.startswith("cv_split"))]
         if len(files) == 0:
             raise AssertionError(f"No cv split files found in {path}")
 
@@ -463,28 +639,34 @@ class DrugResponseDataset(Dataset):
     def copy(self):
         """Returns a copy of the drug response dataset.
 
+        The copy is a lazy subset with all rows: it shares the rows of this dataset until it is changed, see the class
+        documentation.
+
         :returns: copy of the dataset
         """
-        return DrugResponseDataset(
-            response=copy.deepcopy(self.response),
-            cell_line_ids=copy.deepcopy(self.cell_line_ids),
-            drug_ids=copy.deepcopy(self.drug_ids),
-            predictions=copy.deepcopy(self.predictions),
-            dataset_name=self.dataset_name,
-        )
+        return self._subset(np.arange(len(self)))
 
     def __hash__(self) -> int:
         """Overwrites default hash method.
 
         :returns: hash value of the dataset
         """
+        # hash the codes into the sorted unique IDs, they do not depend on the vocabularies
+        cell_lines, cell_line_codes = self.factorize_ids("cell_line")
+        drugs, drug_codes = self.factorize_ids("drug")
         return hash(
             (
                 self.dataset_name,
-                tuple(self.cell_line_ids),
-                tuple(self.drug_ids),
-                tuple(self.response),
-                (tuple(self.predictions) if self.predictions is not None else None),
+                tuple(cell_lines),
+                cell_line_codes.tobytes(),
+                tuple(drugs),
+                drug_codes.tobytes(),
+                np.ascontiguousarray(self.response, dtype=float).tobytes(),
+                (
+                    np.ascontiguousarray(self.predictions, dtype=float).tobytes()
+                    if self.predictions is not None
+                    else None
+                ),
             )
         )
 
@@ -494,11 +676,7 @@ class DrugResponseDataset(Dataset):
 
         :param mask: boolean mask
         """
-        self._response = self.response[mask]
-        self._cell_line_ids = self.cell_line_ids[mask]
-        self._drug_ids = self.drug_ids[mask]
-        if self.predictions is not None:
-            self._predictions = self.predictions[mask]
+        self._select_rows(mask)
 
     def transform(self, response_transformation: TransformerMixin) -> None:
         """
@@ -506,9 +684,9 @@ class DrugResponseDataset(Dataset):
 
         :param response_transformation: e.g., StandardScaler, MinMaxScaler, RobustScaler
         """
-        self._response = response_transformation.transform(self.response.reshape(-1, 1)).squeeze()
+        self._response = response_transformation.transform(self.response.reshape(-1, 1)).reshape(-1)
         if self.predictions is not None:
-            self._predictions = response_transformation.transform(self.predictions.reshape(-1, 1)).squeeze()
+            self._predictions = response_transformation.transform(self.predictions.reshape(-1, 1)).reshape(-1)
 
     def fit_transform(self, response_transformation: TransformerMixin) -> None:
         """
@@ -525,9 +703,45 @@ class DrugResponseDataset(Dataset):
 
         :param response_transformation: e.g., StandardScaler, MinMaxScaler, RobustScaler
         """
-        self._response = response_transformation.inverse_transform(self.response.reshape(-1, 1)).squeeze()
+        self._response = response_transformation.inverse_transform(self.response.reshape(-1, 1)).reshape(-1)
         if self.predictions is not None:
-            self._predictions = response_transformation.inverse_transform(self.predictions.reshape(-1, 1)).squeeze()
+            self._predictions = response_transformation.inverse_transform(self.predictions.reshape(-1, 1)).reshape(-1)
+
+
+def _encode_ids(ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Encodes IDs as integer codes into a vocabulary of the unique IDs.
+
+    :param ids: cell line or drug IDs
+    :returns: read-only vocabulary in order of first appearance, with the dtype of ids, and int32 codes, such that
+        vocabulary[codes] equals ids
+    """
+    ids = np.asarray(ids)
+    codes, vocabulary = pd.factorize(ids.reshape(-1), use_na_sentinel=False)
+    vocabulary = np.asarray(vocabulary, dtype=ids.dtype)
+    vocabulary.flags.writeable = False
+    return vocabulary, codes.astype(np.int32)
+
+
+def _concatenate_codes(
+    vocabulary: np.ndarray, codes: np.ndarray, other_vocabulary: np.ndarray, other_codes: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Concatenates encoded IDs. The vocabularies are merged if they differ.
+
+    :param vocabulary: vocabulary of the first IDs
+    :param codes: codes of the first IDs
+    :param other_vocabulary: vocabulary of the second IDs
+    :param other_codes: codes of the second IDs
+    :returns: vocabulary and codes of the concatenated IDs
+    """
+    if vocabulary is other_vocabulary or (
+        len(vocabulary) == len(other_vocabulary) and np.array_equal(vocabulary, other_vocabulary)
+    ):
+        return vocabulary, np.concatenate([codes, other_codes])
+    merged_vocabulary, positions = _encode_ids(np.concatenate([vocabulary, other_vocabulary]))
+    positions, other_positions = np.split(positions, [len(vocabulary)])
+    return merged_vocabulary, np.concatenate([positions[codes], other_positions[other_codes]])
 
 
 def _split_early_stopping_data(
@@ -554,47 +768,120 @@ def _split_early_stopping_data(
     return validation_dataset, early_stopping_dataset
 
 
+def _group_k_fold(group_codes: np.ndarray, n_groups: int, n_splits: int) -> np.ndarray:
+    """
+    Assigns groups to folds like sklearn's GroupKFold, operating on integer group codes.
+
+    As in GroupKFold, the groups are visited from the largest to the smallest one and each group goes to the fold with
+    the fewest samples so far (ties go to the lower fold). All groups of the same size are placed at once: the next m
+    placements are the m smallest (fold load, fold) keys among the loads each fold would reach by taking further
+    groups.
+
+    :param group_codes: group code of each sample, codes are numbered in the sorted order of the group IDs
+    :param n_groups: number of groups
+    :param n_splits: number of folds
+    :returns: fold of each sample
+    :raises ValueError: if there are fewer than two folds or fewer groups than folds
+    """
+    if n_splits < 2:
+        raise ValueError(f"The number of cross validation splits must be at least 2, but is {n_splits}.")
+    if n_splits > n_groups:
+        raise ValueError(
+            f"Cannot have number of splits n_splits={n_splits} greater than the number of groups: {n_groups}."
+        )
+    group_sizes = np.bincount(group_codes, minlength=n_groups)
+    order = np.argsort(group_sizes)[::-1]
+    sorted_sizes = group_sizes[order]
+    fold_of_group = np.empty(n_groups, dtype=np.intp)
+    fold_load = np.zeros(n_splits, dtype=np.int64)
+    folds = np.arange(n_splits)
+    run_starts = np.flatnonzero(np.r_[True, sorted_sizes[1:] != sorted_sizes[:-1]])
+    run_ends = np.r_[run_starts[1:], n_groups]
+    for start, end in zip(run_starts, run_ends, strict=True):
+        size = sorted_sizes[start]
+        n_placed = end - start
+        # enough steps for the least loaded fold to catch up and then take its share of the run
+        n_steps = n_placed // n_splits + (fold_load.max() - fold_load.min()) // size + 2
+        loads = (fold_load[:, None] + size * np.arange(n_steps)[None, :]).ravel()
+        step_folds = np.repeat(folds, n_steps)
+        picked_folds = step_folds[np.lexsort((step_folds, loads))[:n_placed]]
+        fold_of_group[order[start:end]] = picked_folds
+        fold_load += size * np.bincount(picked_folds, minlength=n_splits)
+    return fold_of_group[group_codes]
+
+
+def _pair_codes(dataset: DrugResponseDataset) -> tuple[np.ndarray, int]:
+    """
+    Encodes the cell line-drug pairs of a dataset as integers.
+
+    The codes are numbered in the sorted order of the pair IDs cell_line_id + "_" + drug_id. If no cell line ID contains
+    an underscore, this order equals sorting by (cell_line_id + "_", drug_id), which only needs the ranks of the
+    vocabularies and the integer key cell_line_rank * n_drugs + drug_rank. Otherwise, the pair IDs are built once per
+    unique pair.
+
+    :param dataset: dataset whose pairs are encoded
+    :returns: pair code of each row and number of unique pairs
+    """
+    cell_line_vocabulary = dataset._cell_line_vocabulary
+    drug_vocabulary = dataset._drug_vocabulary
+    cell_line_codes = dataset._rows("_cell_line_codes").astype(np.int64)
+    drug_codes = dataset._rows("_drug_codes")
+    if all(isinstance(cell_line_id, str) and "_" not in cell_line_id for cell_line_id in cell_line_vocabulary) and all(
+        isinstance(drug_id, str) for drug_id in drug_vocabulary
+    ):
+        cell_line_ranks = np.empty(len(cell_line_vocabulary), dtype=np.int64)
+        cell_line_ranks[np.argsort(np.array([cell_line_id + "_" for cell_line_id in cell_line_vocabulary]))] = (
+            np.arange(len(cell_line_vocabulary))
+        )
+        drug_ranks = np.empty(len(drug_vocabulary), dtype=np.int64)
+        drug_ranks[np.argsort(np.array(drug_vocabulary, dtype=str))] = np.arange(len(drug_vocabulary))
+        pair_keys = cell_line_ranks[cell_line_codes] * len(drug_vocabulary) + drug_ranks[drug_codes]
+        unique_keys, pair_codes = np.unique(pair_keys, return_inverse=True)
+        return pair_codes, len(unique_keys)
+    unique_keys, key_codes = np.unique(cell_line_codes * len(drug_vocabulary) + drug_codes, return_inverse=True)
+    pair_ids = np.array(
+        [
+            f"{cell_line_vocabulary[key // len(drug_vocabulary)]}_{drug_vocabulary[key % len(drug_vocabulary)]}"
+            for key in unique_keys
+        ]
+    )
+    unique_pair_ids, pair_id_codes = np.unique(pair_ids, return_inverse=True)
+    return pair_id_codes[key_codes], len(unique_pair_ids)
+
+
 def _leave_pair_out_cv(
     n_cv_splits: int,
-    response: np.ndarray,
-    cell_line_ids: np.ndarray,
-    drug_ids: np.ndarray,
+    dataset: DrugResponseDataset,
     split_validation: bool = True,
     validation_ratio: float = 0.1,
     random_state: int = 42,
-    dataset_name: str = "unknown",
 ) -> list[dict[str, DrugResponseDataset]]:
     """
     Leave pair out cross validation. Splits data into n_cv_splits number of cross validation splits.
 
     :param n_cv_splits: number of cross validation splits
-    :param response: response (e.g. ic50 values)
-    :param cell_line_ids: cell line IDs
-    :param drug_ids: drug IDs
+    :param dataset: dataset to split, the subsets share its ID vocabularies
     :param split_validation: whether to split the training set into training and validation set
     :param validation_ratio: ratio of validation set (of the training set)
     :param random_state: random state
-    :param dataset_name: name of the dataset
     :returns: list of dicts of the cross validation sets
-    :raises AssertionError: if response, cell_line_ids and drug_ids have different lengths
     """
-    if not (len(response) == len(cell_line_ids) == len(drug_ids)):
-        raise AssertionError("response, cell_line_ids and drug_ids must have the same length")
-    indices = np.arange(len(response))
+    indices = np.arange(len(dataset))
     np.random.seed(random_state)
     shuffled_indices = np.random.permutation(indices)
-    response = response[shuffled_indices].copy()
-    cell_line_ids = cell_line_ids[shuffled_indices].copy()
-    drug_ids = drug_ids[shuffled_indices].copy()
+    dataset = dataset._subset(shuffled_indices)
 
-    # We use GroupKFold to ensure that each pair is only in one fold (prevent data leakage due to
+    # We use grouped folds to ensure that each pair is only in one fold (prevent data leakage due to
     # experimental replicates).
     # If there are no replicates this is equivalent to KFold.
-    groups = [cell + "_" + drug for cell, drug in zip(cell_line_ids, drug_ids, strict=True)]
-    kf = GroupKFold(n_splits=n_cv_splits)
+    pair_codes, n_pairs = _pair_codes(dataset)
+    fold_of_row = _group_k_fold(pair_codes, n_pairs, n_cv_splits)
     cv_sets = []
 
-    for train_indices, test_indices in kf.split(response, groups=groups):
+    for fold in range(n_cv_splits):
+        test_mask = fold_of_row == fold
+        train_indices = np.flatnonzero(~test_mask)
+        test_indices = np.flatnonzero(test_mask)
         if split_validation:
             # split training set into training and validation set
             train_indices, validation_indices = train_test_split(
@@ -604,27 +891,12 @@ def _leave_pair_out_cv(
                 random_state=random_state,
             )
         cv_fold = {
-            "train": DrugResponseDataset(
-                cell_line_ids=cell_line_ids[train_indices],
-                drug_ids=drug_ids[train_indices],
-                response=response[train_indices],
-                dataset_name=dataset_name,
-            ),
-            "test": DrugResponseDataset(
-                cell_line_ids=cell_line_ids[test_indices],
-                drug_ids=drug_ids[test_indices],
-                response=response[test_indices],
-                dataset_name=dataset_name,
-            ),
+            "train": dataset._subset(train_indices),
+            "test": dataset._subset(test_indices),
         }
 
         if split_validation:
-            cv_fold["validation"] = DrugResponseDataset(
-                cell_line_ids=cell_line_ids[validation_indices],
-                drug_ids=drug_ids[validation_indices],
-                response=response[validation_indices],
-                dataset_name=dataset_name,
-            )
+            cv_fold["validation"] = dataset._subset(validation_indices)
 
         cv_sets.append(cv_fold)
     return cv_sets
@@ -633,98 +905,229 @@ def _leave_pair_out_cv(
 def _leave_group_out_cv(
     group: str,
     n_cv_splits: int,
-    response: np.ndarray,
-    cell_line_ids: np.ndarray,
-    drug_ids: np.ndarray,
+    dataset: DrugResponseDataset,
     split_validation: bool = True,
     validation_ratio: float = 0.1,
     random_state: int = 42,
-    dataset_name: str = "unknown",
 ):
     """
     Leave group out cross validation: Splits data into n_cv_splits number of cross validation splits.
 
     :param group: group to leave out (cell_line or drug)
     :param n_cv_splits: number of cross validation splits
-    :param response: response (e.g. ic50 values)
-    :param cell_line_ids: cell line IDs
-    :param drug_ids: drug IDs
+    :param dataset: dataset to split, the subsets share its ID vocabularies
     :param split_validation: whether to split the training set into training and validation set
     :param validation_ratio: ratio of validation set (of the training set)
     :param random_state: random state
-    :param dataset_name: name of the dataset
     :returns: list of dicts of the cross validation sets
     :raises AssertionError: if group is not 'cell_line' or 'drug'
     """
     if group not in {"cell_line", "drug"}:
         raise AssertionError(f"group must be 'cell_line' or 'drug', but is {group}")
 
-    if group == "cell_line":
-        group_ids = cell_line_ids
-    else:
-        group_ids = drug_ids
-
-    # shuffle, since GroupKFold does not implement this
-    indices = np.arange(len(response))
+    # shuffle, since the grouped fold assignment does not implement this
+    indices = np.arange(len(dataset))
     np.random.seed(random_state)
     shuffled_indices = np.random.permutation(indices)
-    response = response[shuffled_indices].copy()
-    cell_line_ids = cell_line_ids[shuffled_indices].copy()
-    drug_ids = drug_ids[shuffled_indices].copy()
-    group_ids = group_ids[shuffled_indices].copy()
-    gkf = GroupKFold(n_splits=n_cv_splits)
+    dataset = dataset._subset(shuffled_indices)
+    group_ids, group_codes = dataset.factorize_ids(group)
+    fold_of_row = _group_k_fold(group_codes, len(group_ids), n_cv_splits)
     cv_sets = []
 
-    for train_indices, test_indices in gkf.split(response, groups=group_ids):
+    for fold in range(n_cv_splits):
+        test_mask = fold_of_row == fold
+        train_indices = np.flatnonzero(~test_mask)
+        test_indices = np.flatnonzero(test_mask)
         cv_fold = {
-            "train": DrugResponseDataset(
-                cell_line_ids=cell_line_ids[train_indices],
-                drug_ids=drug_ids[train_indices],
-                response=response[train_indices],
-                dataset_name=dataset_name,
-            ),
-            "test": DrugResponseDataset(
-                cell_line_ids=cell_line_ids[test_indices],
-                drug_ids=drug_ids[test_indices],
-                response=response[test_indices],
-                dataset_name=dataset_name,
-            ),
+            "train": dataset._subset(train_indices),
+            "test": dataset._subset(test_indices),
         }
         if split_validation:
             # split training set into training and validation set.
             # The validation set also does
-            # contain unqiue cell lines/drugs
-            unique_train_groups = np.unique(group_ids[train_indices])
+            # contain unqiue cell lines/drugs. The group codes are sorted like the group IDs.
+            is_train_group = np.zeros(len(group_ids), dtype=bool)
+            is_train_group[group_codes[train_indices]] = True
             train_groups, validation_groups = train_test_split(
-                unique_train_groups,
+                np.flatnonzero(is_train_group),
                 test_size=validation_ratio,
                 shuffle=True,
                 random_state=random_state,
             )
-            train_indices = np.where(np.isin(group_ids, train_groups))[0]
-            validation_indices = np.where(np.isin(group_ids, validation_groups))[0]
-            cv_fold["train"] = DrugResponseDataset(
-                cell_line_ids=cell_line_ids[train_indices],
-                drug_ids=drug_ids[train_indices],
-                response=response[train_indices],
-                dataset_name=dataset_name,
-            )
-            cv_fold["validation"] = DrugResponseDataset(
-                cell_line_ids=cell_line_ids[validation_indices],
-                drug_ids=drug_ids[validation_indices],
-                response=response[validation_indices],
-                dataset_name=dataset_name,
-            )
+            is_train_group[validation_groups] = False
+            is_validation_group = np.zeros(len(group_ids), dtype=bool)
+            is_validation_group[validation_groups] = True
+            train_indices = np.flatnonzero(is_train_group[group_codes])
+            validation_indices = np.flatnonzero(is_validation_group[group_codes])
+            cv_fold["train"] = dataset._subset(train_indices)
+            cv_fold["validation"] = dataset._subset(validation_indices)
 
         cv_sets.append(cv_fold)
     return cv_sets
 
 
+def _stack_view_values(values: list[Any]) -> np.ndarray | list[Any]:
+    """
+    Stacks the values of one feature view into a single contiguous array if possible.
+
+    :param values: feature values of one view, ordered like the identifiers of the FeatureDataset
+    :returns: array with one row per identifier if all values are equally shaped numpy arrays, otherwise the values as
+        list (e.g., for graphs or feature matrices of different sizes)
+    """
+    if len(values) > 0 and all(isinstance(value, np.ndarray) for value in values):
+        shape = values[0].shape
+        if all(value.shape == shape for value in values):
+            return np.stack(values)
+    return list(values)
+
+
+class _EntityFeatures(MutableMapping):
+    """Dict-like view on the features of one identifier of a FeatureDataset: view name -> feature value."""
+
+    def __init__(self, dataset: "FeatureDataset", identifier: Any):
+        """
+        Initializes the view.
+
+        :param dataset: FeatureDataset the features are stored in
+        :param identifier: drug ID/cell line ID
+        """
+        self._dataset = dataset
+        self._identifier = identifier
+
+    def __getitem__(self, view: str) -> Any:
+        """
+        Returns the feature value of the view. Rows of matrix-backed views are numpy views into the matrix.
+
+        :param view: view name
+        :returns: feature value
+        """
+        return self._dataset._view_value(view, self._dataset._row(self._identifier))
+
+    def __setitem__(self, view: str, value: Any) -> None:
+        """
+        Sets the feature value of the view.
+
+        :param view: view name
+        :param value: new feature value
+        """
+        self._dataset._set_value(self._identifier, view, value)
+
+    def __delitem__(self, view: str) -> None:
+        """
+        Deleting single views of an identifier is not supported, all identifiers share the same views.
+
+        :param view: view name
+        :raises TypeError: always
+        """
+        raise TypeError("Feature views cannot be deleted for a single identifier.")
+
+    def __iter__(self) -> Iterator[str]:
+        """
+        Iterates over the view names.
+
+        :returns: iterator over the view names
+        """
+        return iter(self._dataset._views)
+
+    def __len__(self) -> int:
+        """
+        Returns the number of views.
+
+        :returns: number of views
+        """
+        return len(self._dataset._views)
+
+
+class _FeatureMapping(MutableMapping):
+    """Dict-like view on a FeatureDataset: identifier -> view name -> feature value."""
+
+    def __init__(self, dataset: "FeatureDataset"):
+        """
+        Initializes the view.
+
+        :param dataset: FeatureDataset the features are stored in
+        """
+        self._dataset = dataset
+
+    def __getitem__(self, identifier: Any) -> _EntityFeatures:
+        """
+        Returns the features of an identifier.
+
+        :param identifier: drug ID/cell line ID
+        :returns: dict-like view on the features of the identifier
+        :raises KeyError: if the identifier is not in the FeatureDataset
+        """
+        if identifier not in self._dataset._index:
+            raise KeyError(identifier)
+        return _EntityFeatures(self._dataset, identifier)
+
+    def __setitem__(self, identifier: Any, features: dict[str, Any]) -> None:
+        """
+        Sets all views of an identifier. Unknown identifiers are appended.
+
+        :param identifier: drug ID/cell line ID
+        :param features: dictionary of feature views, key: feature name, value: feature value
+        """
+        if identifier in self._dataset._index:
+            for view, value in features.items():
+                self._dataset._set_value(identifier, view, value)
+        else:
+            all_features = self._dataset.to_dict()
+            all_features[identifier] = features
+            self._dataset._set_storage_from_dict(all_features)
+
+    def __delitem__(self, identifier: Any) -> None:
+        """
+        Removes an identifier from the FeatureDataset.
+
+        :param identifier: drug ID/cell line ID
+        """
+        rows = np.flatnonzero(self._dataset._identifiers != identifier)
+        if len(rows) == len(self._dataset._identifiers):
+            raise KeyError(identifier)
+        self._dataset._take_rows(rows)
+
+    def __contains__(self, identifier: object) -> bool:
+        """
+        Checks whether the identifier is in the FeatureDataset using the identifier index.
+
+        :param identifier: drug ID/cell line ID
+        :returns: whether the identifier is in the FeatureDataset
+        """
+        return identifier in self._dataset._index
+
+    def __iter__(self) -> Iterator[Any]:
+        """
+        Iterates over the identifiers.
+
+        :returns: iterator over the identifiers
+        """
+        return iter(list(self._dataset._index))
+
+    def __len__(self) -> int:
+        """
+        Returns the number of identifiers.
+
+        :returns: number of identifiers
+        """
+        return len(self._dataset._index)
+
+
 class FeatureDataset(Dataset):
-    """Class for feature datasets."""
+    """
+    Class for feature datasets.
+
+    Each feature view is stored as one contiguous array with one row per identifier if all its values are equally
+    shaped numpy arrays (e.g., gene expression vectors). Views which cannot be stacked, such as molecular graphs, are
+    stored as a list ordered like the identifiers. A hash index maps identifiers to rows, so feature matrices for many
+    (repeated) identifiers are a single gather. The dict-style access features[identifier][view] is kept as a view on
+    the storage.
+
+    A view can additionally have a row map: row i of the view is then row row_map[i] of its storage. Permuting a view
+    only replaces its row map, so a permuted copy shares all matrices with the original dataset.
+    """
 
     _meta_info: dict[str, Any] = {}
-    _features: dict[str, dict[str, Any]] = {}
 
     @classmethod
     def from_csv(
@@ -740,6 +1143,38 @@ class FeatureDataset(Dataset):
         """
         raise NotImplementedError
 
+    @classmethod
+    def from_matrices(
+        cls: type["FeatureDataset"],
+        identifiers: np.ndarray | list[Any],
+        views: dict[str, np.ndarray | list[Any]],
+        meta_info: dict[str, Any] | None = None,
+    ) -> "FeatureDataset":
+        """
+        Creates a FeatureDataset directly from one matrix per view without building per-identifier dictionaries.
+
+        :param identifiers: drug IDs/cell line IDs, ordered like the rows of the matrices
+        :param views: dictionary of feature views, key: feature name, value: matrix with one row per identifier or
+            list with one value per identifier
+        :param meta_info: additional information for the views, e.g. gene names for gene expression
+        :returns: FeatureDataset backed by the given matrices
+        :raises AssertionError: if the identifiers are not unique
+        :raises AssertionError: if a view does not have one row per identifier
+        """
+        identifiers = list(identifiers)
+        if len(set(identifiers)) != len(identifiers):
+            raise AssertionError("Identifiers of a FeatureDataset must be unique.")
+        for view, values in views.items():
+            if len(values) != len(identifiers):
+                raise AssertionError(
+                    f"View {view!r} has {len(values)} rows, but {len(identifiers)} identifiers were given."
+                )
+        dataset = cls(features={})
+        dataset._set_storage(identifiers, dict(views))
+        if meta_info is not None:
+            dataset._set_meta_info(meta_info)
+        return dataset
+
     @property
     def meta_info(self) -> dict[str, Any]:
         """
@@ -750,13 +1185,16 @@ class FeatureDataset(Dataset):
         return self._meta_info
 
     @property
-    def features(self) -> dict[str, dict[str, Any]]:
+    def features(self) -> MutableMapping[Any, MutableMapping[str, Any]]:
         """
         Returns the features.
 
+        The returned mapping is a view on the storage: features[identifier][view] returns the feature value and
+        assignments are written back to the FeatureDataset.
+
         :returns: features of this FeatureDataset
         """
-        return self._features
+        return _FeatureMapping(self)
 
     @property
     def identifiers(self) -> np.ndarray:
@@ -765,7 +1203,7 @@ class FeatureDataset(Dataset):
 
         :returns: feature identifiers of this FeatureDataset
         """
-        return np.array(list(self.features.keys()))
+        return self._identifiers.copy()
 
     @property
     def view_names(self) -> list[str]:
@@ -774,7 +1212,7 @@ class FeatureDataset(Dataset):
 
         :returns: view_names of this FeatureDataset
         """
-        return list(self.features[list(self.features.keys())[0]].keys())  # TODO whut?!
+        return list(self._views.keys())
 
     def __init__(
         self,
@@ -788,15 +1226,214 @@ class FeatureDataset(Dataset):
             key: drug ID/cell line ID, value: Dict of feature views,
             key: feature name, value: feature vector
         :param meta_info: additional information for the views, e.g. gene names for gene expression
-        :raises AssertionError: if meta_info keys are not in view names
         """
         super().__init__()
-        self._features = features
+        self._meta_info = {}
+        self._set_storage_from_dict(features)
         if meta_info is not None:
-            # assert that str of meta Dict[str, Any] is in view_names
-            if not all(meta_key in self.view_names for meta_key in meta_info.keys()):
-                raise AssertionError(f"Meta keys {meta_info.keys()} not in view names {self.view_names}")
-            self._meta_info = meta_info
+            self._set_meta_info(meta_info)
+
+    def _set_meta_info(self, meta_info: dict[str, Any]) -> None:
+        """
+        Sets the meta information.
+
+        :param meta_info: additional information for the views, e.g. gene names for gene expression
+        :raises AssertionError: if meta_info keys are not in view names
+        """
+        # assert that str of meta Dict[str, Any] is in view_names
+        if not all(meta_key in self.view_names for meta_key in meta_info.keys()):
+            raise AssertionError(f"Meta keys {meta_info.keys()} not in view names {self.view_names}")
+        self._meta_info = meta_info
+
+    def _set_storage(self, identifiers: list[Any], views: dict[str, np.ndarray | list[Any]]) -> None:
+        """
+        Replaces the storage of the FeatureDataset.
+
+        :param identifiers: drug IDs/cell line IDs, ordered like the rows of the views
+        :param views: dictionary of feature views, key: feature name, value: matrix or list with one row per identifier
+        """
+        self._index = pd.Index(identifiers)
+        self._identifiers = np.array(identifiers)
+        self._views = views
+        self._row_maps: dict[str, np.ndarray] = {}
+
+    def _set_storage_from_dict(self, features: dict[Any, dict[str, Any]]) -> None:
+        """
+        Replaces the storage of the FeatureDataset with the content of a dictionary of features.
+
+        :param features: dictionary of features, key: drug ID/cell line ID, value: Dict of feature views
+        :raises AssertionError: if not all identifiers have the same feature views
+        """
+        identifiers = list(features.keys())
+        view_names = list(features[identifiers[0]].keys()) if identifiers else []
+        if not all(features[id_].keys() == set(view_names) for id_ in identifiers):
+            raise AssertionError("All identifiers of a FeatureDataset must have the same feature views.")
+        self._set_storage(
+            identifiers,
+            {view: _stack_view_values([features[id_][view] for id_ in identifiers]) for view in view_names},
+        )
+
+    def _take_view(self, view: str, rows: np.ndarray) -> np.ndarray | list[Any]:
+        """
+        Returns the storage of a view reduced to the given rows, resolving its row map.
+
+        :param view: view name
+        :param rows: row indices
+        :returns: matrix or list with one value per row
+        """
+        storage = self._views[view]
+        if view in self._row_maps:
+            rows = self._row_maps[view][rows]
+        return storage[rows] if isinstance(storage, np.ndarray) else [storage[row] for row in rows]
+
+    def _take_rows(self, rows: np.ndarray) -> None:
+        """
+        Reduces the FeatureDataset to the given rows, in the given order.
+
+        :param rows: row indices
+        """
+        self._set_storage(list(self._index[rows]), {view: self._take_view(view, rows) for view in self._views})
+
+    def _view_value(self, view: str, row: int) -> Any:
+        """
+        Returns the feature value of one row of a view, resolving its row map.
+
+        :param view: view name
+        :param row: row index
+        :returns: feature value
+        """
+        if view in self._row_maps:
+            row = self._row_maps[view][row]
+        return self._views[view][row]
+
+    def _materialize_view(self, view: str) -> None:
+        """
+        Applies the row map of a view to its storage, so the view can be modified without affecting shared storage.
+
+        :param view: view name
+        """
+        if view in self._row_maps:
+            self._views[view] = self._take_view(view, np.arange(len(self._identifiers)))
+            del self._row_maps[view]
+
+    def permute_view_rows(self, view: str, permutation: np.ndarray) -> None:
+        """
+        Permutes the rows of a view: identifier i gets the features of identifier permutation[i].
+
+        The storage of the view is not touched, only its row map is replaced. Copies made with copy_on_write thus keep
+        sharing the matrix with this dataset.
+
+        :param view: view name
+        :param permutation: permutation of the row indices
+        :raises AssertionError: if the view is not in the FeatureDataset
+        :raises AssertionError: if permutation is not a permutation of the rows
+        """
+        if view not in self._views:
+            raise AssertionError(f"View {view!r} not in in the FeatureDataset.")
+        permutation = np.asarray(permutation, dtype=np.intp)
+        if not np.array_equal(np.sort(permutation), np.arange(len(self._identifiers))):
+            raise AssertionError(f"Expected a permutation of the {len(self._identifiers)} rows.")
+        # row maps are replaced, never modified in place, because copies share them
+        self._row_maps[view] = self._row_maps[view][permutation] if view in self._row_maps else permutation
+
+    def _row(self, identifier: Any) -> int:
+        """
+        Returns the row of an identifier.
+
+        :param identifier: drug ID/cell line ID
+        :returns: row index
+        """
+        return self._index.get_loc(identifier)
+
+    def _set_value(self, identifier: Any, view: str, value: Any) -> None:
+        """
+        Sets the feature value of one identifier and view.
+
+        If the value fits into the matrix of the view, it is written into the matrix (upcasting the matrix dtype if
+        needed). Otherwise, the view is converted to a list of per-identifier values.
+
+        :param identifier: drug ID/cell line ID
+        :param view: view name
+        :param value: new feature value
+        :raises KeyError: if the view is not in the FeatureDataset
+        """
+        if view not in self._views:
+            raise KeyError(f"View {view!r} not in in the FeatureDataset. New views are added with add_features.")
+        row = self._row(identifier)
+        self._materialize_view(view)
+        storage = self._views[view]
+        if isinstance(storage, np.ndarray):
+            if isinstance(value, np.ndarray) and value.shape == storage.shape[1:]:
+                dtype = np.result_type(storage.dtype, value.dtype)
+                if dtype != storage.dtype or not storage.flags.writeable:
+                    # e.g., read-only memory-mapped matrices from the feature cache are copied on the first write
+                    storage = np.array(storage, dtype=dtype)
+                    self._views[view] = storage
+                storage[row] = value
+                return
+            storage = list(storage)
+            self._views[view] = storage
+        storage[row] = value
+
+    def _set_rows(self, view: str, rows: np.ndarray, values: np.ndarray) -> None:
+        """
+        Sets the feature values of several rows of a view at once.
+
+        If all rows are set, the values replace the view, e.g., after a transformation which changes the number of
+        features. If the values fit into the matrix of the view, they are written into the matrix (copying it first if
+        it is read-only or needs a wider dtype). Otherwise, the view is converted to a list of per-identifier values.
+
+        :param view: view name
+        :param rows: unique row indices
+        :param values: matrix with one row per row index
+        """
+        # the matrix of the view if the values fit into it
+        matrix = self._views[view] if isinstance(self._views[view], np.ndarray) else None
+        if matrix is not None and values.shape[1:] != matrix.shape[1:]:
+            matrix = None
+        if len(rows) == len(self._identifiers):
+            # as for single values, writing into a matrix keeps its dtype unless the values need a wider one
+            new_storage = np.empty(
+                values.shape, dtype=values.dtype if matrix is None else np.result_type(matrix.dtype, values.dtype)
+            )
+            new_storage[rows] = values
+            self._views[view] = new_storage
+            self._row_maps.pop(view, None)
+            return
+        self._materialize_view(view)
+        storage = self._views[view]
+        if matrix is not None and isinstance(storage, np.ndarray):
+            dtype = np.result_type(storage.dtype, values.dtype)
+            if dtype != storage.dtype or not storage.flags.writeable:
+                storage = np.array(storage, dtype=dtype)
+                self._views[view] = storage
+            storage[rows] = values
+        else:
+            storage = list(storage)
+            for row, value in zip(rows, values, strict=True):
+                storage[row] = value
+            self._views[view] = storage
+
+    def _consolidate_view(self, view: str) -> np.ndarray | list[Any]:
+        """
+        Stacks a list-backed view into a matrix if all of its values are equally shaped numpy arrays.
+
+        :param view: view name
+        :returns: storage of the view
+        """
+        storage = self._views[view]
+        if isinstance(storage, list):
+            storage = _stack_view_values(storage)
+            self._views[view] = storage
+        return storage
+
+    def to_dict(self) -> dict[Any, dict[str, Any]]:
+        """
+        Returns the features as dictionary of dictionaries.
+
+        :returns: dictionary of features, key: drug ID/cell line ID, value: Dict of feature views
+        """
+        return {id_: {view: self._view_value(view, row) for view in self._views} for row, id_ in enumerate(self._index)}
 
     def save(self, path: str):
         """
@@ -807,7 +1444,9 @@ class FeatureDataset(Dataset):
         """
         raise NotImplementedError("save method not implemented")
 
-    def randomize_features(self, views_to_randomize: str | list[str], randomization_type: str) -> None:
+    def randomize_features(
+        self, views_to_randomize: str | list[str], randomization_type: str, random_state: int | None = None
+    ) -> None:
         """
         Randomizes the feature vectors.
 
@@ -817,8 +1456,9 @@ class FeatureDataset(Dataset):
         instance, for networks it is the degree distribution.
 
         :param views_to_randomize: name of feature view or list of names of multiple feature views
-            to randomize. The other views are not randomized.
+            to randomize. The other views are not randomized, views which are not in the FeatureDataset are skipped.
         :param randomization_type: randomization type ('permutation', 'invariant').
+        :param random_state: seed of the randomization, None draws a fresh seed
         :raises AssertionError: if randomization_type is not 'permutation' or 'invariant'
         :raises ValueError: if no invariant randomization is available for the feature view type
         """
@@ -829,18 +1469,17 @@ class FeatureDataset(Dataset):
 
         if isinstance(views_to_randomize, str):
             views_to_randomize = [views_to_randomize]
+        views_to_randomize = [view for view in views_to_randomize if view in self._views]
+        rng = np.random.default_rng(random_state)
 
         if randomization_type == "permutation":
             # Permute the specified views for each entity (= cell line or drug)
             # E.g. each cell line gets the feature vector/graph/image...
             # of another cell line.
-            # Drawn without replacement.
-            self._features = permute_features(
-                features=self.features,
-                views_to_permute=views_to_randomize,
-                identifiers=self.identifiers,
-                all_views=self.view_names,
-            )
+            # Drawn without replacement. Only the row maps of the views change, the matrices are shared.
+            permutation = rng.permutation(len(self._identifiers))
+            for view in views_to_randomize:
+                self.permute_view_rows(view, permutation)
 
         elif randomization_type == "invariant":
             # Invariant randomization:
@@ -849,22 +1488,85 @@ class FeatureDataset(Dataset):
             # For vectors this is the mean and standard deviation the feature view,
             # for networks the degree distribution.
             for view in views_to_randomize:
-                for identifier in self.identifiers:
-                    if isinstance(self.features[identifier][view], np.ndarray):
-                        new_features = np.random.normal(
-                            self.features[identifier][view].mean(),
-                            self.features[identifier][view].std(),
-                            self.features[identifier][view].shape,
-                        )
-                    elif isinstance(self.features[identifier][view], nx.classes.graph.Graph):
-                        new_features = randomize_graph(self.features[identifier][view])
-
+                storage = self._consolidate_view(view)
+                if isinstance(storage, np.ndarray):
+                    # one draw for all entities, shifted and scaled by the mean and std of each row
+                    axes = tuple(range(1, storage.ndim))
+                    mean = storage.mean(axis=axes, dtype=np.float64, keepdims=True)
+                    std = storage.std(axis=axes, dtype=np.float64, keepdims=True)
+                    if view in self._row_maps:
+                        mean, std = mean[self._row_maps[view]], std[self._row_maps[view]]
+                    dtype = storage.dtype if storage.dtype in (np.float32, np.float64) else np.float64
+                    noise = rng.standard_normal(storage.shape, dtype=dtype)
+                    noise *= std
+                    noise += mean
+                    new_storage: np.ndarray | list[Any] = noise
+                else:
+                    values = [self._view_value(view, row) for row in range(len(self._identifiers))]
+                    if all(isinstance(value, nx.classes.graph.Graph) for value in values):
+                        # the graphs of all entities are randomized in one batch
+                        new_storage = randomize_graphs(values, rng=rng)
                     else:
-                        raise ValueError(
-                            f"No invariant randomization available for feature view "
-                            f"type {type(self.features[identifier][view])!r}."
-                        )
-                    self.features[identifier][view] = new_features
+                        new_storage = [self._randomize_value_invariant(value, rng) for value in values]
+                # the new storage replaces the view, shared matrices of copy-on-write copies are not modified
+                self._views[view] = new_storage
+                self._row_maps.pop(view, None)
+
+    @staticmethod
+    def _randomize_value_invariant(value: Any, rng: np.random.Generator) -> Any:
+        """
+        Randomizes a single feature value which is not part of a feature matrix, preserving a key characteristic.
+
+        :param value: feature value, a numpy array or a networkx graph
+        :param rng: random number generator
+        :returns: randomized feature value
+        :raises ValueError: if no invariant randomization is available for the type of the value
+        """
+        if isinstance(value, np.ndarray):
+            return rng.normal(value.mean(), value.std(), value.shape)
+        if isinstance(value, nx.classes.graph.Graph):
+            return randomize_graph(value, rng=rng)
+        raise ValueError(f"No invariant randomization available for feature view type {type(value)!r}.")
+
+    def _get_rows(self, identifiers: np.ndarray) -> np.ndarray:
+        """
+        Looks up the rows of the given identifiers in the identifier index.
+
+        :param identifiers: list of identifiers (cell lines oder drugs), may contain duplicates
+        :returns: row indices
+        :raises AssertionError: if identifiers are not in the FeatureDataset
+        """
+        identifiers = np.asarray(identifiers)
+        rows = self._index.get_indexer(identifiers)
+        if (rows < 0).any():
+            missing_identifiers = set(identifiers[rows < 0])
+            raise AssertionError(
+                f"{len(missing_identifiers)} of {len(np.unique(identifiers))} ids are not in the "
+                f"FeatureDataset. Missing ids: {missing_identifiers}"
+            )
+        return rows
+
+    def _gather(self, view: str, rows: np.ndarray) -> np.ndarray:
+        """
+        Returns the feature matrix of a view for the given rows.
+
+        :param view: view name
+        :param rows: row indices
+        :returns: feature matrix
+        :raises AssertionError: if feature vectors of view have different lengths
+        :raises AssertionError: if view is not a numpy array, i.e. not a vector or matrix
+        """
+        storage = self._consolidate_view(view)
+        if view in self._row_maps:
+            rows = self._row_maps[view][rows]
+        if isinstance(storage, np.ndarray):
+            return storage[rows]
+        values = [storage[row] for row in np.unique(rows)]
+        if not all(len(value) == len(values[0]) for value in values):
+            raise AssertionError(f"Feature vectors of view {view} have different lengths.")
+        if not all(isinstance(value, np.ndarray) for value in values):
+            raise AssertionError(f"get_feature_matrix only works for vectors or matrices. {view} is not a numpy array.")
+        return np.array([storage[row] for row in rows])
 
     def get_feature_matrix(self, view: str, identifiers: np.ndarray) -> np.ndarray:
         """
@@ -874,38 +1576,67 @@ class FeatureDataset(Dataset):
         :param view: view name
         :param identifiers: list of identifiers (cell lines oder drugs)
         :returns: feature matrix
+        """
+        return self.get_feature_matrices(views=[view], identifiers=identifiers)[view]
+
+    def get_feature_matrices(self, views: list[str], identifiers: np.ndarray) -> dict[str, np.ndarray]:
+        """
+        Returns the feature matrices for the given views. The identifier lookup is shared by all views.
+
+        The feature views must be vectors or matrices.
+        :param views: view names
+        :param identifiers: list of identifiers (cell lines oder drugs)
+        :returns: dictionary with the feature matrices, key: view name
         :raises AssertionError: if no identifiers are given
-        :raises AssertionError: if view is not in the FeatureDataset
-        :raises AssertionError: if identifiers are not in the FeatureDataset
-        :raises AssertionError: if feature vectors of view have different lengths
-        :raises AssertionError: if view is not a numpy array, i.e. not a vector or matrix
+        :raises AssertionError: if a view is not in the FeatureDataset
         """
+        if len(views) == 0:
+            return {}
         if len(identifiers) == 0:
             raise AssertionError("get_feature_matrix: No identifiers given.")
-
-        if view not in self.view_names:
-            raise AssertionError(f"View {view!r} not in in the FeatureDataset.")
-        missing_identifiers = {id_ for id_ in identifiers if id_ not in self.identifiers}
-        if missing_identifiers:
-            raise AssertionError(
-                f"{len(missing_identifiers)} of {len(np.unique(identifiers))} ids are not in the "
-                f"FeatureDataset. Missing ids: {missing_identifiers}"
-            )
-
-        if not all(len(self.features[id_][view]) == len(self.features[identifiers[0]][view]) for id_ in identifiers):
-            raise AssertionError(f"Feature vectors of view {view} have different lengths.")
-
-        if not all(isinstance(self.features[id_][view], np.ndarray) for id_ in identifiers):
-            raise AssertionError(f"get_feature_matrix only works for vectors or matrices. {view} is not a numpy array.")
-        out = np.array([self.features[id_][view] for id_ in identifiers])
-        return out
+        for view in views:
+            if view not in self._views:
+                raise AssertionError(f"View {view!r} not in in the FeatureDataset.")
+        rows = self._get_rows(identifiers)
+        return {view: self._gather(view, rows) for view in views}
 
     def copy(self):
         """Returns a copy of the feature dataset.
 
         :returns: copy of the dataset
         """
-        return FeatureDataset(features=copy.deepcopy(self.features))
+        dataset = FeatureDataset.from_matrices(
+            identifiers=list(self._index),
+            views=copy.deepcopy(self._views),
+            meta_info=copy.deepcopy(self._meta_info) if self._meta_info else None,
+        )
+        dataset._row_maps = {view: row_map.copy() for view, row_map in self._row_maps.items()}
+        return dataset
+
+    def copy_on_write(self) -> "FeatureDataset":
+        """
+        Returns a copy which shares the feature matrices with this dataset until one of them is modified.
+
+        All matrices are marked read-only. Writing features through features[identifier][view], a transformation,
+        apply or an invariant randomization then copies the affected matrix first, so neither dataset sees the changes
+        of the other. In-place modifications of the returned numpy rows raise an error instead of silently changing
+        both. A permutation only replaces the row map of the view and copies nothing.
+
+        :returns: copy-on-write copy of the dataset
+        """
+        for storage in self._views.values():
+            if isinstance(storage, np.ndarray):
+                storage.setflags(write=False)
+        dataset = FeatureDataset.from_matrices(
+            identifiers=list(self._index),
+            views={
+                view: storage if isinstance(storage, np.ndarray) else list(storage)
+                for view, storage in self._views.items()
+            },
+            meta_info=dict(self._meta_info) if self._meta_info else None,
+        )
+        dataset._row_maps = dict(self._row_maps)
+        return dataset
 
     def add_features(self, other: "FeatureDataset") -> None:
         """
@@ -921,15 +1652,11 @@ class FeatureDataset(Dataset):
         if other.meta_info:
             self.add_meta_info(other)
 
-        common_identifiers = set(self.identifiers).intersection(other.identifiers)
-        new_features = {}
-        for id_ in common_identifiers:
-            id_ = str(id_)
-            new_features[id_] = {view: self.features[id_][view] for view in self.view_names}
-            for view in other.view_names:
-                new_features[id_][view] = other.features[id_][view]
-
-        self._features = new_features
+        common_rows = np.flatnonzero(self._index.isin(other._index))
+        other_rows = other._index.get_indexer(self._index[common_rows])
+        other_views = {view: other._take_view(view, other_rows) for view in other._views}
+        self._take_rows(common_rows)
+        self._views.update(other_views)
 
     def add_meta_info(self, other: "FeatureDataset") -> None:
         """
@@ -957,16 +1684,15 @@ class FeatureDataset(Dataset):
         """
         if view not in self.view_names:
             raise AssertionError(f"Transform view {view!r} not in in the FeatureDataset.")
-        if not all([clid in self.features for clid in ids]):
+        if (self._index.get_indexer(np.asarray(ids)) < 0).any():
             raise AssertionError("Trying to transform, but a cell line is missing.")
 
         if len(np.unique(ids)) != len(ids):
             raise AssertionError("IDs should be unique.")
 
-        for identifier in ids:
-            feature_vector = self.features[identifier][view]
-            scaled_feature_vector = transformer.transform([feature_vector])[0]
-            self.features[identifier][view] = scaled_feature_vector
+        # one transformation of the stacked feature vectors instead of one per identifier
+        rows = self._get_rows(ids)
+        self._set_rows(view, rows, np.asarray(transformer.transform(self._gather(view, rows))))
 
     def fit_transform_features(self, train_ids: np.ndarray, transformer: TransformerMixin, view: str):
         """
@@ -986,21 +1712,27 @@ class FeatureDataset(Dataset):
             raise AssertionError("Train IDs should be unique.")
 
         # Collect all features of the view for fitting the scaler
-        train_features = np.vstack([self.features[identifier][view] for identifier in train_ids])
-        transformer.fit(train_features)
+        transformer.fit(self._gather(view, self._get_rows(train_ids)))
 
-        # Apply transformation and scaling to each feature vector
-        for identifier in self.features:
-            feature_vector = self.features[identifier][view]
-            scaled_gene_expression = transformer.transform([feature_vector])[0]
-            self.features[identifier][view] = scaled_gene_expression
+        # Apply transformation and scaling to the feature matrix of all identifiers at once
+        rows = np.arange(len(self._identifiers))
+        self._set_rows(view, rows, np.asarray(transformer.transform(self._gather(view, rows))))
         return transformer
 
-    def apply(self, function: Callable, view: str):
+    def apply(self, function: Callable, view: str, vectorized: bool = False):
         """Applies a function to the features of a view.
 
+        Numpy ufuncs like np.log and functions with vectorized=True are called once on the feature matrix of the
+        view, other functions once per feature vector.
+
         :param function: function to apply
         :param view: view to apply the function to
+        :param vectorized: whether the function maps a matrix of feature vectors to a matrix of results row by row
         """
+        storage = self._consolidate_view(view)
+        if isinstance(storage, np.ndarray) and (vectorized or isinstance(function, np.ufunc)):
+            rows = np.arange(len(self._identifiers))
+            self._set_rows(view, rows, np.asarray(function(self._gather(view, rows))))
+            return
         for identifier in self.features:
             self.features[identifier][view] = function(self.features[identifier][view])
@@ -1,13 +1,23 @@
 """Utility functions for datasets."""
 
+import hashlib
+import importlib.util
+import json
+import os
+import warnings
 import zipfile
 from pathlib import Path
 from typing import Any
 
 import networkx as nx
 import numpy as np
+import pandas as pd
 import requests
 
+CACHE_DIR_NAME = ".cache"
+# file formats of predictions, cv splits and result tables and their file suffixes. Parquet and Feather need pyarrow.
+RESULT_FORMATS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+
 
 def download_dataset(
     dataset_name: str,
@@ -66,60 +76,387 @@ def download_dataset(
         print(f"{dataset_name} data downloaded and extracted to {data_path}")
 
 
-def randomize_graph(original_graph: nx.Graph) -> nx.Graph:
+def graphs_to_edge_arrays(
+    graphs: list[nx.Graph],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, list[list[Any]], list[dict]]:
+    """
+    Converts a list of graphs into one batch of edge arrays.
+
+    The nodes of graph i are numbered node_indptr[i] to node_indptr[i + 1] - 1 and its edges are the rows
+    edge_indptr[i] to edge_indptr[i + 1] - 1 of the edge array, like the row pointers of a CSR matrix.
+
+    :param graphs: undirected graphs
+    :returns: node pointers, edge pointers, edge array with two node numbers per edge, node labels of each graph and
+        attribute dictionaries of all edges
+    """
+    node_labels = [list(graph.nodes) for graph in graphs]
+    node_indptr = np.concatenate([[0], np.cumsum([len(nodes) for nodes in node_labels])]).astype(np.int64)
+    edge_indptr = np.concatenate([[0], np.cumsum([graph.number_of_edges() for graph in graphs])]).astype(np.int64)
+    edge_list = []
+    edge_attributes = []
+    for graph, nodes, node_offset in zip(graphs, node_labels, node_indptr[:-1].tolist(), strict=True):
+        node_numbers = {node: node_offset + number for number, node in enumerate(nodes)}
+        for u, v, attributes in graph.edges(data=True):
+            edge_list.append((node_numbers[u], node_numbers[v]))
+            edge_attributes.append(attributes)
+    edges = np.array(edge_list, dtype=np.int64).reshape(-1, 2)
+    return node_indptr, edge_indptr, edges, node_labels, edge_attributes
+
+
+def _contains(sorted_keys: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """
+    Checks which keys are in a sorted key array.
+
+    :param sorted_keys: sorted keys
+    :param keys: keys to look up
+    :returns: boolean mask of the keys which are in sorted_keys
+    """
+    if len(sorted_keys) == 0:
+        return np.zeros(len(keys), dtype=bool)
+    positions = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return sorted_keys[positions] == keys
+
+
+def _swap_edges(
+    edges: np.ndarray, edge_indptr: np.ndarray, n_nodes: int, n_rounds: int, rng: np.random.Generator
+) -> np.ndarray:
+    """
+    Randomizes a batch of graphs by double edge swaps, which keep the degree of every node.
+
+    In each round, the edges of every graph are paired at random. A pair (a, b), (c, d) is replaced by (a, d), (c, b)
+    unless this creates a self-loop or an edge which exists already or is created by another pair of the round.
+
+    :param edges: edge array of the batch, see graphs_to_edge_arrays
+    :param edge_indptr: edge pointers of the batch
+    :param n_nodes: number of nodes of the batch
+    :param n_rounds: number of rounds, every edge takes part in at most one swap per round
+    :param rng: random number generator
+    :returns: randomized edge array
+    """
+    edges = edges.copy()
+    graph_of_edge = np.repeat(np.arange(len(edge_indptr) - 1), np.diff(edge_indptr))
+    n_pairs = len(edges) // 2
+    for _ in range(n_rounds):
+        # shuffle the edges within each graph and pair neighbours
+        pairs = np.argsort(graph_of_edge + rng.random(len(edges)))[: 2 * n_pairs].reshape(-1, 2)
+        pairs = pairs[graph_of_edge[pairs[:, 0]] == graph_of_edge[pairs[:, 1]]]
+        a, b = edges[pairs[:, 0]].T
+        c, d = edges[pairs[:, 1]].T
+        flip = rng.random(len(pairs)) < 0.5
+        c, d = np.where(flip, d, c), np.where(flip, c, d)
+        first_keys = np.minimum(a, d) * n_nodes + np.maximum(a, d)
+        second_keys = np.minimum(c, b) * n_nodes + np.maximum(c, b)
+        edge_keys = np.sort(np.minimum(edges[:, 0], edges[:, 1]) * n_nodes + np.maximum(edges[:, 0], edges[:, 1]))
+        valid = (a != d) & (c != b) & ~_contains(edge_keys, first_keys) & ~_contains(edge_keys, second_keys)
+        new_keys = np.sort(np.concatenate([first_keys[valid], second_keys[valid]]))
+        duplicate_keys = new_keys[1:][new_keys[1:] == new_keys[:-1]]
+        valid &= ~_contains(duplicate_keys, first_keys) & ~_contains(duplicate_keys, second_keys)
+        edges[pairs[valid, 0]] = np.column_stack([a, d])[valid]
+        edges[pairs[valid, 1]] = np.column_stack([c, b])[valid]
+    return edges
+
+
+def randomize_graphs(
+    graphs: list[nx.Graph], rng: np.random.Generator | None = None, n_rounds: int = 10
+) -> list[nx.Graph]:
+    """
+    Randomizes graphs by shuffling their edges while preserving the degree sequence.
+
+    All graphs are randomized at once on their edge arrays (see graphs_to_edge_arrays). The new graphs keep the node
+    labels and node attributes; each new edge gets the attributes of a random edge of the original graph.
+
+    :param graphs: original graphs
+    :param rng: random number generator, None draws a fresh seed
+    :param n_rounds: number of swap rounds, every edge takes part in at most one swap per round
+    :returns: randomized graphs with the same degree sequences and node attributes
+    """
+    if len(graphs) == 0:
+        return []
+    rng = np.random.default_rng(rng)
+    node_indptr, edge_indptr, edges, node_labels, edge_attributes = graphs_to_edge_arrays(graphs)
+    edges = _swap_edges(edges, edge_indptr, int(node_indptr[-1]), n_rounds, rng)
+
+    # draw the attributes of all new edges from the edges of the same graph at once
+    edge_counts = np.diff(edge_indptr)
+    graph_of_edge = np.repeat(np.arange(len(graphs)), edge_counts)
+    attribute_sources = edge_indptr[graph_of_edge] + (rng.random(len(edges)) * edge_counts[graph_of_edge]).astype(
+        np.int64
+    )
+
+    local_edges = edges - node_indptr[graph_of_edge][:, None]
+    new_graphs = []
+    for graph, nodes, graph_edges, sources in zip(
+        graphs,
+        node_labels,
+        np.split(local_edges, edge_indptr[1:-1]),
+        np.split(attribute_sources, edge_indptr[1:-1]),
+        strict=True,
+    ):
+        new_graph = nx.Graph()
+        new_graph.graph.update(graph.graph)
+        new_graph.add_nodes_from(graph.nodes(data=True))
+        new_graph.add_edges_from(
+            (nodes[u], nodes[v], edge_attributes[source])
+            for (u, v), source in zip(graph_edges.tolist(), sources.tolist(), strict=True)
+        )
+        new_graphs.append(new_graph)
+    return new_graphs
+
+
+def randomize_graph(original_graph: nx.Graph, rng: np.random.Generator | None = None) -> nx.Graph:
     """
     Randomizes the graph by shuffling the edges while preserving the degree sequence.
 
     :param original_graph: The original graph
+    :param rng: random number generator, None draws a fresh seed
     :return: Randomized graph with the same degree sequence and node attributes
     """
-    # Get the degree sequence from the original graph
-    degree_sequence = [degree for node, degree in original_graph.degree()]
+    return randomize_graphs([original_graph], rng=rng)[0]
 
-    # Generate a new graph with the expected degree sequence
-    new_graph = nx.expected_degree_graph(degree_sequence, seed=1234)
 
-    # Remap nodes to the original labels
-    mapping = dict(zip(new_graph.nodes(), original_graph.nodes(), strict=True))
-    new_graph = nx.relabel_nodes(new_graph, mapping)
+def load_feature_matrix(
+    path: str | Path,
+    index_col: int = 0,
+    drop_columns: list[str] | None = None,
+    transpose: bool = False,
+    cache_dir: str | Path | None = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Reads a feature table from a csv file as identifiers, column names and value matrix.
 
-    # Copy node attributes from the original graph to the new graph
-    for node, data in original_graph.nodes(data=True):
-        new_graph.nodes[node].update(data)
+    If a cache directory is given, the parsed table is stored there as .npy files and subsequent calls memory-map the
+    matrix instead of parsing the csv file again. The cache entry is keyed by size, modification time and content hash
+    of the csv file: if size and modification time are unchanged, the entry is used directly. If only the modification
+    time changed, the content hash decides. Otherwise, the csv file is parsed again and the entry is rewritten.
 
-    # Get the edge attributes from the original graph
-    edge_attributes = list(original_graph.edges(data=True))
+    :param path: path to the csv file
+    :param index_col: column containing the identifiers (after transposing: the column names)
+    :param drop_columns: columns to remove, e.g., ["cellosaurus_id"]
+    :param transpose: whether the identifiers are the columns of the csv file
+    :param cache_dir: directory for the cache, e.g., data/GDSC2/.cache. None disables caching.
+    :returns: identifiers (one per row), column names and the (possibly read-only, memory-mapped) value matrix
+    """
+    path = Path(path)
+    options = {"index_col": index_col, "drop_columns": drop_columns or [], "transpose": transpose}
+    entry = None
+    if cache_dir is not None:
+        entry = Path(cache_dir) / (path.stem + ("_transposed" if transpose else ""))
+        cached = _read_cache_entry(path=path, entry=entry, options=options)
+        if cached is not None:
+            return cached
 
-    # Assign random edge attributes to the new edges
-    for edge in new_graph.edges():
-        random_idx = int(np.random.randint(len(edge_attributes)))
-        _, _, attr = edge_attributes[random_idx]
-        new_graph[edge[0]][edge[1]].update(attr)
+    table = pd.read_csv(path, index_col=index_col)
+    if drop_columns:
+        table = table.drop(columns=drop_columns)
+    if transpose:
+        table = table.T
+    identifiers = _to_numpy_labels(table.index)
+    columns = _to_numpy_labels(table.columns)
+    values = table.to_numpy()
 
-    return new_graph
+    if entry is not None and values.dtype != object:
+        try:
+            _write_cache_entry(path=path, entry=entry, options=options, arrays=(identifiers, columns, values))
+        except OSError as e:
+            warnings.warn(f"Could not write the feature cache for {path}: {e}", stacklevel=2)
+    return identifiers, columns, values
 
 
-def permute_features(
-    features: dict[str, dict[str, Any]],
-    identifiers: np.ndarray,
-    views_to_permute: list[str],
-    all_views: list[str],
-) -> dict:
+def _to_numpy_labels(labels: pd.Index) -> np.ndarray:
     """
-    Permute the specified views for each entity (= cell line or drug).
+    Converts index labels to a numpy array which can be stored without pickling.
 
-    E.g. each cell line gets the feature vector/graph/image... of another cell line.
-    Drawn without replacement.
-    :param features: dictionary of features
-    :param identifiers: array of identifiers
-    :param views_to_permute: list of views to permute
-    :param all_views: list of all views
-    :return: permuted features
+    :param labels: row or column labels
+    :returns: labels as numpy array, strings if they were objects
     """
-    return {
-        entity: {
-            view: (features[entity][view] if view not in views_to_permute else features[other_entity][view])
-            for view in all_views
-        }
-        for entity, other_entity in zip(identifiers, np.random.permutation(identifiers), strict=True)
-    }
+    array = labels.to_numpy()
+    if array.dtype == object:
+        array = array.astype(str)
+    return array
+
+
+def file_hash(path: Path) -> str:
+    """
+    Computes the sha256 hash of a file.
+
+    :param path: path to the file
+    :returns: hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_cache_entry(
+    path: Path, entry: Path, options: dict[str, Any]
+) -> tuple[np.ndarray, np.ndarray, np.ndarray] | None:
+    """
+    Loads a cache entry if it is valid for the current state of the csv file.
+
+    :param path: path to the csv file
+    :param entry: directory of the cache entry
+    :param options: reading options the entry has to be created with
+    :returns: identifiers, column names and memory-mapped matrix, or None if the entry is missing or outdated
+    """
+    source_file = entry / "source.json"
+    if not source_file.exists():
+        return None
+    try:
+        with open(source_file, encoding="utf-8") as f:
+            source = json.load(f)
+        stat = path.stat()
+        if source["options"] != options or source["size"] != stat.st_size:
+            return None
+        if source["mtime_ns"] != stat.st_mtime_ns:
+            # e.g., the file was copied or touched: only accept the entry if the content is unchanged
+            if source["sha256"] != file_hash(path):
+                return None
+            source["mtime_ns"] = stat.st_mtime_ns
+            write_json(source_file, source)
+        return (
+            np.load(entry / "identifiers.npy", allow_pickle=False),
+            np.load(entry / "columns.npy", allow_pickle=False),
+            np.load(entry / "values.npy", mmap_mode="r", allow_pickle=False),
+        )
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _write_cache_entry(
+    path: Path, entry: Path, options: dict[str, Any], arrays: tuple[np.ndarray, np.ndarray, np.ndarray]
+) -> None:
+    """
+    Writes a cache entry. The source information is written last, so partially written entries are never used.
+
+    :param path: path to the csv file
+    :param entry: directory of the cache entry
+    :param options: reading options the entry was created with
+    :param arrays: identifiers, column names and value matrix
+    """
+    entry.mkdir(parents=True, exist_ok=True)
+    source_file = entry / "source.json"
+    source_file.unlink(missing_ok=True)
+    stat = path.stat()
+    for name, array in zip(["identifiers", "columns", "values"], arrays, strict=True):
+        # write to a temporary file first, other processes might read the entry at the same time
+        tmp_file = entry / f"{name}.{os.getpid()}.tmp.npy"
+        np.save(tmp_file, array, allow_pickle=False)
+        os.replace(tmp_file, entry / f"{name}.npy")
+    write_json(
+        source_file,
+        {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_hash(path), "options": options},
+    )
+
+
+def write_json(file: Path, content: dict[str, Any]) -> None:
+    """
+    Atomically writes a json file.
+
+    :param file: path to the json file
+    :param content: content to write
+    """
+    tmp_file = file.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(content, f)
+    os.replace(tmp_file, file)
+
+
+def result_file_suffix(result_format: str) -> str:
+    """
+    Returns the file suffix of a result format.
+
+    :param result_format: one of RESULT_FORMATS, e.g., "parquet"
+    :returns: file suffix, e.g., ".parquet"
+    :raises ValueError: if the result format is unknown
+    """
+    if result_format not in RESULT_FORMATS:
+        raise ValueError(f"Invalid result format {result_format}. Available formats are {list(RESULT_FORMATS)}.")
+    _check_pyarrow(RESULT_FORMATS[result_format])
+    return RESULT_FORMATS[result_format]
+
+
+def _check_pyarrow(suffix: str) -> None:
+    """
+    Checks that pyarrow is installed if the file suffix is that of a Parquet or Feather file.
+
+    :param suffix: file suffix, e.g., ".parquet"
+    :raises ImportError: if pyarrow is needed but not installed
+    """
+    if suffix in [RESULT_FORMATS["parquet"], RESULT_FORMATS["feather"]] and importlib.util.find_spec("pyarrow") is None:
+        raise ImportError(
+            f"--result_format {suffix.lstrip('.')} needs pyarrow to write and read {suffix} files. Install it with "
+            "pip install drevalpy[parquet] or use --result_format csv."
+        )
+
+
+def is_result_file(path: str | Path) -> bool:
+    """
+    Checks whether a file has the suffix of one of the result formats.
+
+    :param path: path to the file
+    :returns: whether the file is a csv, Parquet or Feather file
+    """
+    return Path(path).suffix in RESULT_FORMATS.values()
+
+
+def write_table(table: pd.DataFrame, path: str | Path, index: bool = False) -> None:
+    """
+    Writes a table in the format given by the file suffix, csv for unknown suffixes.
+
+    Parquet and Feather files are written compactly: string columns are stored as categoricals, so every id is stored
+    once per file, and float64 columns as float32. The index is stored as first column, like in csv files.
+
+    :param table: table to write
+    :param path: path to the file, e.g., predictions_split_0.parquet
+    :param index: whether to write the index
+    """
+    suffix = Path(path).suffix
+    _check_pyarrow(suffix)
+    if suffix not in [RESULT_FORMATS["parquet"], RESULT_FORMATS["feather"]]:
+        table.to_csv(path, index=index)
+        return
+    table = table.reset_index(drop=not index)
+    dtypes: dict[Any, Any] = {}
+    for column, values in table.items():
+        if values.dtype == np.float64:
+            dtypes[column] = np.float32
+        elif values.dtype == object and pd.api.types.infer_dtype(values, skipna=True) == "string":
+            dtypes[column] = "category"
+    table = table.astype(dtypes)
+    # both formats need string column names
+    table.columns = table.columns.astype(str)
+    if suffix == RESULT_FORMATS["parquet"]:
+        table.to_parquet(path, index=False)
+    else:
+        table.to_feather(path)
+
+
+def read_table(path: str | Path, index_col: int | None = None) -> pd.DataFrame:
+    """
+    Reads a table written by write_table, the format is given by the file suffix.
+
+    Categorical columns of Parquet and Feather files are returned as object columns, like the columns of csv files.
+
+    :param path: path to the file
+    :param index_col: position of the column to use as index, None for a default index
+    :returns: table
+    """
+    suffix = Path(path).suffix
+    _check_pyarrow(suffix)
+    if suffix == RESULT_FORMATS["parquet"]:
+        table = pd.read_parquet(path)
+    elif suffix == RESULT_FORMATS["feather"]:
+        table = pd.read_feather(path)
+    else:
+        return pd.read_csv(path, index_col=index_col)
+    table = table.astype(
+        {column: object for column, values in table.items() if isinstance(values.dtype, pd.CategoricalDtype)}
+    )
+    if index_col is not None:
+        table = table.set_index(table.columns[index_col])
+        if table.index.name == "index":
+            # unnamed index written by write_table
+            table.index.name = None
+    return table
@@ -4,8 +4,9 @@ import warnings
 
 import numpy as np
 import pandas as pd
-import pingouin as pg
-from scipy.stats import kendalltau, pearsonr, spearmanr
+from scipy import sparse
+from scipy.stats import kendalltau, pearsonr, rankdata, spearmanr
+from scipy.stats import t as t_distribution
 from sklearn import metrics
 
 from .datasets.dataset import DrugResponseDataset
@@ -26,6 +27,9 @@ def partial_correlation(
     """
     Computes the partial correlation between predictions and response, conditioned on cell line and drug.
 
+    Predictions and response are residualized on cell line and drug fixed effects, which is equivalent to regressing
+    them on one-hot encoded cell lines and drugs, and the residuals are correlated.
+
     :param y_pred: predictions
     :param y_true: response
     :param cell_line_ids: cell line IDs
@@ -34,22 +38,21 @@ def partial_correlation(
     :param return_pvalue: whether to return the p-value
     :returns: partial correlation float
     :raises AssertionError: if predictions, response, drug_ids, and cell_line_ids do not have the same length
+    :raises AssertionError: if method is not pearson or spearman
     """
     if len(y_true) < 3:
         return np.nan if not return_pvalue else (np.nan, np.nan)
     if not (len(y_pred) == len(y_true) == len(cell_line_ids) == len(drug_ids)):
         raise AssertionError("predictions, response, drug_ids, and cell_line_ids must have the same length")
+    if method not in ["pearson", "spearman"]:
+        raise AssertionError(f"Invalid method {method}. Choose from pearson, spearman.")
 
-    df = pd.DataFrame(
-        {
-            "response": y_true,
-            "predictions": y_pred,
-            "cell_line_ids": cell_line_ids,
-            "drug_ids": drug_ids,
-        }
-    )
+    y_pred = np.asarray(y_pred, dtype=float)
+    y_true = np.asarray(y_true, dtype=float)
+    cell_line_codes, cell_line_uniques = pd.factorize(np.asarray(cell_line_ids))
+    drug_codes, drug_uniques = pd.factorize(np.asarray(drug_ids))
 
-    if (len(df["cell_line_ids"].unique()) < 2) or (len(df["drug_ids"].unique()) < 2):
+    if (len(cell_line_uniques) < 2) or (len(drug_uniques) < 2):
         # if we don't have more than one cell line or drug in the data, partial correlation is
         # meaningless
         global warning_shown
@@ -61,9 +64,11 @@ def partial_correlation(
     # Check if predictions are nearly constant for each cell line or drug (or both (e.g. mean
     # predictor))
     variance_threshold = 1e-5
-    for group_col in ["cell_line_ids", "drug_ids"]:
-        group_variances = df.groupby(group_col)["predictions"].var()
-        if (group_variances < variance_threshold).all():
+    for group_col, codes, n_groups in [
+        ("cell_line_ids", cell_line_codes, len(cell_line_uniques)),
+        ("drug_ids", drug_codes, len(drug_uniques)),
+    ]:
+        if (_group_variances(y_pred, codes, n_groups) < variance_threshold).all():
             global constant_prediction_warning_shown
             if not constant_prediction_warning_shown:
                 warnings.warn(
@@ -72,28 +77,113 @@ def partial_correlation(
                     stacklevel=2,
                 )
                 constant_prediction_warning_shown = True
-            df["predictions"] = df["predictions"] + np.random.normal(0, 1e-5, size=len(df))
+            y_pred = y_pred + np.random.normal(0, 1e-5, size=len(y_pred))
+
+    # every cell line and drug is a covariate (one-hot encoded), this determines the degrees of freedom
+    n_covariates = len(cell_line_uniques) + len(drug_uniques)
+    finite = np.isfinite(y_pred) & np.isfinite(y_true)
+    n = int(finite.sum())
+    if n < 3:
+        return (np.nan, np.nan) if return_pvalue else np.nan
+    values = np.column_stack([y_pred[finite], y_true[finite]])
+    if method == "spearman":
+        values = np.column_stack([rankdata(values[:, 0]), rankdata(values[:, 1])])
+
+    residuals = _residualize_fixed_effects(
+        values,
+        groupings=[
+            (cell_line_codes[finite], len(cell_line_uniques)),
+            (drug_codes[finite], len(drug_uniques)),
+        ],
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = float(
+            np.clip(
+                residuals[:, 0]
+                @ residuals[:, 1]
+                / np.sqrt((residuals[:, 0] @ residuals[:, 0]) * (residuals[:, 1] @ residuals[:, 1])),
+                -1.0,
+                1.0,
+            )
+        )
+    if not return_pvalue:
+        return r
+    return r, _partial_correlation_pvalue(r, n, n_covariates)
 
-    df["cell_line_ids"] = pd.factorize(df["cell_line_ids"])[0]
-    df["drug_ids"] = pd.factorize(df["drug_ids"])[0]
-    # One-hot encode the categorical covariates
-    df_encoded = pd.get_dummies(df, columns=["cell_line_ids", "drug_ids"], dtype=int)
 
-    if df.shape[0] < 3:
-        r, p = np.nan, np.nan
+def _group_variances(values: np.ndarray, codes: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    Computes the sample variance of the values of every group, ignoring NaN values.
+
+    :param values: values
+    :param codes: group index of every value, in [0, n_groups)
+    :param n_groups: number of groups
+    :returns: variance per group, NaN for groups with less than two values
+    """
+    finite = np.isfinite(values)
+    values, codes = values[finite], codes[finite]
+    counts = np.bincount(codes, minlength=n_groups)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = np.bincount(codes, weights=values, minlength=n_groups) / counts
+        squared_deviations = np.bincount(codes, weights=(values - means[codes]) ** 2, minlength=n_groups)
+        return np.where(counts > 1, squared_deviations / (counts - 1), np.nan)
+
+
+def _residualize_fixed_effects(
+    values: np.ndarray, groupings: list[tuple[np.ndarray, int]], tol: float = 1e-12, max_iter: int = 10000
+) -> np.ndarray:
+    """
+    Removes the intercept and the group effects from the columns of values.
+
+    The residuals of a least-squares fit on the one-hot encoded groups are computed by alternately subtracting the
+    group means of every grouping until they do not change anymore. The group means are computed with sparse
+    indicator matrices instead of dense dummy variables.
+
+    :param values: matrix with one column per variable
+    :param groupings: group index of every row and number of groups, for every grouping (e.g., cell lines and drugs)
+    :param tol: convergence tolerance relative to the largest centered value
+    :param max_iter: maximum number of iterations
+    :returns: residuals with the shape of values
+    """
+    n = values.shape[0]
+    residuals = values - values.mean(axis=0)
+    scale = np.abs(residuals).max()
+    if scale == 0:
+        return residuals
+    indicators = []
+    for codes, n_groups in groupings:
+        indicator = sparse.csr_matrix((np.ones(n), (codes, np.arange(n))), shape=(n_groups, n))
+        counts = np.maximum(np.bincount(codes, minlength=n_groups), 1)
+        indicators.append((codes, indicator, counts))
+    for _ in range(max_iter):
+        previous = residuals
+        for codes, indicator, counts in indicators:
+            residuals = residuals - (indicator @ residuals / counts[:, None])[codes]
+        if np.abs(residuals - previous).max() <= tol * scale:
+            break
     else:
-        result = pg.partial_corr(
-            data=df_encoded,
-            x="predictions",
-            y="response",
-            covar=[col for col in df_encoded.columns if col.startswith("cell_line_ids") or col.startswith("drug_ids")],
-            method=method,
+        warnings.warn(
+            f"Residualization for the partial correlation did not converge within {max_iter} iterations.",
+            stacklevel=3,
         )
-        r = result["r"].iloc[0]
-        p = result["p-val"].iloc[0]
-    if return_pvalue:
-        return r, p
-    return r
+    return residuals
+
+
+def _partial_correlation_pvalue(r: float, n: int, n_covariates: int) -> float:
+    """
+    Computes the two-sided p-value of a partial correlation with a t-test.
+
+    :param r: partial correlation
+    :param n: number of samples
+    :param n_covariates: number of covariates the correlation is conditioned on
+    :returns: p-value, NaN if there are not enough degrees of freedom
+    """
+    dof = n - n_covariates - 2
+    if dof <= 0 or np.isnan(r):
+        return np.nan
+    with np.errstate(divide="ignore"):
+        t_value = r * np.sqrt(dof / (1 - r**2))
+    return float(2 * t_distribution.sf(np.abs(t_value), dof))
 
 
 def _check_constant_prediction(y_pred: np.ndarray) -> bool:
@@ -258,3 +348,203 @@ def evaluate(dataset: DrugResponseDataset, metric: list[str] | str):
                 results[m] = float(AVAILABLE_METRICS[m](y_pred=predictions, y_true=response))
 
     return results
+
+
+@pipeline_function
+def evaluate_per_group(dataset: DrugResponseDataset, group_by: str, metric: list[str] | str) -> pd.DataFrame:
+    """
+    Evaluates the model separately for every drug or cell line.
+
+    Gives the same results as calling evaluate on the subset of every group, but computes all groups at once: the data
+    is sorted by group and the metrics are computed from segment sums and in-group ranks. Groups with missing values
+    are evaluated as NaN. The partial correlation is always NaN, because the drug or cell line is constant in a group.
+
+    :param dataset: dataset to evaluate on
+    :param group_by: "drug" or "cell_line"
+    :param metric: evaluation metric(s), see AVAILABLE_METRICS
+    :returns: table with one row per group, sorted by group ID, and one column per metric
+    :raises AssertionError: if metric is not in AVAILABLE_METRICS
+    :raises ValueError: if group_by is not "drug" or "cell_line"
+    """
+    if isinstance(metric, str):
+        metric = [metric]
+    for m in metric:
+        if m not in AVAILABLE_METRICS:
+            raise AssertionError(f"invalid metric {m}. Available: {list(AVAILABLE_METRICS.keys())}")
+    if dataset.predictions is None:
+        raise AssertionError("No predictions found in the dataset")
+    if group_by not in ["drug", "cell_line"]:
+        raise ValueError(f"Invalid group_by {group_by}. Choose from drug, cell_line.")
+
+    groups, codes = dataset.factorize_ids(group_by)
+    n_groups = len(groups)
+    # stable sort: the rows of a group keep their order, evaluate compares to the first prediction of a group
+    order = np.argsort(codes, kind="stable")
+    codes = codes[order]
+    y_true = np.asarray(dataset.response, dtype=float)[order]
+    y_pred = np.asarray(dataset.predictions, dtype=float)[order]
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    missing = np.bincount(codes, weights=np.isnan(y_true) | np.isnan(y_pred), minlength=n_groups) > 0
+    undefined = (counts < 2) | missing
+    if missing.any():
+        # NaN would propagate to every value computed after it in the sorted order
+        y_true = np.where(undefined[codes], 0.0, y_true)
+        y_pred = np.where(undefined[codes], 0.0, y_pred)
+
+    def segment_sum(values: np.ndarray) -> np.ndarray:
+        return np.bincount(codes, weights=values, minlength=n_groups)
+
+    squared_error = segment_sum((y_true - y_pred) ** 2)
+    results: dict[str, np.ndarray] = {}
+    if {"Pearson", "Spearman", "Kendall"} & set(metric):
+        constant_prediction = _segment_is_constant(y_pred, codes, starts)
+        constant_target = _segment_is_constant(y_true, codes, starts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for m in metric:
+            if m == "MSE":
+                values = squared_error / counts
+            elif m == "RMSE":
+                values = np.sqrt(squared_error / counts)
+            elif m == "MAE":
+                values = segment_sum(np.abs(y_true - y_pred)) / counts
+            elif m == "R^2":
+                centered = y_true - (segment_sum(y_true) / counts)[codes]
+                total = segment_sum(centered**2)
+                # like sklearn: 1 for perfect predictions and 0 for a constant target
+                values = np.where(total != 0, 1 - squared_error / total, np.where(squared_error == 0, 1.0, 0.0))
+            elif m == "Partial_Correlation":
+                values = np.full(n_groups, np.nan)
+            else:
+                if m == "Pearson":
+                    values = _segment_pearson(y_pred, y_true, codes, n_groups)
+                elif m == "Spearman":
+                    values = _segment_pearson(
+                        _segment_ranks(y_pred, codes, starts), _segment_ranks(y_true, codes, starts), codes, n_groups
+                    )
+                else:
+                    values = _segment_kendall(y_pred, y_true, codes, starts, n_groups)
+                # like pearson, spearman and kendall
+                values = np.where(constant_prediction, 0.0, np.where(constant_target, np.nan, values))
+            results[m] = np.where(undefined, np.nan, values)
+    return pd.DataFrame(results, index=pd.Index(groups, name=group_by))
+
+
+def _segment_is_constant(values: np.ndarray, codes: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    Checks for every group whether its values are constant, like _check_constant_prediction.
+
+    :param values: values sorted by group
+    :param codes: group index of every value
+    :param starts: index of the first value of every group
+    :returns: whether the values of a group are close to its first value
+    """
+    tol = 1e-6
+    first = values[starts]
+    max_deviation = np.maximum.reduceat(np.abs(values - first[codes]), starts)
+    # np.isclose(values, first, atol=tol)
+    return max_deviation <= tol + 1e-5 * np.abs(first)
+
+
+def _segment_pearson(x: np.ndarray, y: np.ndarray, codes: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    Computes the pearson correlation of every group.
+
+    :param x: first variable
+    :param y: second variable
+    :param codes: group index of every value
+    :param n_groups: number of groups
+    :returns: pearson correlation per group
+    """
+    counts = np.bincount(codes, minlength=n_groups)
+    x_centered = x - (np.bincount(codes, weights=x, minlength=n_groups) / counts)[codes]
+    y_centered = y - (np.bincount(codes, weights=y, minlength=n_groups) / counts)[codes]
+    sxy = np.bincount(codes, weights=x_centered * y_centered, minlength=n_groups)
+    sxx = np.bincount(codes, weights=x_centered**2, minlength=n_groups)
+    syy = np.bincount(codes, weights=y_centered**2, minlength=n_groups)
+    return np.clip(sxy / np.sqrt(sxx * syy), -1.0, 1.0)
+
+
+def _segment_ranks(values: np.ndarray, codes: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    Ranks the values within their group. Ties get their average rank, like scipy.stats.rankdata.
+
+    :param values: values sorted by group
+    :param codes: group index of every value
+    :param starts: index of the first value of every group
+    :returns: rank of every value within its group, starting at 1
+    """
+    order = np.lexsort((values, codes))
+    sorted_values = values[order]
+    new_run = np.ones(len(values), dtype=bool)
+    new_run[1:] = (sorted_values[1:] != sorted_values[:-1]) | (codes[1:] != codes[:-1])
+    run = np.cumsum(new_run) - 1
+    position = np.arange(1, len(values) + 1) - starts[codes]
+    ranks = np.empty(len(values))
+    ranks[order] = (np.bincount(run, weights=position) / np.bincount(run))[run]
+    return ranks
+
+
+def _segment_tied_pairs(keys: list[np.ndarray], codes: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    Counts the pairs of every group that are tied in all keys.
+
+    :param keys: keys sorted lexicographically within the groups, e.g., [x] or [x, y]
+    :param codes: group index of every value
+    :param n_groups: number of groups
+    :returns: number of tied pairs per group
+    """
+    new_run = np.ones(len(codes), dtype=bool)
+    new_run[1:] = codes[1:] != codes[:-1]
+    for key in keys:
+        new_run[1:] |= key[1:] != key[:-1]
+    run_starts = np.flatnonzero(new_run)
+    run_lengths = np.diff(np.append(run_starts, len(codes)))
+    return np.bincount(codes[run_starts], weights=run_lengths * (run_lengths - 1) / 2, minlength=n_groups)
+
+
+def _segment_kendall(x: np.ndarray, y: np.ndarray, codes: np.ndarray, starts: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    Computes Kendall's tau-b of every group, like scipy.stats.kendalltau.
+
+    The discordant pairs are counted as the inversions of y after sorting by x, with a bottom-up merge sort that
+    merges the runs of all groups at once.
+
+    :param x: first variable, sorted by group
+    :param y: second variable, sorted by group
+    :param codes: group index of every value
+    :param starts: index of the first value of every group
+    :param n_groups: number of groups
+    :returns: Kendall's tau-b per group
+    """
+    counts = np.bincount(codes, minlength=n_groups)
+    order = np.lexsort((y, x, codes))
+    x_sorted, y_sorted = x[order], y[order]
+    x_ties = _segment_tied_pairs([x_sorted], codes, n_groups)
+    joint_ties = _segment_tied_pairs([x_sorted, y_sorted], codes, n_groups)
+    y_order = np.lexsort((y, codes))
+    y_ties = _segment_tied_pairs([y[y_order]], codes, n_groups)
+
+    y_ranks = np.unique(y_sorted, return_inverse=True)[1].astype(np.int64)
+    n_ranks = int(y_ranks.max()) + 1
+    position = np.arange(len(x)) - starts[codes]
+    discordant = np.zeros(n_groups)
+    width = 1
+    while width < counts.max():
+        block = position // width
+        right = block % 2 == 1
+        # runs are sorted by y, keys of the left runs are therefore sorted across all groups
+        merged_block_start = (starts[codes] + (block // 2) * 2 * width).astype(np.int64)
+        keys = merged_block_start * n_ranks + y_ranks
+        left_keys = keys[~right]
+        # number of values in the left run that are greater than a value in the right run
+        greater = np.searchsorted(left_keys, merged_block_start[right] * n_ranks + n_ranks, side="left")
+        greater -= np.searchsorted(left_keys, keys[right], side="right")
+        discordant += np.bincount(codes[right], weights=greater, minlength=n_groups)
+        y_ranks = y_ranks[np.argsort(keys, kind="stable")]
+        width *= 2
+
+    total = counts * (counts - 1) / 2
+    concordant_minus_discordant = total - x_ties - y_ties + joint_ties - 2 * discordant
+    return np.clip(concordant_minus_discordant / np.sqrt(total - x_ties) / np.sqrt(total - y_ties), -1.0, 1.0)
@@ -1,23 +1,29 @@
 """Main module for running the drug response prediction experiment."""
 
 import json
+import math
 import os
 import shutil
 import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
 from typing import Any, Optional
 
 import numpy as np
 import pandas as pd
-import ray
-import torch
-from ray import tune
 from sklearn.base import TransformerMixin
 
 from .datasets.dataset import DrugResponseDataset, FeatureDataset
+from .datasets.utils import read_table, result_file_suffix, write_table
 from .evaluation import evaluate, get_mode
 from .models import MODEL_FACTORY, MULTI_DRUG_MODEL_FACTORY, SINGLE_DRUG_MODEL_FACTORY
 from .models.drp_model import DRPModel
 from .pipeline_function import pipeline_function
+from .tracing import get_tracer, start_tracing, stop_tracing, trace_span
+
+HPAM_SEARCH_STRATEGIES = ["grid", "successive_halving"]
+# time attribute of ASHA: training set fraction relative to the smallest one, i.e., 1, reduction_factor, ...
+BUDGET_STEP = "budget_step"
 
 
 def drug_response_experiment(
@@ -37,6 +43,12 @@ def drug_response_experiment(
     path_out: str = "results/",
     overwrite: bool = False,
     path_data: str = "data",
+    n_jobs: int = 1,
+    cpus_per_trial: int = 1,
+    gpus_per_trial: Optional[float] = None,
+    n_hpam_repeats: int = 1,
+    hpam_search: str = "grid",
+    result_format: str = "csv",
 ) -> None:
     """
     Run the drug response prediction experiment. Save results to disc.
@@ -82,8 +94,30 @@ def drug_response_experiment(
     :param test_mode: test mode one of "LPO", "LCO", "LDO" (leave-pair-out, leave-cell-line-out, leave-drug-out)
     :param overwrite: whether to overwrite existing results
     :param path_data: path to the data directory, usually data/
-    :raises ValueError: if no cv splits are found
+    :param n_jobs: number of CV splits to run in parallel in a local process pool. Default is 1, which runs the
+        splits one after another in this process.
+    :param cpus_per_trial: number of CPUs per raytune trial, only used with multiprocessing. Default is 1.
+    :param gpus_per_trial: number of GPUs per raytune trial, only used with multiprocessing. Default is None, which
+        reserves one GPU per trial if a GPU is available.
+    :param n_hpam_repeats: number of raytune trials per hyperparameter configuration, only used with
+        multiprocessing. Default is 1.
+    :param hpam_search: hyperparameter search strategy. Choose from "grid" and "successive_halving". Default is
+        "grid", which trains every configuration on the full training set. "successive_halving" trains all
+        configurations on a subsample of the training set first and only continues with the most promising ones.
+    :param result_format: file format of the cv splits and predictions, one of RESULT_FORMATS. Default is "csv".
+        "parquet" and "feather" store the ids as categoricals and the values as float32, which makes the files much
+        smaller and faster to read. Both need pyarrow, which is installed with the extra drevalpy[parquet].
+    :raises ValueError: if no cv splits are found, if n_jobs is invalid, if hpam_search or result_format is unknown
     """
+    if hpam_search not in HPAM_SEARCH_STRATEGIES:
+        raise ValueError(
+            f"Invalid hyperparameter search {hpam_search}. Available strategies are {HPAM_SEARCH_STRATEGIES}."
+        )
+    result_file_suffix(result_format)
+    if n_jobs < 1:
+        raise ValueError("n_jobs must be at least 1.")
+    if n_jobs > 1 and multiprocessing:
+        raise ValueError("Parallel CV splits (n_jobs > 1) cannot be combined with raytune (multiprocessing).")
     if baselines is None:
         baselines = []
     cross_study_datasets = cross_study_datasets or []
@@ -94,191 +128,442 @@ def drug_response_experiment(
         # if results exists, delete them if overwrite is True
         print(f"Overwriting existing results at {result_path}")
         shutil.rmtree(result_path)
-
-    if result_folder_exists and os.path.exists(split_path):
-        # if the results exist and overwrite is false, load the cv splits.
-        # The models will be trained on the existing cv splits.
-        print(f"Loading existing cv splits from {split_path}")
-        response_data.load_splits(path=split_path)
-    else:
-        # if the results do not exist, create the cv splits
-        print(f"Creating cv splits at {split_path}")
-
-        os.makedirs(result_path, exist_ok=True)
-
-        response_data.remove_nan_responses()
-        # if this line changes, also change it in pipeline: cv_split.py
-        response_data.split_dataset(
-            n_cv_splits=n_cv_splits,
-            mode=test_mode,
-            split_validation=True,
-            validation_ratio=0.1,
-            random_state=42,
-        )
-        response_data.save_splits(path=split_path)
-
-    model_list = make_model_list(models + baselines, response_data)
-    for model_name in model_list.keys():
-        print(f"Running {model_name}")
-        model_name, drug_id = get_model_name_and_drug_id(model_name)
-
-        model_class = MODEL_FACTORY[model_name]
-        if model_class in baselines:
-            print("- Only Baseline Tests -")
-            is_baseline = True
+    tracer = start_tracing()
+    ray_started = False
+    try:
+        if result_folder_exists and os.path.exists(split_path):
+            # if the results exist and overwrite is false, load the cv splits.
+            # The models will be trained on the existing cv splits.
+            print(f"Loading existing cv splits from {split_path}")
+            with trace_span("split loading", "io"):
+                response_data.load_splits(path=split_path)
         else:
-            print("- Full Test -")
-            is_baseline = False
-
-        predictions_path = generate_data_saving_path(
-            model_name=model_name,
-            drug_id=drug_id,
-            result_path=result_path,
-            suffix="predictions",
-        )
-        hpam_path = generate_data_saving_path(
-            model_name=model_name,
-            drug_id=drug_id,
-            result_path=result_path,
-            suffix="best_hpams",
-        )
-        parent_dir = os.path.dirname(predictions_path)
+            # if the results do not exist, create the cv splits
+            print(f"Creating cv splits at {split_path}")
+
+            os.makedirs(result_path, exist_ok=True)
+
+            with trace_span("split creation", "data", test_mode=test_mode, n_cv_splits=n_cv_splits):
+                response_data.remove_nan_responses()
+                # if this line changes, also change it in pipeline: cv_split.py
+                response_data.split_dataset(
+                    n_cv_splits=n_cv_splits,
+                    mode=test_mode,
+                    split_validation=True,
+                    validation_ratio=0.1,
+                    random_state=42,
+                )
+            with trace_span("write csv", "io"):
+                response_data.save_splits(path=split_path, result_format=result_format)
+
+        model_list = make_model_list(models + baselines, response_data)
+        feature_provider = FeatureProvider(path_data=path_data)
+        # one ray session for all models, splits and (for single drug models) drugs of this experiment
+        if multiprocessing:
+            # ray is imported only when it is used, it takes seconds to import
+            import ray
+
+            ray_started = not ray.is_initialized()
+        if ray_started:
+            init_ray()
+        # with n_jobs > 1, the splits of all models are collected and run in a process pool afterwards
+        parallel_split_inputs: list[dict[str, Any]] = []
+        for model_name in model_list.keys():
+            print(f"Running {model_name}")
+            model_name, drug_id = get_model_name_and_drug_id(model_name)
+
+            model_class = MODEL_FACTORY[model_name]
+            if model_class in baselines:
+                print("- Only Baseline Tests -")
+                is_baseline = True
+            else:
+                print("- Full Test -")
+                is_baseline = False
+
+            predictions_path = generate_data_saving_path(
+                model_name=model_name,
+                drug_id=drug_id,
+                result_path=result_path,
+                suffix="predictions",
+            )
+            hpam_path = generate_data_saving_path(
+                model_name=model_name,
+                drug_id=drug_id,
+                result_path=result_path,
+                suffix="best_hpams",
+            )
+            parent_dir = os.path.dirname(predictions_path)
+
+            model_hpam_set = model_class.get_hyperparameter_set()
+
+            if response_data.cv_splits is None:
+                raise ValueError("No cv splits found.")
+
+            for split_index, split in enumerate(response_data.cv_splits):
+                split_inputs = {
+                    "split": split,
+                    "split_index": split_index,
+                    "n_splits": len(response_data.cv_splits),
+                    "model_name": model_name,
+                    "drug_id": drug_id,
+                    "is_baseline": is_baseline,
+                    "predictions_path": predictions_path,
+                    "hpam_path": hpam_path,
+                    "parent_dir": parent_dir,
+                    "model_hpam_set": model_hpam_set,
+                    "response_transformation": response_transformation,
+                    "test_mode": test_mode,
+                    "metric": metric,
+                    "multiprocessing": multiprocessing,
+                    "ray_path": os.path.abspath(os.path.join(result_path, "raytune")),
+                    "randomization_mode": randomization_mode,
+                    "randomization_type": randomization_type,
+                    "cross_study_datasets": cross_study_datasets,
+                    "n_trials_robustness": n_trials_robustness,
+                    "path_data": path_data,
+                    "cpus_per_trial": cpus_per_trial,
+                    "gpus_per_trial": gpus_per_trial,
+                    "n_hpam_repeats": n_hpam_repeats,
+                    "hpam_search": hpam_search,
+                    "result_format": result_format,
+                }
+                if n_jobs > 1:
+                    parallel_split_inputs.append(split_inputs)
+                else:
+                    with trace_span("fold", "fold", model=model_name, drug=drug_id, split=split_index):
+                        run_cv_split(**split_inputs, feature_provider=feature_provider)
+        if parallel_split_inputs:
+            run_cv_splits_in_parallel(
+                parallel_split_inputs,
+                n_jobs=n_jobs,
+                path_data=path_data,
+                cv_splits=response_data.cv_splits,
+                cross_study_datasets=cross_study_datasets,
+            )
+        with trace_span("consolidate single drug predictions", "io"):
+            consolidate_single_drug_model_predictions(
+                models=models,
+                n_cv_splits=n_cv_splits,
+                results_path=result_path,
+                cross_study_datasets=cross_study_datasets,
+                randomization_mode=randomization_mode,
+                n_trials_robustness=n_trials_robustness,
+                out_path=result_path,
+                result_format=result_format,
+            )
+    finally:
+        # ray is also shut down if the experiment fails, so that its workers do not outlive the experiment
+        if ray_started:
+            ray.shutdown()
+        # the trace is also saved if the experiment fails, it shows the stages up to the failure
+        stop_tracing()
+        tracer.save(result_path)
+    print(f"Time and peak memory per stage (trace saved to {result_path}):")
+    print(tracer.summary().to_string(index=False))
+    print("Done!")
 
-        model_hpam_set = model_class.get_hyperparameter_set()
 
-        if response_data.cv_splits is None:
-            raise ValueError("No cv splits found.")
+def run_cv_split(
+    split: dict[str, DrugResponseDataset],
+    split_index: int,
+    n_splits: int,
+    model_name: str,
+    drug_id: Optional[str],
+    is_baseline: bool,
+    predictions_path: str,
+    hpam_path: str,
+    parent_dir: str,
+    model_hpam_set: list[dict],
+    response_transformation: Optional[TransformerMixin],
+    test_mode: str,
+    metric: str,
+    multiprocessing: bool,
+    ray_path: str,
+    randomization_mode: Optional[list[str]],
+    randomization_type: str,
+    cross_study_datasets: list[DrugResponseDataset],
+    n_trials_robustness: int,
+    path_data: str,
+    feature_provider: Optional["FeatureProvider"] = None,
+    cpus_per_trial: int = 1,
+    gpus_per_trial: Optional[float] = None,
+    n_hpam_repeats: int = 1,
+    hpam_search: str = "grid",
+    result_format: str = "csv",
+) -> None:
+    """
+    Run hyperparameter tuning, final training, cross-study prediction, randomization and robustness tests for one split.
 
-        for split_index, split in enumerate(response_data.cv_splits):
-            print(f"################# FOLD {split_index+1}/{len(response_data.cv_splits)} " f"#################")
+    The results are saved to disc. A split is skipped if its predictions already exist. Splits are independent of each
+    other, so they can be run in parallel, see run_cv_splits_in_parallel.
 
-            prediction_file = os.path.join(predictions_path, f"predictions_split_{split_index}.csv")
+    :param split: dictionary of the CV split
+    :param split_index: index of the split
+    :param n_splits: number of splits, used for logging
+    :param model_name: model name, e.g., SimpleNeuralNetwork
+    :param drug_id: drug id for single drug models, None for global models
+    :param is_baseline: whether the model is a baseline. No randomization or robustness tests are run for baselines.
+    :param predictions_path: directory for the predictions
+    :param hpam_path: directory for the best hyperparameters
+    :param parent_dir: directory for the cross-study, randomization and robustness results
+    :param model_hpam_set: hyperparameter configurations to tune
+    :param response_transformation: normalizer to use for the response data
+    :param test_mode: test mode one of "LPO", "LCO", "LDO" (leave-pair-out, leave-cell-line-out, leave-drug-out)
+    :param metric: metric to use for hyperparameter optimization
+    :param multiprocessing: whether to use raytune for hyperparameter tuning
+    :param ray_path: path to the raytune directory
+    :param randomization_mode: list of randomization modes to do, e.g., ["SVCC", "SVRC"], or None
+    :param randomization_type: type of randomization to use, "permutation" or "invariant"
+    :param cross_study_datasets: list of datasets for the cross-study prediction
+    :param n_trials_robustness: number of trials to run for the robustness test
+    :param path_data: path to the data directory, e.g., data/
+    :param feature_provider: provider of shared features. If None, a new provider is used for this split.
+    :param cpus_per_trial: number of CPUs per raytune trial, only used with multiprocessing
+    :param gpus_per_trial: number of GPUs per raytune trial, only used with multiprocessing. None reserves one GPU per
+        trial if a GPU is available.
+    :param n_hpam_repeats: number of raytune trials per hyperparameter configuration, only used with multiprocessing
+    :param hpam_search: hyperparameter search strategy, one of HPAM_SEARCH_STRATEGIES
+    :param result_format: file format of the predictions, one of RESULT_FORMATS
+    """
+    if feature_provider is None:
+        feature_provider = FeatureProvider(path_data=path_data)
+    model_class = MODEL_FACTORY[model_name]
+    print(f"################# FOLD {split_index+1}/{n_splits} " f"#################")
 
-            hpam_filename = f"best_hpams_split_{split_index}.json"
-            hpam_save_path = os.path.join(hpam_path, hpam_filename)
+    suffix = result_file_suffix(result_format)
+    prediction_file = os.path.join(predictions_path, f"predictions_split_{split_index}{suffix}")
 
-            (
-                train_dataset,
-                validation_dataset,
-                early_stopping_dataset,
-                test_dataset,
-            ) = get_datasets_from_cv_split(split, model_class, model_name, drug_id)
+    hpam_filename = f"best_hpams_split_{split_index}.json"
+    hpam_save_path = os.path.join(hpam_path, hpam_filename)
 
-            model = model_class()
+    (
+        train_dataset,
+        validation_dataset,
+        early_stopping_dataset,
+        test_dataset,
+    ) = get_datasets_from_cv_split(split, model_class, model_name, drug_id)
+
+    model = model_class()
+    cl_features, drug_features = feature_provider.load_features(model, train_dataset.dataset_name)
+
+    if not os.path.isfile(
+        prediction_file
+    ):  # if this split has not been run yet (or for a single drug model, this drug_id)
+
+        tuning_inputs = {
+            "model": model,
+            "train_dataset": train_dataset,
+            "validation_dataset": validation_dataset,
+            "early_stopping_dataset": early_stopping_dataset,
+            "hpam_set": model_hpam_set,
+            "response_transformation": response_transformation,
+            "metric": metric,
+            "path_data": path_data,
+            "cl_features": cl_features,
+            "drug_features": drug_features,
+            "search": hpam_search,
+        }
 
-            if not os.path.isfile(
-                prediction_file
-            ):  # if this split has not been run yet (or for a single drug model, this drug_id)
+        with trace_span("hyperparameter tuning", "tuning", n_configurations=len(model_hpam_set)):
+            if multiprocessing:
+                tuning_inputs["ray_path"] = ray_path
+                tuning_inputs["cpus_per_trial"] = cpus_per_trial
+                tuning_inputs["gpus_per_trial"] = gpus_per_trial
+                tuning_inputs["n_repeats"] = n_hpam_repeats
+                best_hpams = hpam_tune_raytune(**tuning_inputs)
+            else:
+                best_hpams = hpam_tune(**tuning_inputs)
+
+        print(f"Best hyperparameters: {best_hpams}")
+        print("Training model on full train and validation set to predict test set")
+        # save best hyperparameters as json
+        with open(
+            hpam_save_path,
+            "w",
+            encoding="utf-8",
+        ) as f:
+            json.dump(best_hpams, f)
+
+        train_dataset.add_rows(validation_dataset)  # use full train val set data for final training
+        train_dataset.shuffle(random_state=42)
+
+        with trace_span("final training", "training", hpams=best_hpams):
+            test_dataset = train_and_predict(
+                model=model,
+                hpams=best_hpams,
+                path_data=path_data,
+                train_dataset=train_dataset,
+                prediction_dataset=test_dataset,
+                early_stopping_dataset=(early_stopping_dataset if model.early_stopping else None),
+                response_transformation=response_transformation,
+                cl_features=cl_features,
+                drug_features=drug_features,
+            )
 
-                tuning_inputs = {
-                    "model": model,
-                    "train_dataset": train_dataset,
-                    "validation_dataset": validation_dataset,
-                    "early_stopping_dataset": early_stopping_dataset,
-                    "hpam_set": model_hpam_set,
-                    "response_transformation": response_transformation,
-                    "metric": metric,
-                    "path_data": path_data,
-                }
+        for cross_study_dataset in cross_study_datasets:
+            print(f"Cross study prediction on {cross_study_dataset.dataset_name}")
+            cross_study_dataset.remove_nan_responses()
+            cross_study_prediction(
+                dataset=cross_study_dataset,
+                model=model,
+                test_mode=test_mode,
+                train_dataset=train_dataset,
+                path_data=path_data,
+                early_stopping_dataset=(early_stopping_dataset if model.early_stopping else None),
+                response_transformation=response_transformation,
+                path_out=parent_dir,
+                split_index=split_index,
+                single_drug_id=(drug_id if model_name in SINGLE_DRUG_MODEL_FACTORY else None),
+                feature_provider=feature_provider,
+                result_format=result_format,
+            )
 
-                if multiprocessing:
-                    tuning_inputs["ray_path"] = os.path.abspath(os.path.join(result_path, "raytune"))
-                    best_hpams = hpam_tune_raytune(**tuning_inputs)
-                else:
-                    best_hpams = hpam_tune(**tuning_inputs)
-
-                print(f"Best hyperparameters: {best_hpams}")
-                print("Training model on full train and validation set to predict test set")
-                # save best hyperparameters as json
-                with open(
-                    hpam_save_path,
-                    "w",
-                    encoding="utf-8",
-                ) as f:
-                    json.dump(best_hpams, f)
-
-                train_dataset.add_rows(validation_dataset)  # use full train val set data for final training
-                train_dataset.shuffle(random_state=42)
-
-                test_dataset = train_and_predict(
+        with trace_span("write csv", "io"):
+            test_dataset.save(prediction_file)
+    else:
+        print(f"Split {split_index} already exists. Skipping.")
+        with open(
+            hpam_save_path,
+            encoding="utf-8",
+        ) as f:
+            best_hpams = json.load(f)
+    if not is_baseline:
+        if randomization_mode is not None:
+            print(f"Randomization tests for {model_class.get_model_name()}")
+            # if this line changes, it also needs to be changed in pipeline:
+            # randomization_split.py
+            randomization_test_views = get_randomization_test_views(model=model, randomization_mode=randomization_mode)
+            with trace_span("randomization tests", "randomization"):
+                randomization_test(
+                    randomization_test_views=randomization_test_views,
+                    model=model,
+                    hpam_set=best_hpams,
+                    path_data=path_data,
+                    train_dataset=train_dataset,
+                    test_dataset=test_dataset,
+                    early_stopping_dataset=(early_stopping_dataset if model.early_stopping else None),
+                    path_out=parent_dir,
+                    split_index=split_index,
+                    randomization_type=randomization_type,
+                    response_transformation=response_transformation,
+                    cl_features=cl_features,
+                    drug_features=drug_features,
+                    result_format=result_format,
+                )
+        if n_trials_robustness > 0:
+            print(f"Robustness test for {model_class.get_model_name()}")
+            with trace_span("robustness tests", "robustness"):
+                robustness_test(
+                    n_trials=n_trials_robustness,
                     model=model,
-                    hpams=best_hpams,
+                    hpam_set=best_hpams,
                     path_data=path_data,
                     train_dataset=train_dataset,
-                    prediction_dataset=test_dataset,
+                    test_dataset=test_dataset,
                     early_stopping_dataset=(early_stopping_dataset if model.early_stopping else None),
+                    path_out=parent_dir,
+                    split_index=split_index,
                     response_transformation=response_transformation,
+                    cl_features=cl_features,
+                    drug_features=drug_features,
+                    result_format=result_format,
                 )
 
-                for cross_study_dataset in cross_study_datasets:
-                    print(f"Cross study prediction on {cross_study_dataset.dataset_name}")
-                    cross_study_dataset.remove_nan_responses()
-                    cross_study_prediction(
-                        dataset=cross_study_dataset,
-                        model=model,
-                        test_mode=test_mode,
-                        train_dataset=train_dataset,
-                        path_data=path_data,
-                        early_stopping_dataset=(early_stopping_dataset if model.early_stopping else None),
-                        response_transformation=response_transformation,
-                        path_out=parent_dir,
-                        split_index=split_index,
-                        single_drug_id=(drug_id if model_name in SINGLE_DRUG_MODEL_FACTORY else None),
-                    )
 
-                test_dataset.save(prediction_file)
-            else:
-                print(f"Split {split_index} already exists. Skipping.")
-                with open(
-                    hpam_save_path,
-                    encoding="utf-8",
-                ) as f:
-                    best_hpams = json.load(f)
-            if not is_baseline:
-                if randomization_mode is not None:
-                    print(f"Randomization tests for {model_class.get_model_name()}")
-                    # if this line changes, it also needs to be changed in pipeline:
-                    # randomization_split.py
-                    randomization_test_views = get_randomization_test_views(
-                        model=model, randomization_mode=randomization_mode
-                    )
-                    randomization_test(
-                        randomization_test_views=randomization_test_views,
-                        model=model,
-                        hpam_set=best_hpams,
-                        path_data=path_data,
-                        train_dataset=train_dataset,
-                        test_dataset=test_dataset,
-                        early_stopping_dataset=(early_stopping_dataset if model.early_stopping else None),
-                        path_out=parent_dir,
-                        split_index=split_index,
-                        randomization_type=randomization_type,
-                        response_transformation=response_transformation,
-                    )
-                if n_trials_robustness > 0:
-                    print(f"Robustness test for {model_class.get_model_name()}")
-                    robustness_test(
-                        n_trials=n_trials_robustness,
-                        model=model,
-                        hpam_set=best_hpams,
-                        path_data=path_data,
-                        train_dataset=train_dataset,
-                        test_dataset=test_dataset,
-                        early_stopping_dataset=(early_stopping_dataset if model.early_stopping else None),
-                        path_out=parent_dir,
-                        split_index=split_index,
-                        response_transformation=response_transformation,
-                    )
-    consolidate_single_drug_model_predictions(
-        models=models,
-        n_cv_splits=n_cv_splits,
-        results_path=result_path,
-        cross_study_datasets=cross_study_datasets,
-        randomization_mode=randomization_mode,
-        n_trials_robustness=n_trials_robustness,
-        out_path=result_path,
-    )
-    print("Done!")
+_worker_feature_provider: Optional["FeatureProvider"] = None
+# the cv splits and cross-study datasets are sent to every worker once, the jobs only refer to them by split index
+_worker_cv_splits: list[dict[str, DrugResponseDataset]] = []
+_worker_cross_study_datasets: list[DrugResponseDataset] = []
+# keyword arguments of run_cv_split that are shared by all jobs and not sent with every job
+_SHARED_SPLIT_INPUTS = ("split", "cross_study_datasets")
+
+
+def _init_cv_split_worker(
+    path_data: str, cv_splits: list[dict[str, DrugResponseDataset]], cross_study_datasets: list[DrugResponseDataset]
+) -> None:
+    """
+    Sets up a worker process and starts tracing.
+
+    The feature provider, the cv splits and the cross-study datasets are shared by all splits the worker runs.
+
+    :param path_data: path to the data directory, e.g., data/
+    :param cv_splits: cv splits of the response data
+    :param cross_study_datasets: datasets for the cross-study prediction
+    """
+    global _worker_feature_provider, _worker_cv_splits, _worker_cross_study_datasets
+    _worker_feature_provider = FeatureProvider(path_data=path_data)
+    _worker_cv_splits = cv_splits
+    _worker_cross_study_datasets = cross_study_datasets
+    start_tracing()
+
+
+def _run_cv_split_in_worker(split_inputs: dict[str, Any]) -> list[dict[str, Any]]:
+    """
+    Runs a split in a worker process.
+
+    :param split_inputs: keyword arguments for run_cv_split without the split and the cross-study datasets, which
+        the worker already holds
+    :returns: trace events of the split, they are merged into the trace of the main process
+    """
+    with trace_span(
+        "fold",
+        "fold",
+        model=split_inputs["model_name"],
+        drug=split_inputs["drug_id"],
+        split=split_inputs["split_index"],
+    ):
+        run_cv_split(
+            **split_inputs,
+            split=_worker_cv_splits[split_inputs["split_index"]],
+            cross_study_datasets=_worker_cross_study_datasets,
+            feature_provider=_worker_feature_provider,
+        )
+    tracer = get_tracer()
+    return tracer.drain_events() if tracer is not None else []
+
+
+def run_cv_splits_in_parallel(
+    split_inputs: list[dict[str, Any]],
+    n_jobs: int,
+    path_data: str,
+    cv_splits: list[dict[str, DrugResponseDataset]],
+    cross_study_datasets: list[DrugResponseDataset],
+) -> None:
+    """
+    Run CV splits in a local process pool.
+
+    Every split writes its results to separate files, so the output layout and the skipping of existing splits are the
+    same as for sequential runs. Worker processes are spawned (not forked) because forking processes with initialized
+    torch or ray state is not safe. The cv splits and cross-study datasets are pickled once per worker, not once per
+    job: a single drug model has one job per drug and split, which each select their drug from the split.
+
+    :param split_inputs: keyword arguments for run_cv_split, one dictionary per split. The split and the cross-study
+        datasets of the dictionaries are ignored, the split is taken from cv_splits by the split index.
+    :param n_jobs: number of worker processes
+    :param path_data: path to the data directory, e.g., data/
+    :param cv_splits: cv splits of the response data
+    :param cross_study_datasets: datasets for the cross-study prediction
+    """
+    print(f"Running {len(split_inputs)} splits with {n_jobs} parallel jobs")
+    with ProcessPoolExecutor(
+        max_workers=n_jobs,
+        mp_context=get_context("spawn"),
+        initializer=_init_cv_split_worker,
+        initargs=(path_data, cv_splits, cross_study_datasets),
+    ) as executor:
+        futures = [
+            executor.submit(
+                _run_cv_split_in_worker,
+                {key: value for key, value in inputs.items() if key not in _SHARED_SPLIT_INPUTS},
+            )
+            for inputs in split_inputs
+        ]
+        for future in as_completed(futures):
+            # re-raises exceptions of the workers
+            events = future.result()
+            tracer = get_tracer()
+            if tracer is not None:
+                tracer.add_events(events)
 
 
 @pipeline_function
@@ -290,6 +575,7 @@ def consolidate_single_drug_model_predictions(
     randomization_mode: Optional[list[str]] = None,
     n_trials_robustness: int = 0,
     out_path: str = "",
+    result_format: str = "csv",
 ) -> None:
     """
     Consolidate single drug model predictions into a single file.
@@ -302,7 +588,9 @@ def consolidate_single_drug_model_predictions(
     :param n_trials_robustness: number of robustness trials, e.g., 10
     :param out_path: for the package, this is the same as results_path. For the pipeline, this is empty because it
         will be stored in the work directory.
+    :param result_format: file format of the predictions, one of RESULT_FORMATS
     """
+    suffix = result_file_suffix(result_format)
     for model in models:
         if model.get_model_name() in SINGLE_DRUG_MODEL_FACTORY:
 
@@ -337,11 +625,11 @@ def consolidate_single_drug_model_predictions(
 
                     # Main predictions
                     predictions["main"].append(
-                        pd.read_csv(
+                        read_table(
                             os.path.join(
                                 single_drug_prediction_path,
                                 "predictions",
-                                f"predictions_split_{split}.csv",
+                                f"predictions_split_{split}{suffix}",
                             ),
                             index_col=0,
                         )
@@ -350,11 +638,11 @@ def consolidate_single_drug_model_predictions(
                     # Cross study predictions
                     for cross_study_dataset in cross_study_datasets:
                         cross_study_prediction_path = os.path.join(single_drug_prediction_path, "cross_study")
-                        f = f"cross_study_{cross_study_dataset.dataset_name}_split_{split}.csv"
+                        f = f"cross_study_{cross_study_dataset.dataset_name}_split_{split}{suffix}"
                         if cross_study_dataset.dataset_name not in predictions["cross_study"]:
                             predictions["cross_study"][cross_study_dataset.dataset_name] = []
                         predictions["cross_study"][cross_study_dataset.dataset_name].append(
-                            pd.read_csv(
+                            read_table(
                                 os.path.join(cross_study_prediction_path, f),
                                 index_col=0,
                             )
@@ -363,11 +651,11 @@ def consolidate_single_drug_model_predictions(
                     # Robustness predictions
                     for trial in range(n_trials_robustness):
                         robustness_path = os.path.join(single_drug_prediction_path, "robustness")
-                        f = f"robustness_{trial+1}_split_{split}.csv"
+                        f = f"robustness_{trial+1}_split_{split}{suffix}"
                         if trial not in predictions["robustness"]:
                             predictions["robustness"][trial] = []
                         predictions["robustness"][trial].append(
-                            pd.read_csv(os.path.join(robustness_path, f), index_col=0)
+                            read_table(os.path.join(robustness_path, f), index_col=0)
                         )
 
                     # Randomization predictions
@@ -378,53 +666,119 @@ def consolidate_single_drug_model_predictions(
                         )
                         for view in randomization_test_views:
                             randomization_path = os.path.join(single_drug_prediction_path, "randomization")
-                            f = f"randomization_{view}_split_{split}.csv"
+                            f = f"randomization_{view}_split_{split}{suffix}"
                             if view not in predictions["randomization"]:
                                 predictions["randomization"][view] = []
                             predictions["randomization"][view].append(
-                                pd.read_csv(
+                                read_table(
                                     os.path.join(randomization_path, f),
                                     index_col=0,
                                 )
                             )
 
                 # Save the consolidated predictions
-                pd.concat(predictions["main"], axis=0).to_csv(
+                write_table(
+                    pd.concat(predictions["main"], axis=0),
                     os.path.join(
                         out_path,
                         "predictions",
-                        f"predictions_split_{split}.csv",
-                    )
+                        f"predictions_split_{split}{suffix}",
+                    ),
+                    index=True,
                 )
 
                 for dataset_name, dataset_predictions in predictions["cross_study"].items():
-                    pd.concat(dataset_predictions, axis=0).to_csv(
+                    write_table(
+                        pd.concat(dataset_predictions, axis=0),
                         os.path.join(
                             out_path,
                             "cross_study",
-                            f"cross_study_{dataset_name}_split_{split}.csv",
-                        )
+                            f"cross_study_{dataset_name}_split_{split}{suffix}",
+                        ),
+                        index=True,
                     )
 
                 for trial, trial_predictions in predictions["robustness"].items():
-                    pd.concat(trial_predictions, axis=0).to_csv(
+                    write_table(
+                        pd.concat(trial_predictions, axis=0),
                         os.path.join(
                             out_path,
                             "robustness",
-                            f"robustness_{trial+1}_split_{split}.csv",
-                        )
+                            f"robustness_{trial+1}_split_{split}{suffix}",
+                        ),
+                        index=True,
                     )
 
                 for view, view_predictions in predictions["randomization"].items():
-                    pd.concat(view_predictions, axis=0).to_csv(
+                    write_table(
+                        pd.concat(view_predictions, axis=0),
                         os.path.join(
                             out_path,
                             "randomization",
-                            f"randomization_{view}_split_{split}.csv",
-                        )
+                            f"randomization_{view}_split_{split}{suffix}",
+                        ),
+                        index=True,
                     )
 
 
+class FeatureProvider:
+    """
+    Loads the features of every (model feature specification, dataset) combination only once per experiment.
+
+    The feature specification of a model consists of its feature loading methods and its views, so models with the
+    same features (e.g., ElasticNet and RandomForest) share them. The loaded FeatureDatasets are shared between
+    hyperparameter tuning, final training, cross-study prediction, randomization and robustness tests of all CV
+    splits (and all drugs of single drug models). They are copy-on-write: train_and_predict trains on a cheap copy,
+    so models transforming their input features in place do not change the shared instances.
+    """
+
+    def __init__(self, path_data: str):
+        """
+        Initializes the feature provider.
+
+        :param path_data: path to the data directory, e.g., data/
+        """
+        self.path_data = path_data
+        self._cell_line_features: dict[tuple, Optional[FeatureDataset]] = {}
+        self._drug_features: dict[tuple, Optional[FeatureDataset]] = {}
+
+    def load_features(
+        self, model: DRPModel, dataset_name: str
+    ) -> tuple[Optional[FeatureDataset], Optional[FeatureDataset]]:
+        """
+        Returns the cell line and drug features of a model for a dataset, loading them on first use.
+
+        :param model: model to load the features for, e.g., SimpleNeuralNetwork
+        :param dataset_name: name of the dataset, e.g., GDSC2
+        :returns: tuple of cell line and, potentially, drug features. They are copy-on-write copies of the shared
+            features, so the caller may modify them.
+        """
+        cell_line_key = (type(model).load_cell_line_features, tuple(model.cell_line_views), dataset_name)
+        if cell_line_key not in self._cell_line_features:
+            with trace_span("load features", "data", entity="cell line", dataset=dataset_name):
+                cl_features = model.load_cell_line_features(data_path=self.path_data, dataset_name=dataset_name)
+            self._cell_line_features[cell_line_key] = cl_features
+        drug_key = (type(model).load_drug_features, tuple(model.drug_views), dataset_name)
+        if drug_key not in self._drug_features:
+            with trace_span("load features", "data", entity="drug", dataset=dataset_name):
+                drug_features = model.load_drug_features(data_path=self.path_data, dataset_name=dataset_name)
+            self._drug_features[drug_key] = drug_features
+        return (
+            _copy_on_write(self._cell_line_features[cell_line_key]),
+            _copy_on_write(self._drug_features[drug_key]),
+        )
+
+
+def _copy_on_write(features: Optional[FeatureDataset]) -> Optional[FeatureDataset]:
+    """
+    Returns a copy-on-write copy of the features, see FeatureDataset.copy_on_write.
+
+    :param features: features, may be None for models without cell line or drug features
+    :returns: copy-on-write copy or None
+    """
+    return features.copy_on_write() if features is not None else None
+
+
 def load_features(
     model: DRPModel, path_data: str, dataset: DrugResponseDataset
 ) -> tuple[FeatureDataset, Optional[FeatureDataset]]:
@@ -436,8 +790,9 @@ def load_features(
     :param dataset: dataset to load features for, e.g., GDSC2
     :returns: tuple of cell line and, potentially, drug features
     """
-    cl_features = model.load_cell_line_features(data_path=path_data, dataset_name=dataset.dataset_name)
-    drug_features = model.load_drug_features(data_path=path_data, dataset_name=dataset.dataset_name)
+    with trace_span("load features", "data", dataset=dataset.dataset_name):
+        cl_features = model.load_cell_line_features(data_path=path_data, dataset_name=dataset.dataset_name)
+        drug_features = model.load_drug_features(data_path=path_data, dataset_name=dataset.dataset_name)
     return cl_features, drug_features
 
 
@@ -453,6 +808,8 @@ def cross_study_prediction(
     path_out: str,
     split_index: int,
     single_drug_id: Optional[str] = None,
+    feature_provider: Optional[FeatureProvider] = None,
+    result_format: str = "csv",
 ) -> None:
     """
     Run the drug response prediction experiment on a cross-study dataset to assess the generalizability of the model.
@@ -468,6 +825,8 @@ def cross_study_prediction(
     :param path_out: path to the output directory, e.g., results/
     :param split_index: index of the split
     :param single_drug_id: drug id to use for single drug models None for global models
+    :param feature_provider: provider of shared features. If None, the features are loaded from disk.
+    :param result_format: file format of the predictions, one of RESULT_FORMATS
     :raises ValueError: if feature loading fails or if the test mode is invalid
     """
     dataset = dataset.copy()
@@ -477,7 +836,10 @@ def cross_study_prediction(
 
     # load features
     try:
-        cl_features, drug_features = load_features(model, path_data, dataset)
+        if feature_provider is not None:
+            cl_features, drug_features = feature_provider.load_features(model, dataset.dataset_name)
+        else:
+            cl_features, drug_features = load_features(model, path_data, dataset)
     except ValueError as e:
         warnings.warn(str(e), stacklevel=2)
         return
@@ -498,7 +860,8 @@ def cross_study_prediction(
 
     # making sure there are no missing features. Only keep cell lines and drugs for which we have
     # a feature representation
-    dataset.reduce_to(cell_line_ids=cell_lines_to_keep, drug_ids=drugs_to_keep)
+    with trace_span("reduce_to", "data"):
+        dataset.reduce_to(cell_line_ids=cell_lines_to_keep, drug_ids=drugs_to_keep)
     if early_stopping_dataset is not None:
         train_dataset.add_rows(early_stopping_dataset)
     # remove rows which overlap in the training. depends on the test mode
@@ -525,23 +888,25 @@ def cross_study_prediction(
         raise ValueError(f"Invalid test mode: {test_mode}. Choose from LPO, LCO, LDO")
     if len(dataset) > 0:
         dataset.shuffle(random_state=42)
-        dataset._predictions = model.predict(
-            cell_line_ids=dataset.cell_line_ids,
-            drug_ids=dataset.drug_ids,
-            cell_line_input=cl_features,
-            drug_input=drug_features,
-        )
+        with trace_span("predict", "model", dataset=dataset.dataset_name):
+            dataset._predictions = model.predict(
+                cell_line_ids=dataset.cell_line_ids,
+                drug_ids=dataset.drug_ids,
+                cell_line_input=cl_features,
+                drug_input=drug_features,
+            )
         if response_transformation:
             dataset._response = response_transformation.inverse_transform(dataset.response)
     else:
         dataset._predictions = np.array([])
-    dataset.save(
-        os.path.join(
-            path_out,
-            "cross_study",
-            f"cross_study_{dataset.dataset_name}_split_{split_index}.csv",
+    with trace_span("write csv", "io"):
+        dataset.save(
+            os.path.join(
+                path_out,
+                "cross_study",
+                f"cross_study_{dataset.dataset_name}_split_{split_index}{result_file_suffix(result_format)}",
+            )
         )
-    )
 
 
 @pipeline_function
@@ -588,6 +953,9 @@ def robustness_test(
     path_out: str,
     split_index: int,
     response_transformation: Optional[TransformerMixin] = None,
+    cl_features: Optional[FeatureDataset] = None,
+    drug_features: Optional[FeatureDataset] = None,
+    result_format: str = "csv",
 ):
     """
     Run robustness tests for the given model and dataset.
@@ -605,6 +973,9 @@ def robustness_test(
     :param split_index: index of the split
     :param response_transformation: sklearn.preprocessing scaler like StandardScaler or MinMaxScaler to use to scale
         the target
+    :param cl_features: shared cell line features. If None, they are loaded from disk.
+    :param drug_features: shared drug features. If None, they are loaded from disk.
+    :param result_format: file format of the predictions, one of RESULT_FORMATS
     """
     robustness_test_path = os.path.join(path_out, "robustness")
     os.makedirs(robustness_test_path, exist_ok=True)
@@ -612,7 +983,7 @@ def robustness_test(
         print(f"Running robustness test trial {trial+1}/{n_trials}")
         trial_file = os.path.join(
             robustness_test_path,
-            f"robustness_{trial+1}_split_{split_index}.csv",
+            f"robustness_{trial+1}_split_{split_index}{result_file_suffix(result_format)}",
         )
         if not os.path.isfile(trial_file):
             robustness_train_predict(
@@ -625,6 +996,8 @@ def robustness_test(
                 hpam_set=hpam_set,
                 path_data=path_data,
                 response_transformation=response_transformation,
+                cl_features=cl_features,
+                drug_features=drug_features,
             )
 
 
@@ -639,6 +1012,8 @@ def robustness_train_predict(
     hpam_set: dict,
     path_data: str,
     response_transformation: Optional[TransformerMixin] = None,
+    cl_features: Optional[FeatureDataset] = None,
+    drug_features: Optional[FeatureDataset] = None,
 ):
     """
     Train and predict for the robustness test.
@@ -652,6 +1027,8 @@ def robustness_train_predict(
     :param hpam_set: hyperparameters to use
     :param path_data: path to the data directory, e.g., data/
     :param response_transformation: sklearn.preprocessing scaler like StandardScaler or MinMaxScaler to use to scale
+    :param cl_features: shared cell line features. If None, they are loaded from disk.
+    :param drug_features: shared drug features. If None, they are loaded from disk.
     """
     train_dataset.shuffle(random_state=trial)
     test_dataset.shuffle(random_state=trial)
@@ -665,8 +1042,11 @@ def robustness_train_predict(
         prediction_dataset=test_dataset,
         early_stopping_dataset=early_stopping_dataset,
         response_transformation=response_transformation,
+        cl_features=cl_features,
+        drug_features=drug_features,
     )
-    test_dataset.save(trial_file)
+    with trace_span("write csv", "io"):
+        test_dataset.save(trial_file)
 
 
 def randomization_test(
@@ -681,6 +1061,9 @@ def randomization_test(
     split_index: int,
     randomization_type: str = "permutation",
     response_transformation=Optional[TransformerMixin],
+    cl_features: Optional[FeatureDataset] = None,
+    drug_features: Optional[FeatureDataset] = None,
+    result_format: str = "csv",
 ) -> None:
     """
     Run randomization tests for the given model and dataset.
@@ -705,6 +1088,9 @@ def randomization_test(
         instance, for networks it is the degree distribution.
     :param response_transformation: sklearn.preprocessing scaler like StandardScaler or MinMaxScaler
         to use to scale the target
+    :param cl_features: shared cell line features. If None, they are loaded from disk.
+    :param drug_features: shared drug features. If None, they are loaded from disk.
+    :param result_format: file format of the predictions, one of RESULT_FORMATS
     """
     for test_name, views in randomization_test_views.items():
         randomization_test_path = os.path.join(path_out, "randomization")
@@ -712,7 +1098,7 @@ def randomization_test(
 
         randomization_test_file = os.path.join(
             randomization_test_path,
-            f"randomization_{test_name}_split_{split_index}.csv",
+            f"randomization_{test_name}_split_{split_index}{result_file_suffix(result_format)}",
         )
         if not os.path.isfile(randomization_test_file):  # if this splits test has not been run yet
             for view in views:
@@ -729,6 +1115,9 @@ def randomization_test(
                     test_dataset=test_dataset,
                     early_stopping_dataset=early_stopping_dataset,
                     response_transformation=response_transformation,
+                    cl_features=cl_features,
+                    drug_features=drug_features,
+                    random_state=split_index,
                 )
         else:
             print(f"Randomization test {test_name} already exists. Skipping.")
@@ -747,6 +1136,9 @@ def randomize_train_predict(
     test_dataset: DrugResponseDataset,
     early_stopping_dataset: Optional[DrugResponseDataset],
     response_transformation: Optional[TransformerMixin],
+    cl_features: Optional[FeatureDataset] = None,
+    drug_features: Optional[FeatureDataset] = None,
+    random_state: Optional[int] = None,
 ) -> None:
     """
     Randomize the features for a given view and run the model.
@@ -762,8 +1154,12 @@ def randomize_train_predict(
     :param test_dataset: test dataset
     :param early_stopping_dataset: early stopping dataset
     :param response_transformation: sklearn.preprocessing scaler like StandardScaler or MinMaxScaler to use to scale
+    :param cl_features: shared cell line features. If both are None, the features are loaded from disk.
+    :param drug_features: shared drug features. If both are None, the features are loaded from disk.
+    :param random_state: seed of the randomization, e.g., the index of the cross validation split
     """
-    cl_features, drug_features = load_features(model, path_data, train_dataset)
+    if cl_features is None and drug_features is None:
+        cl_features, drug_features = load_features(model, path_data, train_dataset)
 
     # Handle case where both features are None early on
     if cl_features is None and drug_features is None:
@@ -784,14 +1180,19 @@ def randomize_train_predict(
         return
 
     cl_features_rand: Optional[FeatureDataset] = None
-    if cl_features is not None:
-        cl_features_rand = cl_features.copy()
-        cl_features_rand.randomize_features(view, randomization_type=randomization_type)  # type: ignore[union-attr]
-
     drug_features_rand: Optional[FeatureDataset] = None
-    if drug_features is not None:
-        drug_features_rand = drug_features.copy()
-        drug_features_rand.randomize_features(view, randomization_type=randomization_type)  # type: ignore[union-attr]
+    # the randomized copies share all views but the randomized one with the original features
+    with trace_span("randomize features", "data", view=view, randomization_type=randomization_type):
+        if cl_features is not None:
+            cl_features_rand = cl_features.copy_on_write()
+            cl_features_rand.randomize_features(  # type: ignore[union-attr]
+                view, randomization_type=randomization_type, random_state=random_state
+            )
+        if drug_features is not None:
+            drug_features_rand = drug_features.copy_on_write()
+            drug_features_rand.randomize_features(  # type: ignore[union-attr]
+                view, randomization_type=randomization_type, random_state=random_state
+            )
 
     test_dataset_rand = train_and_predict(
         model=model,
@@ -804,7 +1205,8 @@ def randomize_train_predict(
         cl_features=cl_features_rand,
         drug_features=drug_features_rand,
     )
-    test_dataset_rand.save(randomization_test_file)
+    with trace_span("write csv", "io"):
+        test_dataset_rand.save(randomization_test_file)
 
 
 def split_early_stopping(
@@ -852,20 +1254,94 @@ def train_and_predict(
     :param prediction_dataset: prediction dataset
     :param early_stopping_dataset: early stopping dataset, optional
     :param response_transformation: normalizer to use for the response data, e.g., StandardScaler
-    :param cl_features: cell line features
-    :param drug_features: drug features
+    :param cl_features: cell line features. They are not modified, the model works on the copy-on-write copies
+        returned by DRPModel.get_preprocessed_features.
+    :param drug_features: drug features. They are not modified, the model works on the copy-on-write copies
+        returned by DRPModel.get_preprocessed_features.
     :returns: prediction dataset with predictions
-    :raises ValueError: if train_dataset does not have a dataset_name
     """
     model.build_model(hyperparameters=hpams)
+    cl_features, drug_features = prepare_training(
+        model=model,
+        path_data=path_data,
+        train_dataset=train_dataset,
+        prediction_dataset=prediction_dataset,
+        early_stopping_dataset=early_stopping_dataset,
+        response_transformation=response_transformation,
+        cl_features=cl_features,
+        drug_features=drug_features,
+    )
+    # the preprocessing is fitted once per training data, e.g., for all hyperparameter configurations of a split
+    with trace_span("preprocess", "data"):
+        cl_features, drug_features = model.get_preprocessed_features(
+            hyperparameters=hpams,
+            output=train_dataset,
+            cell_line_input=cl_features,
+            drug_input=drug_features,
+            output_earlystopping=early_stopping_dataset,
+        )
+
+    print("Training model ...")
+    with trace_span("train", "model", n_samples=len(train_dataset)):
+        model.train(
+            output=train_dataset,
+            cell_line_input=cl_features,
+            drug_input=drug_features,
+            output_earlystopping=early_stopping_dataset,
+        )
+    if len(prediction_dataset) > 0:
+        with trace_span("predict", "model", n_samples=len(prediction_dataset)):
+            prediction_dataset._predictions = model.predict(
+                cell_line_ids=prediction_dataset.cell_line_ids,
+                drug_ids=prediction_dataset.drug_ids,
+                cell_line_input=cl_features,
+                drug_input=drug_features,
+            )
+
+        if response_transformation:
+            prediction_dataset.inverse_transform(response_transformation)
+    else:
+        prediction_dataset._predictions = np.array([])
+
+    return prediction_dataset
+
+
+def prepare_training(
+    model: DRPModel,
+    path_data: str,
+    train_dataset: DrugResponseDataset,
+    prediction_dataset: DrugResponseDataset,
+    early_stopping_dataset: Optional[DrugResponseDataset] = None,
+    response_transformation: Optional[TransformerMixin] = None,
+    cl_features: Optional[FeatureDataset] = None,
+    drug_features: Optional[FeatureDataset] = None,
+) -> tuple[FeatureDataset, Optional[FeatureDataset]]:
+    """
+    Load the features and reduce and transform the datasets in place before training.
+
+    :param model: model to use, e.g., SimpleNeuralNetwork
+    :param path_data: path to the data directory, e.g., data/
+    :param train_dataset: training dataset
+    :param prediction_dataset: prediction dataset
+    :param early_stopping_dataset: early stopping dataset, optional
+    :param response_transformation: normalizer to use for the response data, e.g., StandardScaler
+    :param cl_features: cell line features. If None, they are loaded from disk. They are not copied, the model works
+        on the copies returned by DRPModel.get_preprocessed_features.
+    :param drug_features: drug features. If None, they are loaded from disk. They are not copied, the model works on
+        the copies returned by DRPModel.get_preprocessed_features.
+    :returns: cell line features and drug features to preprocess
+    :raises ValueError: if train_dataset does not have a dataset_name
+    """
     if train_dataset.dataset_name is None:
         raise ValueError("train_dataset must have a dataset_name")
     if cl_features is None:
         print("Loading cell line features ...")
-        cl_features = model.load_cell_line_features(data_path=path_data, dataset_name=train_dataset.dataset_name)
+        with trace_span("load features", "data", entity="cell line", dataset=train_dataset.dataset_name):
+            cl_features = model.load_cell_line_features(data_path=path_data, dataset_name=train_dataset.dataset_name)
     if drug_features is None:
         print("Loading drug features ...")
-        drug_features = model.load_drug_features(data_path=path_data, dataset_name=train_dataset.dataset_name)
+        with trace_span("load features", "data", entity="drug", dataset=train_dataset.dataset_name):
+            drug_features = model.load_drug_features(data_path=path_data, dataset_name=train_dataset.dataset_name)
 
     cell_lines_to_keep = cl_features.identifiers if cl_features is not None else None
     drugs_to_keep = drug_features.identifiers if drug_features is not None else None
@@ -876,11 +1352,12 @@ def train_and_predict(
     print(f"Number of cell lines in features: {len(cell_lines_to_keep)}")
     if drugs_to_keep is not None:
         print(f"Number of drugs in features: {len(drugs_to_keep)}")
-    print(f"Number of cell lines in train dataset: {len(np.unique(train_dataset.cell_line_ids))}")
-    print(f"Number of drugs in train dataset: {len(np.unique(train_dataset.drug_ids))}")
+    print(f"Number of cell lines in train dataset: {len(train_dataset.factorize_ids('cell_line')[0])}")
+    print(f"Number of drugs in train dataset: {len(train_dataset.factorize_ids('drug')[0])}")
 
-    train_dataset.reduce_to(cell_line_ids=cell_lines_to_keep, drug_ids=drugs_to_keep)
-    prediction_dataset.reduce_to(cell_line_ids=cell_lines_to_keep, drug_ids=drugs_to_keep)
+    with trace_span("reduce_to", "data"):
+        train_dataset.reduce_to(cell_line_ids=cell_lines_to_keep, drug_ids=drugs_to_keep)
+        prediction_dataset.reduce_to(cell_line_ids=cell_lines_to_keep, drug_ids=drugs_to_keep)
     print(f"Reduced training dataset from {len_train_before} to {len(train_dataset)}, because of missing features")
     print(
         f"Reduced prediction dataset from {len_pred_before} to {len(prediction_dataset)}, because of missing features"
@@ -888,36 +1365,18 @@ def train_and_predict(
 
     if early_stopping_dataset is not None:
         len_es_before = len(early_stopping_dataset)
-        early_stopping_dataset.reduce_to(cell_line_ids=cell_lines_to_keep, drug_ids=drugs_to_keep)
+        with trace_span("reduce_to", "data"):
+            early_stopping_dataset.reduce_to(cell_line_ids=cell_lines_to_keep, drug_ids=drugs_to_keep)
         print(f"Reduced early stopping dataset from {len_es_before} to {len(early_stopping_dataset)}")
 
     if response_transformation:
-        train_dataset.fit_transform(response_transformation)
-        if early_stopping_dataset is not None:
-            early_stopping_dataset.transform(response_transformation)
-        prediction_dataset.transform(response_transformation)
+        with trace_span("fit_transform", "data"):
+            train_dataset.fit_transform(response_transformation)
+            if early_stopping_dataset is not None:
+                early_stopping_dataset.transform(response_transformation)
+            prediction_dataset.transform(response_transformation)
 
-    print("Training model ...")
-    model.train(
-        output=train_dataset,
-        cell_line_input=cl_features,
-        drug_input=drug_features,
-        output_earlystopping=early_stopping_dataset,
-    )
-    if len(prediction_dataset) > 0:
-        prediction_dataset._predictions = model.predict(
-            cell_line_ids=prediction_dataset.cell_line_ids,
-            drug_ids=prediction_dataset.drug_ids,
-            cell_line_input=cl_features,
-            drug_input=drug_features,
-        )
-
-        if response_transformation:
-            prediction_dataset.inverse_transform(response_transformation)
-    else:
-        prediction_dataset._predictions = np.array([])
-
-    return prediction_dataset
+    return cl_features, drug_features
 
 
 def train_and_evaluate(
@@ -929,6 +1388,8 @@ def train_and_evaluate(
     early_stopping_dataset: Optional[DrugResponseDataset] = None,
     response_transformation: Optional[TransformerMixin] = None,
     metric: str = "rmse",
+    cl_features: Optional[FeatureDataset] = None,
+    drug_features: Optional[FeatureDataset] = None,
 ) -> dict[str, float]:
     """
     Train and evaluate the model, i.e., call train_and_predict() and then evaluate().
@@ -941,18 +1402,102 @@ def train_and_evaluate(
     :param early_stopping_dataset: early stopping dataset
     :param response_transformation: normalizer to use for the response data
     :param metric: metric to evaluate the model on
+    :param cl_features: shared cell line features. If None, they are loaded from disk.
+    :param drug_features: shared drug features. If None, they are loaded from disk.
     :returns: dictionary of the evaluation results, e.g., {"RMSE": 0.1}
     """
-    validation_dataset = train_and_predict(
+    # the datasets are shared by all configurations, they must not be reduced and transformed in place
+    train_dataset = train_dataset.copy()
+    validation_dataset = validation_dataset.copy()
+    if early_stopping_dataset is not None:
+        early_stopping_dataset = early_stopping_dataset.copy()
+    with trace_span("hyperparameter set", "tuning", hpams=hpams, n_samples=len(train_dataset)):
+        validation_dataset = train_and_predict(
+            model=model,
+            hpams=hpams,
+            path_data=path_data,
+            train_dataset=train_dataset,
+            prediction_dataset=validation_dataset,
+            early_stopping_dataset=early_stopping_dataset,
+            response_transformation=response_transformation,
+            cl_features=cl_features,
+            drug_features=drug_features,
+        )
+        with trace_span("evaluate", "evaluation"):
+            return evaluate(validation_dataset, metric=[metric])
+
+
+def train_and_evaluate_path(
+    model: DRPModel,
+    hpam_set: list[dict],
+    path_data: str,
+    train_dataset: DrugResponseDataset,
+    validation_dataset: DrugResponseDataset,
+    early_stopping_dataset: Optional[DrugResponseDataset] = None,
+    response_transformation: Optional[TransformerMixin] = None,
+    metric: str = "rmse",
+    cl_features: Optional[FeatureDataset] = None,
+    drug_features: Optional[FeatureDataset] = None,
+) -> list[float]:
+    """
+    Train and evaluate all hyperparameter configurations at once with the model's hyperparameter path.
+
+    The model has to implement predict_hyperparameter_path, see DRPModel.has_hyperparameter_path.
+
+    :param model: model to use
+    :param hpam_set: hyperparameter configurations
+    :param path_data: path to the data directory
+    :param train_dataset: training dataset
+    :param validation_dataset: validation dataset
+    :param early_stopping_dataset: early stopping dataset
+    :param response_transformation: normalizer to use for the response data
+    :param metric: metric to evaluate the model on
+    :param cl_features: shared cell line features. If None, they are loaded from disk.
+    :param drug_features: shared drug features. If None, they are loaded from disk.
+    :returns: score of every configuration, in the order of hpam_set
+    """
+    train_dataset = train_dataset.copy()
+    validation_dataset = validation_dataset.copy()
+    if early_stopping_dataset is not None:
+        early_stopping_dataset = early_stopping_dataset.copy()
+    cl_features, drug_features = prepare_training(
         model=model,
-        hpams=hpams,
         path_data=path_data,
         train_dataset=train_dataset,
         prediction_dataset=validation_dataset,
         early_stopping_dataset=early_stopping_dataset,
         response_transformation=response_transformation,
+        cl_features=cl_features,
+        drug_features=drug_features,
     )
-    return evaluate(validation_dataset, metric=[metric])
+    # the configurations of a hyperparameter path share the hyperparameters of the preprocessing
+    with trace_span("preprocess", "data"):
+        cl_features, drug_features = model.get_preprocessed_features(
+            hyperparameters=hpam_set[0],
+            output=train_dataset,
+            cell_line_input=cl_features,
+            drug_input=drug_features,
+            output_earlystopping=early_stopping_dataset,
+        )
+    print(f"Training model along the hyperparameter path of {len(hpam_set)} configurations ...")
+    with trace_span("hyperparameter path", "model", n_configurations=len(hpam_set), n_samples=len(train_dataset)):
+        path_predictions = model.predict_hyperparameter_path(
+            hpam_set=hpam_set,
+            output=train_dataset,
+            cell_line_ids=validation_dataset.cell_line_ids,
+            drug_ids=validation_dataset.drug_ids,
+            cell_line_input=cl_features,
+            drug_input=drug_features,
+        )
+    scores = []
+    with trace_span("evaluate", "evaluation", n_configurations=len(hpam_set)):
+        for predictions in path_predictions:
+            evaluation_dataset = validation_dataset.copy()
+            evaluation_dataset._predictions = predictions
+            if response_transformation:
+                evaluation_dataset.inverse_transform(response_transformation)
+            scores.append(evaluate(evaluation_dataset, metric=[metric])[metric])
+    return scores
 
 
 def hpam_tune(
@@ -964,10 +1509,23 @@ def hpam_tune(
     response_transformation: Optional[TransformerMixin] = None,
     metric: str = "RMSE",
     path_data: str = "data",
+    cl_features: Optional[FeatureDataset] = None,
+    drug_features: Optional[FeatureDataset] = None,
+    search: str = "grid",
+    reduction_factor: int = 3,
+    min_budget: float = 0.1,
 ) -> dict:
     """
     Tune the hyperparameters for the given model in an iterative manner.
 
+    With search="successive_halving", all configurations are first trained on a random subsample of the training
+    set. Only the best 1/reduction_factor of them are trained again on a reduction_factor times larger subsample, until
+    the remaining configurations are trained on the full training set, see successive_halving_budgets.
+
+    With search="grid", models implementing a hyperparameter path (DRPModel.has_hyperparameter_path) train and
+    evaluate all configurations in one go with train_and_evaluate_path. Successive halving trains the configurations
+    separately, also for these models.
+
     :param model: model to use
     :param train_dataset: training dataset
     :param validation_dataset: validation dataset
@@ -976,29 +1534,86 @@ def hpam_tune(
     :param response_transformation: normalizer to use for the response data
     :param metric: metric to evaluate which model is the best
     :param path_data: path to the data directory, e.g., data/
+    :param cl_features: shared cell line features. If None, they are loaded from disk for every configuration.
+    :param drug_features: shared drug features. If None, they are loaded from disk for every configuration.
+    :param search: search strategy, one of HPAM_SEARCH_STRATEGIES
+    :param reduction_factor: successive halving only: factor by which the number of configurations is reduced and the
+        training set fraction is increased from one round to the next
+    :param min_budget: successive halving only: smallest fraction of the training set a configuration is trained on
     :returns: best hyperparameters
     :raises AssertionError: if hpam_set is empty
+    :raises ValueError: if the search strategy is unknown
     """
     if len(hpam_set) == 0:
         raise AssertionError("hpam_set must contain at least one hyperparameter configuration")
+    if search not in HPAM_SEARCH_STRATEGIES:
+        raise ValueError(f"Invalid hyperparameter search {search}. Available strategies are {HPAM_SEARCH_STRATEGIES}.")
     if len(hpam_set) == 1:
         return hpam_set[0]
 
-    best_hyperparameters = None
     mode = get_mode(metric)
+    n_configs = len(hpam_set)
+    budget_used = 0.0
+    path_scores = None
+    if search == "grid" and model.has_hyperparameter_path():
+        path_scores = iter(
+            train_and_evaluate_path(
+                model=model,
+                hpam_set=hpam_set,
+                path_data=path_data,
+                train_dataset=train_dataset,
+                validation_dataset=validation_dataset,
+                early_stopping_dataset=early_stopping_dataset,
+                metric=metric,
+                response_transformation=response_transformation,
+                cl_features=cl_features,
+                drug_features=drug_features,
+            )
+        )
+    elif search == "successive_halving":
+        budgets = successive_halving_budgets(n_configs, reduction_factor=reduction_factor, min_budget=min_budget)
+        # all rounds but the last one only decide which configurations are trained on the full training set
+        for budget in budgets[:-1]:
+            subsample = _subsample_dataset(train_dataset, budget)
+            scores = []
+            for hyperparameter in hpam_set:
+                print(f"Training model on {budget:.0%} of the training set with hyperparameters: {hyperparameter}")
+                scores.append(
+                    train_and_evaluate(
+                        model=model,
+                        hpams=hyperparameter,
+                        path_data=path_data,
+                        train_dataset=subsample,
+                        validation_dataset=validation_dataset,
+                        early_stopping_dataset=early_stopping_dataset,
+                        metric=metric,
+                        response_transformation=response_transformation,
+                        cl_features=cl_features,
+                        drug_features=drug_features,
+                    )[metric]
+                )
+            budget_used += budget * len(hpam_set)
+            hpam_set = _keep_best_configs(hpam_set, scores, mode, n_keep=math.ceil(len(hpam_set) / reduction_factor))
+
+    best_hyperparameters = None
     best_score = float("inf") if mode == "min" else float("-inf")
     for hyperparameter in hpam_set:
-        print(f"Training model with hyperparameters: {hyperparameter}")
-        score = train_and_evaluate(
-            model=model,
-            hpams=hyperparameter,
-            path_data=path_data,
-            train_dataset=train_dataset,
-            validation_dataset=validation_dataset,
-            early_stopping_dataset=early_stopping_dataset,
-            metric=metric,
-            response_transformation=response_transformation,
-        )[metric]
+        if path_scores is not None:
+            score = next(path_scores)
+        else:
+            print(f"Training model with hyperparameters: {hyperparameter}")
+            score = train_and_evaluate(
+                model=model,
+                hpams=hyperparameter,
+                path_data=path_data,
+                train_dataset=train_dataset,
+                validation_dataset=validation_dataset,
+                early_stopping_dataset=early_stopping_dataset,
+                metric=metric,
+                response_transformation=response_transformation,
+                cl_features=cl_features,
+                drug_features=drug_features,
+            )[metric]
 
         if np.isnan(score):
             continue
@@ -1008,6 +1623,9 @@ def hpam_tune(
             best_score = score
             best_hyperparameters = hyperparameter
 
+    if search == "successive_halving" and path_scores is None:
+        _report_saved_compute(budget_used + len(hpam_set), n_configs)
+
     if best_hyperparameters is None:
         warnings.warn("all hpams lead to NaN respone. using last hpam combination.", stacklevel=2)
         best_hyperparameters = hyperparameter
@@ -1015,6 +1633,83 @@ def hpam_tune(
     return best_hyperparameters
 
 
+def successive_halving_budgets(n_configs: int, reduction_factor: int = 3, min_budget: float = 0.1) -> list[float]:
+    """
+    Compute the training set fractions of the successive halving rounds.
+
+    The last round always uses the full training set. Every earlier round uses a reduction_factor times smaller
+    fraction. Rounds are only added as long as the fraction is at least min_budget and at least one configuration is
+    discarded per round.
+
+    :param n_configs: number of hyperparameter configurations
+    :param reduction_factor: factor between the fractions of two consecutive rounds
+    :param min_budget: smallest training set fraction
+    :returns: training set fractions in increasing order, e.g., [1/9, 1/3, 1] for 30 configurations
+    :raises ValueError: if reduction_factor is smaller than 2 or min_budget is not in (0, 1]
+    """
+    if reduction_factor < 2:
+        raise ValueError("reduction_factor must be at least 2.")
+    if not 0 < min_budget <= 1:
+        raise ValueError("min_budget must be in (0, 1].")
+    n_rounds = 1
+    while reduction_factor**n_rounds <= n_configs and reduction_factor ** (-n_rounds) >= min_budget:
+        n_rounds += 1
+    return [float(reduction_factor ** (round_ - n_rounds + 1)) for round_ in range(n_rounds)]
+
+
+def _subsample_dataset(dataset: DrugResponseDataset, fraction: float, random_state: int = 42) -> DrugResponseDataset:
+    """
+    Draw a random subsample of the dataset.
+
+    The same random state yields nested subsamples, i.e., the subsample of a smaller fraction is contained in the one
+    of a larger fraction.
+
+    :param dataset: dataset to subsample
+    :param fraction: fraction of rows to keep
+    :param random_state: random state
+    :returns: subsampled copy of the dataset
+    """
+    n_rows = max(1, int(round(len(dataset) * fraction)))
+    rows = np.random.default_rng(random_state).permutation(len(dataset))[:n_rows]
+    subsample = dataset.copy()
+    subsample.mask(np.sort(rows))
+    return subsample
+
+
+def _keep_best_configs(hpam_set: list[dict], scores: list[float], mode: str, n_keep: int) -> list[dict]:
+    """
+    Keep the n_keep configurations with the best scores. Configurations with a NaN score are ranked last.
+
+    :param hpam_set: hyperparameter configurations
+    :param scores: validation score of every configuration
+    :param mode: "min" if smaller scores are better, "max" otherwise
+    :param n_keep: number of configurations to keep
+    :returns: best configurations, in their original order
+    """
+    scores_array = np.array(scores, dtype=float)
+    if mode == "max":
+        scores_array = -scores_array
+    scores_array[np.isnan(scores_array)] = np.inf
+    keep = np.sort(np.argsort(scores_array, kind="stable")[:n_keep])
+    return [hpam_set[i] for i in keep]
+
+
+def _report_saved_compute(budget_used: float, n_full_trainings: int) -> None:
+    """
+    Print how much training compute successive halving needed compared to the full grid search.
+
+    The compute is measured in trainings on the full training set, i.e., a training on a third of the training set
+    counts as 1/3.
+
+    :param budget_used: compute used by successive halving
+    :param n_full_trainings: compute the full grid search would have used
+    """
+    print(
+        f"Successive halving used {budget_used:.2f} of {n_full_trainings} full trainings of the grid search "
+        f"({1 - budget_used / n_full_trainings:.0%} compute saved)."
+    )
+
+
 def hpam_tune_raytune(
     model: DRPModel,
     train_dataset: DrugResponseDataset,
@@ -1025,10 +1720,26 @@ def hpam_tune_raytune(
     metric: str = "RMSE",
     ray_path: str = "raytune",
     path_data: str = "data",
+    cl_features: Optional[FeatureDataset] = None,
+    drug_features: Optional[FeatureDataset] = None,
+    cpus_per_trial: int = 1,
+    gpus_per_trial: Optional[float] = None,
+    n_repeats: int = 1,
+    search: str = "grid",
+    reduction_factor: int = 3,
+    min_budget: float = 0.1,
 ) -> dict:
     """
     Tune the hyperparameters for the given model using raytune.
 
+    Uses the running ray session, e.g., the one started by drug_response_experiment, or starts a new one, which is
+    shut down again when the tuning is done. With
+    search="successive_halving", trials are scheduled with ASHA: every trial is trained on growing fractions of the
+    training set (see successive_halving_budgets). At every fraction but the full training set, trials that are not
+    among the best 1/reduction_factor of the trials which reached this fraction so far are stopped. Every configuration
+    is a separate trial, also for models with a hyperparameter path (DRPModel.has_hyperparameter_path), which only
+    hpam_tune uses.
+
     :param model: model to use
     :param train_dataset: training dataset
     :param validation_dataset: validation dataset
@@ -1038,38 +1749,192 @@ def hpam_tune_raytune(
     :param metric: metric to evaluate which model is the best
     :param ray_path: path to the raytune directory
     :param path_data: path to the data directory, e.g., data/
+    :param cl_features: shared cell line features. If None, they are loaded from disk for every trial.
+    :param drug_features: shared drug features. If None, they are loaded from disk for every trial.
+    :param cpus_per_trial: number of CPUs reserved for every trial
+    :param gpus_per_trial: number of GPUs reserved for every trial, can be fractional to share a GPU. None reserves
+        one GPU per trial if a GPU is available and none otherwise.
+    :param n_repeats: number of times every hyperparameter configuration is trained. With more than one repeat, the
+        configuration with the best mean score is chosen.
+    :param search: search strategy, one of HPAM_SEARCH_STRATEGIES
+    :param reduction_factor: successive halving only: reduction factor of ASHA
+    :param min_budget: successive halving only: smallest fraction of the training set a trial is trained on
     :returns: best hyperparameters
+    :raises ValueError: if n_repeats is smaller than 1 or the search strategy is unknown
     """
+    if search not in HPAM_SEARCH_STRATEGIES:
+        raise ValueError(f"Invalid hyperparameter search {search}. Available strategies are {HPAM_SEARCH_STRATEGIES}.")
     if len(hpam_set) == 1:
         return hpam_set[0]
-    ray.init(_temp_dir=os.path.join(os.path.expanduser("~"), "raytmp"))
-    if torch.cuda.is_available():
-        resources_per_trial = {"gpu": 1}  # TODO make this user defined
+    if n_repeats < 1:
+        raise ValueError("n_repeats must be at least 1.")
+    import ray
+    import torch
+    from ray import tune
+
+    if gpus_per_trial is None:
+        gpus_per_trial = 1 if torch.cuda.is_available() else 0
+    resources_per_trial = {"cpu": cpus_per_trial, "gpu": gpus_per_trial}
+    mode = get_mode(metric)
+    trainable_inputs = {
+        "model": model,
+        "path_data": path_data,
+        "train_dataset": train_dataset,
+        "validation_dataset": validation_dataset,
+        "early_stopping_dataset": early_stopping_dataset,
+        "metric": metric,
+        "response_transformation": response_transformation,
+        "cl_features": cl_features,
+        "drug_features": drug_features,
+    }
+    scheduler = None
+    budgets = [1.0]
+    if search == "successive_halving":
+        budgets = successive_halving_budgets(len(hpam_set), reduction_factor=reduction_factor, min_budget=min_budget)
+    if len(budgets) > 1:
+        scheduler = _successive_halving_scheduler(budgets, reduction_factor=reduction_factor)
+        trainable_function = _raytune_successive_halving_trainable
+        trainable_inputs["budgets"] = budgets
     else:
-        resources_per_trial = {"cpu": 1}  # TODO make this user defined
-    analysis = tune.run(
-        lambda hpams: train_and_evaluate(
-            model=model,
-            hpams=hpams,
-            path_data=path_data,
-            train_dataset=train_dataset,
-            validation_dataset=validation_dataset,
-            early_stopping_dataset=early_stopping_dataset,
+        trainable_function = _raytune_trainable
+    # tune.with_parameters puts the datasets and features into the object store once. All trials fetch them by
+    # reference instead of receiving a serialized copy captured in the trainable.
+    # drug_response_experiment starts one session per experiment, this is only needed for direct calls
+    ray_started = not ray.is_initialized()
+    if ray_started:
+        init_ray()
+    try:
+        trainable = tune.with_parameters(trainable_function, **trainable_inputs)
+        analysis = tune.run(
+            trainable,
+            config=tune.grid_search(hpam_set),
             metric=metric,
-            response_transformation=response_transformation,
-        ),
-        config=tune.grid_search(hpam_set),
-        mode="min",
-        num_samples=5,
-        resources_per_trial=resources_per_trial,
-        chdir_to_trial_dir=False,
-        verbose=0,
-        storage_path=ray_path,
+            mode=mode,
+            num_samples=n_repeats,
+            scheduler=scheduler,
+            resources_per_trial=resources_per_trial,
+            verbose=0,
+            storage_path=ray_path,
+        )
+    finally:
+        if ray_started:
+            ray.shutdown()
+    finished_trials = [trial for trial in analysis.trials if trial.last_result]
+    if len(budgets) > 1:
+        _report_saved_compute(
+            sum(trial.last_result["budget_used"] for trial in finished_trials), len(hpam_set) * n_repeats
+        )
+        # only trials which reached the largest training set fraction are comparable
+        last_step = max((trial.last_result[BUDGET_STEP] for trial in finished_trials), default=0)
+        finished_trials = [trial for trial in finished_trials if trial.last_result[BUDGET_STEP] == last_step]
+
+    # the configuration with the best mean score over its trials is chosen
+    scores: dict[str, list[float]] = {}
+    configs: dict[str, dict] = {}
+    for trial in finished_trials:
+        if np.isnan(trial.last_result.get(metric, np.nan)):
+            continue
+        key = json.dumps(trial.config, sort_keys=True, default=str)
+        scores.setdefault(key, []).append(trial.last_result[metric])
+        configs[key] = trial.config
+    if not scores:
+        warnings.warn("all hpams lead to NaN respone. using last hpam combination.", stacklevel=2)
+        return hpam_set[-1]
+    mean_scores = {key: float(np.mean(values)) for key, values in scores.items()}
+    best_key = min(mean_scores, key=mean_scores.get) if mode == "min" else max(mean_scores, key=mean_scores.get)
+    return configs[best_key]
+
+
+def _raytune_trainable(hpams: dict, **kwargs) -> dict[str, float]:
+    """
+    Trainable for raytune: trains the model with one hyperparameter configuration and evaluates it.
+
+    :param hpams: hyperparameter configuration of the trial
+    :param kwargs: remaining arguments of train_and_evaluate, fetched from the ray object store
+    :returns: dictionary of the evaluation results, e.g., {"RMSE": 0.1}
+    """
+    return train_and_evaluate(hpams=hpams, **kwargs)
+
+
+def _raytune_successive_halving_trainable(
+    hpams: dict, budgets: list[float], train_dataset: DrugResponseDataset, metric: str, **kwargs
+) -> None:
+    """
+    Trainable for raytune with ASHA: trains and evaluates the model on growing fractions of the training set.
+
+    Every evaluation is reported, so the scheduler can stop the trial early. A NaN score ends the trial.
+
+    :param hpams: hyperparameter configuration of the trial
+    :param budgets: training set fractions, see successive_halving_budgets
+    :param train_dataset: training dataset
+    :param metric: metric to evaluate the model on
+    :param kwargs: remaining arguments of train_and_evaluate, fetched from the ray object store
+    """
+    import ray.train
+
+    budget_used = 0.0
+    for budget in budgets:
+        subsample = train_dataset if budget == 1 else _subsample_dataset(train_dataset, budget)
+        results = train_and_evaluate(hpams=hpams, train_dataset=subsample, metric=metric, **kwargs)
+        budget_used += budget
+        ray.train.report(_successive_halving_result(results, budget=budget, budgets=budgets, budget_used=budget_used))
+        if np.isnan(results[metric]):
+            return
+
+
+def _successive_halving_scheduler(budgets: list[float], reduction_factor: int) -> Any:
+    """
+    Create the ASHA scheduler which stops trials at every training set fraction but the last one.
+
+    ASHA places its decision points (rungs) at the time attribute values 1, reduction_factor, reduction_factor**2,
+    ... . The trials report the fraction relative to the smallest one as time attribute, see
+    _successive_halving_result, which is exactly reduction_factor**i for the i-th fraction of
+    successive_halving_budgets.
+
+    :param budgets: training set fractions, see successive_halving_budgets
+    :param reduction_factor: reduction factor of ASHA, the factor between two consecutive fractions
+    :returns: the ASHA scheduler
+    """
+    from ray.tune.schedulers import ASHAScheduler
+
+    return ASHAScheduler(
+        time_attr=BUDGET_STEP,
+        max_t=round(budgets[-1] / budgets[0]),
+        grace_period=1,
+        reduction_factor=reduction_factor,
     )
 
-    mode = get_mode(metric)
-    best_config = analysis.get_best_config(metric=metric, mode=mode)
-    return best_config
+
+def _successive_halving_result(
+    results: dict[str, float], budget: float, budgets: list[float], budget_used: float
+) -> dict[str, float]:
+    """
+    Create the result a successive halving trial reports to ray after training on a fraction of the training set.
+
+    :param results: evaluation results, e.g., {"RMSE": 0.1}
+    :param budget: training set fraction the model was trained on
+    :param budgets: all training set fractions, see successive_halving_budgets
+    :param budget_used: sum of the fractions the trial was trained on so far
+    :returns: evaluation results with the budget, the used budget and the ASHA time attribute
+    """
+    return {**results, "budget": budget, "budget_used": budget_used, BUDGET_STEP: round(budget / budgets[0])}
+
+
+def init_ray(num_cpus: Optional[int] = None) -> None:
+    """
+    Start a local ray session.
+
+    :param num_cpus: number of CPUs ray may use, None for all available CPUs
+    """
+    import ray
+
+    # trials have to run in the current working directory, relative data paths would break otherwise
+    os.environ.setdefault("RAY_CHDIR_TO_TRIAL_DIR", "0")
+    ray.init(
+        num_cpus=num_cpus,
+        _temp_dir=os.path.join(os.path.expanduser("~"), "raytmp"),
+        ignore_reinit_error=True,
+    )
 
 
 @pipeline_function
@@ -1083,7 +1948,7 @@ def make_model_list(models: list[type[DRPModel]], response_data: DrugResponseDat
         "MOLIR.Afatinib": "MOLIR"}
     """
     model_list = {}
-    unique_drugs = np.unique(response_data.drug_ids)
+    unique_drugs = response_data.factorize_ids("drug")[0]
     for model in models:
         if model.is_single_drug_model:
             for drug in unique_drugs:
@@ -1124,6 +1989,9 @@ def get_datasets_from_cv_split(
     """
     Get train, validation, (early stopping), and test datasets from the CV split.
 
+    The returned datasets are lazy copies of the split datasets, so changing them, e.g., adding the validation set to
+    the training set for the final training, does not change the split, which is used for every model.
+
     :param split: dictionary of the CV split
     :param model_class: model class
     :param model_name: model name
@@ -1140,22 +2008,17 @@ def get_datasets_from_cv_split(
     else:
         early_stopping_dataset = None
 
+    train_dataset = train_dataset.copy()
+    validation_dataset = validation_dataset.copy()
+    test_dataset = test_dataset.copy()
+    if early_stopping_dataset is not None:
+        early_stopping_dataset = early_stopping_dataset.copy()
+
     if model_name in SINGLE_DRUG_MODEL_FACTORY.keys():
-        output_mask = train_dataset.drug_ids == drug_id
-        train_cp = train_dataset.copy()
-        train_cp.mask(output_mask)
-        validation_mask = validation_dataset.drug_ids == drug_id
-        val_cp = validation_dataset.copy()
-        val_cp.mask(validation_mask)
-        test_mask = test_dataset.drug_ids == drug_id
-        test_cp = test_dataset.copy()
-        test_cp.mask(test_mask)
-        if early_stopping_dataset is not None:
-            es_mask = early_stopping_dataset.drug_ids == drug_id
-            es_cp = early_stopping_dataset.copy()
-            es_cp.mask(es_mask)
-            return train_cp, val_cp, es_cp, test_cp
-        return train_cp, val_cp, None, test_cp
+        # masking the lazy copies only selects row indices
+        for dataset in [train_dataset, validation_dataset, test_dataset, early_stopping_dataset]:
+            if dataset is not None:
+                dataset.mask(dataset.drug_ids == drug_id)
 
     return (
         train_dataset,
@@ -32,6 +32,7 @@ class DIPKModel(DRPModel):
     cell_line_views = ["gene_expression", "bionic_features"]
     drug_views = ["molgnet_features"]
     early_stopping = True
+    preprocessing_hyperparameters = ["epochs_autoencoder"]
 
     def __init__(self) -> None:
         """Initialize the DIPK model."""
@@ -83,6 +84,38 @@ class DIPKModel(DRPModel):
         self.epochs_autoencoder = hyperparameters["epochs_autoencoder"]
         self.patience = hyperparameters["patience"]
 
+    def preprocess_features(
+        self,
+        output: DrugResponseDataset,
+        cell_line_input: FeatureDataset,
+        drug_input: FeatureDataset | None = None,
+        output_earlystopping: DrugResponseDataset | None = None,
+    ) -> tuple[FeatureDataset, FeatureDataset | None]:
+        """
+        Trains the gene expression autoencoder and replaces the gene expression by its embeddings.
+
+        :param output: training data associated with the response output
+        :param cell_line_input: input data associated with the cell line
+        :param drug_input: input data associated with the drug
+        :param output_earlystopping: early stopping data associated with the response output
+        :returns: cell line features with encoded gene expression and the drug features
+        :raises ValueError: if output_earlystopping is None
+        """
+        if output_earlystopping is None:
+            raise ValueError("DIPK model requires early stopping data.")
+        self.gene_expression_encoder = train_gene_expession_autoencoder(
+            cell_line_input.get_feature_matrix(view="gene_expression", identifiers=output.cell_line_ids),
+            cell_line_input.get_feature_matrix(view="gene_expression", identifiers=output_earlystopping.cell_line_ids),
+            epochs_autoencoder=self.epochs_autoencoder,
+        )
+
+        cell_line_input.apply(
+            lambda x: encode_gene_expression(x, self.gene_expression_encoder),  # type: ignore[arg-type]
+            view="gene_expression",
+            vectorized=True,
+        )  # type: ignore[arg-type]
+        return cell_line_input, drug_input
+
     def train(
         self,
         output: DrugResponseDataset,
@@ -91,7 +124,7 @@ class DIPKModel(DRPModel):
         output_earlystopping: DrugResponseDataset | None = None,
     ) -> None:
         """
-        Trains the model.
+        Trains the model on the gene expression embeddings of preprocess_features.
 
         :param output: training data associated with the response output
         :param cell_line_input: input data associated with the cell line
@@ -110,17 +143,6 @@ class DIPKModel(DRPModel):
         params = [{"params": self.model.parameters()}]
         optimizer = optim.Adam(params, lr=self.lr)
 
-        self.gene_expression_encoder = train_gene_expession_autoencoder(
-            cell_line_input.get_feature_matrix(view="gene_expression", identifiers=output.cell_line_ids),
-            cell_line_input.get_feature_matrix(view="gene_expression", identifiers=output_earlystopping.cell_line_ids),
-            epochs_autoencoder=self.epochs_autoencoder,
-        )
-
-        cell_line_input.apply(
-            lambda x: encode_gene_expression(x, self.gene_expression_encoder),  # type: ignore[arg-type]
-            view="gene_expression",
-        )  # type: ignore[arg-type]
-
         # Load data
         collate = CollateFn(train=True)
         train_samples = get_data(
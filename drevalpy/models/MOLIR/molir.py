@@ -62,40 +62,56 @@ class MOLIR(DRPModel):
         """
         self.hyperparameters = hyperparameters
 
-    def train(
+    def preprocess_features(
         self,
         output: DrugResponseDataset,
         cell_line_input: FeatureDataset,
         drug_input: FeatureDataset | None = None,
         output_earlystopping: DrugResponseDataset | None = None,
-    ) -> None:
+    ) -> tuple[FeatureDataset, FeatureDataset | None]:
         """
-        Initializes and trains the model.
-
-        First, the gene expression data is reduced using a variance threshold (0.05) and standardized. Then,
-        the model is initialized with the hyperparameters and the dimensions of the gene expression, mutation and
-        copy number variation data. If there is no training data, the model is set to None (and predictions will be
-        skipped as well). If there is not enough training data, the predictions will be made on the randomly
-        initialized model.
+        Reduces the gene expression data using a variance threshold (0.05) and standardizes it.
 
         :param output: drug response data
         :param cell_line_input: cell line omics features, i.e., gene expression, mutations and copy number variation
         :param drug_input: drug features, not needed
-        :param output_earlystopping: early stopping data, not used when there is not enough data
+        :param output_earlystopping: early stopping data, not used
+        :returns: cell line omics features with the reduced gene expression and the drug input
         """
         if len(output) > 0:
-            selector_gex = VarianceThreshold(0.05)
             cell_line_input.fit_transform_features(
                 train_ids=np.unique(output.cell_line_ids),
-                transformer=selector_gex,
+                transformer=VarianceThreshold(0.05),
                 view="gene_expression",
             )
-            scaler_gex = StandardScaler()
             cell_line_input.fit_transform_features(
                 train_ids=np.unique(output.cell_line_ids),
-                transformer=scaler_gex,
+                transformer=StandardScaler(),
                 view="gene_expression",
             )
+        return cell_line_input, drug_input
+
+    def train(
+        self,
+        output: DrugResponseDataset,
+        cell_line_input: FeatureDataset,
+        drug_input: FeatureDataset | None = None,
+        output_earlystopping: DrugResponseDataset | None = None,
+    ) -> None:
+        """
+        Initializes and trains the model.
+
+        The gene expression data was reduced and standardized in preprocess_features. The model is initialized with
+        the hyperparameters and the dimensions of the gene expression, mutation and copy number variation data. If
+        there is no training data, the model is set to None (and predictions will be skipped as well). If there is not
+        enough training data, the predictions will be made on the randomly initialized model.
+
+        :param output: drug response data
+        :param cell_line_input: cell line omics features, i.e., gene expression, mutations and copy number variation
+        :param drug_input: drug features, not needed
+        :param output_earlystopping: early stopping data, not used when there is not enough data
+        """
+        if len(output) > 0:
             if output_earlystopping is not None and self.early_stopping and len(output_earlystopping) < 2:
                 output_earlystopping = None
             dim_gex, dim_mut, dim_cnv = get_dimensions_of_omics_data(cell_line_input)
@@ -141,7 +157,7 @@ class MOLIR(DRPModel):
             cell_line_input=cell_line_input,
             drug_input=drug_input,
         )
-        (gene_expression, mutations, cnvs) = (
+        gene_expression, mutations, cnvs = (
             input_data["gene_expression"],
             input_data["mutations"],
             input_data["copy_number_variation_gistic"],
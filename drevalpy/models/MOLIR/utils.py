@@ -36,6 +36,9 @@ class RegressionDataset(Dataset):
         :param cell_line_input: omics features of the cell lines
         """
         self.output = output
+        # decode the ids and gather the response once instead of for every sample
+        self.cell_line_ids = output.cell_line_ids
+        self.response = output.response
         self.cell_line_input = cell_line_input
 
     def __getitem__(self, idx: int) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.float32]:
@@ -45,9 +48,9 @@ class RegressionDataset(Dataset):
         :param idx: index of the sample
         :returns: gene expression, mutations, copy number variation, and response of the sample as numpy arrays
         """
-        response: np.float32 = np.float32(self.output.response[idx])
+        response: np.float32 = np.float32(self.response[idx])
 
-        cell_line_id = str(self.output.cell_line_ids[idx])
+        cell_line_id = str(self.cell_line_ids[idx])
         gene_expression: np.ndarray = self.cell_line_input.features[cell_line_id]["gene_expression"].astype(np.float32)
         mutations: np.ndarray = self.cell_line_input.features[cell_line_id]["mutations"].astype(np.float32)
         copy_number: np.ndarray = self.cell_line_input.features[cell_line_id]["copy_number_variation_gistic"].astype(
@@ -62,7 +65,7 @@ class RegressionDataset(Dataset):
 
         :returns: number of samples in the dataset
         """
-        return len(self.output.response)
+        return len(self.response)
 
 
 def generate_triplets_indices(
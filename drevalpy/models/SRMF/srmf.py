@@ -9,13 +9,54 @@ Matlab code adapted from https://github.com/linwang1982/SRMF.
 
 import numpy as np
 import pandas as pd
-from scipy.spatial.distance import jaccard
+from scipy import sparse
 
 from drevalpy.datasets.dataset import DrugResponseDataset, FeatureDataset
 from drevalpy.models.drp_model import DRPModel
 from drevalpy.models.utils import load_and_reduce_gene_features, load_drug_fingerprint_features
 
 
+def jaccard_similarity(fingerprints: np.ndarray) -> np.ndarray:
+    """
+    Computes the Jaccard similarity between all pairs of rows of a fingerprint matrix at once.
+
+    Non-zero entries count as set bits. The intersections are the matrix product of the binary fingerprints, the
+    unions follow from the row sums. Like 1 - scipy.spatial.distance.jaccard, two empty fingerprints have similarity 1.
+
+    :param fingerprints: matrix with one fingerprint per row
+    :returns: symmetric matrix of pairwise Jaccard similarities
+    """
+    bits = (np.asarray(fingerprints) != 0).astype(np.float64)
+    intersection = bits @ bits.T
+    n_bits = bits.sum(axis=1)
+    union = n_bits[:, None] + n_bits[None, :] - intersection
+    return np.divide(intersection, union, out=np.ones_like(intersection), where=union > 0)
+
+
+def group_rows_by_pattern(w: np.ndarray) -> tuple[np.ndarray | sparse.csr_matrix, np.ndarray, np.ndarray]:
+    """
+    Groups the rows of a weight matrix by their pattern of observed entries, for the updates of SRMF._alg_update.
+
+    Every unique pattern is stored by its smaller side: the observed entries if at most half of the entries are
+    observed, otherwise the missing entries. The mask is sparse if the stored entries are sparse.
+
+    :param w: weight matrix, non-zero entries are observed
+    :returns: mask of the stored entries per pattern, whether a pattern stores its missing entries, and the pattern of
+        every row
+    """
+    observed = w > 0
+    _, first_rows, pattern_of_row = np.unique(
+        np.packbits(observed, axis=1), axis=0, return_index=True, return_inverse=True
+    )
+    patterns = observed[first_rows]
+    complement = patterns.sum(axis=1) > patterns.shape[1] / 2
+    stored = patterns != complement[:, None]
+    mask: np.ndarray | sparse.csr_matrix = stored.astype(np.float64)
+    if stored.mean() < 1 / 3:
+        mask = sparse.csr_matrix(mask)
+    return mask, complement, pattern_of_row.reshape(-1)
+
+
 class SRMF(DRPModel):
     """
     SRMF model: Similarity Regularization Matrix Factorization.
@@ -46,6 +87,9 @@ class SRMF(DRPModel):
         self.lambda_c: float = 0.01
         self.max_iter: int = 50
         self.seed: int = 1
+        # drug similarity of the last training, for the sorted drug ids and a hash of their fingerprints
+        self._drug_similarity_key: tuple | None = None
+        self._drug_similarity: np.ndarray = np.empty((0, 0))
 
     @classmethod
     def get_model_name(cls) -> str:
@@ -94,20 +138,7 @@ class SRMF(DRPModel):
         drugs = np.unique(drug_input.identifiers)  # transductive approach - all drug features are used
         cell_lines = np.unique(cell_line_input.identifiers)  # transductive approach - all cell line features are used
 
-        drug_features = drug_input.features
-
-        drug_similarity = pd.DataFrame(index=drugs, columns=drugs, dtype=float)  # jaccard similarity
-
-        for drug_from in drugs:
-            for drug_to in drugs:
-                # skip if already computed
-                if not np.isnan(drug_similarity.loc[drug_from, drug_to]):
-                    continue
-                drug_similarity.loc[drug_from, drug_to] = 1 - jaccard(
-                    drug_features[drug_from]["fingerprints"],
-                    drug_features[drug_to]["fingerprints"],
-                )
-                drug_similarity.loc[drug_to, drug_from] = drug_similarity.loc[drug_from, drug_to]
+        drug_similarity = self._get_drug_similarity(drug_input, drugs)
 
         cell_line_features = cell_line_input.get_feature_matrix(view="gene_expression", identifiers=cell_lines)
         # pearson correlation as similarity
@@ -130,7 +161,7 @@ class SRMF(DRPModel):
         best_u, best_v = self._cmf(
             w=self.w.T.values,
             int_mat=drug_response_matrix.values.T,
-            drug_mat=drug_similarity.values,
+            drug_mat=drug_similarity,
             cell_mat=cell_line_similarity,
         )
         self.best_u = pd.DataFrame(best_u, index=drugs)
@@ -160,6 +191,25 @@ class SRMF(DRPModel):
 
         return diagonal_predictions
 
+    def _get_drug_similarity(self, drug_input: FeatureDataset, drugs: np.ndarray) -> np.ndarray:
+        """
+        Returns the Jaccard similarity of the drug fingerprints, reusing the one of the last training if possible.
+
+        The similarity only depends on the drug features, so it is computed once for all hyperparameter configurations
+        of a split. It is cached for the sorted drug ids and the fingerprints, which differ for the same drugs, e.g.,
+        in randomization tests.
+
+        :param drug_input: feature data for drugs
+        :param drugs: sorted drug ids, the order of the rows and columns of the similarity matrix
+        :returns: drug similarity matrix
+        """
+        fingerprints = drug_input.get_feature_matrix(view="fingerprints", identifiers=drugs)
+        key = (tuple(drugs), hash(np.ascontiguousarray(fingerprints).tobytes()))
+        if key != self._drug_similarity_key:
+            self._drug_similarity = jaccard_similarity(fingerprints)
+            self._drug_similarity_key = key
+        return self._drug_similarity
+
     def _cmf(self, w, int_mat, drug_mat, cell_mat) -> tuple[np.ndarray, np.ndarray]:
         """
         Implements the SRMF model with specific update rules and regularization.
@@ -180,10 +230,13 @@ class SRMF(DRPModel):
         last_loss = self._compute_loss(u0, v0, w, int_mat, drug_mat, cell_mat)
         best_loss = last_loss
         wr = w * int_mat
+        # the observed entries do not change, the rows are grouped once for all iterations
+        drug_patterns = group_rows_by_pattern(w)
+        cell_line_patterns = group_rows_by_pattern(w.T)
 
         for _ in range(self.max_iter):
-            u = self._alg_update(u0, v0, w, wr, drug_mat, self.lambda_l, self.lambda_d)
-            v = self._alg_update(v0, u, w.T, wr.T, cell_mat, self.lambda_l, self.lambda_c)
+            u = self._alg_update(u0, v0, drug_patterns, wr, drug_mat, self.lambda_l, self.lambda_d)
+            v = self._alg_update(v0, u, cell_line_patterns, wr.T, cell_mat, self.lambda_l, self.lambda_c)
             curr_loss = self._compute_loss(u, v, w, int_mat, drug_mat, cell_mat)
 
             if curr_loss < best_loss:
@@ -211,44 +264,50 @@ class SRMF(DRPModel):
         :param cell_mat: cell line similarity matrix
         :returns: loss value
         """
-        loss = np.sum((w * (int_mat - np.dot(u, v.T))) ** 2)
+        if np.count_nonzero(w) < w.size / 20:
+            # only the observed entries contribute, so U * V^T is not computed for the missing ones. For denser w, the
+            # matrix product is faster than the products of the observed entries.
+            rows, cols = np.nonzero(w)
+            residuals = int_mat[rows, cols] - np.einsum("ij,ij->i", u[rows], v[cols])
+            loss = np.sum((w[rows, cols] * residuals) ** 2)
+        else:
+            loss = np.sum((w * (int_mat - np.dot(u, v.T))) ** 2)
         loss += self.lambda_l * (np.sum(u**2) + np.sum(v**2))
         loss += self.lambda_d * np.sum((drug_mat - np.dot(u, u.T)) ** 2)
         loss += self.lambda_c * np.sum((cell_mat - np.dot(v, v.T)) ** 2)
         return loss
 
-    def _alg_update(self, u, v, w, r, s, lambda_l, lambda_d) -> np.ndarray:
+    def _alg_update(self, u, v, row_patterns, r, s, lambda_l, lambda_d) -> np.ndarray:
         """
         Algorithm update rule for u or v in the SRMF model.
 
+        Every row i of u solves (sum of v_j^T v_j over its observed j + 2 * lambda_d * u^T u + lambda_l * I) u_i = x_i.
+        The normal matrices of all rows are built at once from the upper triangles of the outer products v_j^T v_j,
+        using the smaller side of every pattern of observed entries. Rows with the same pattern, e.g., fully observed
+        rows, share their normal matrix. All rows are then solved in one batched call.
+
         :param u: drug latent factors
         :param v: cell line latent factors
-        :param w: weight matrix
+        :param row_patterns: rows of the weight matrix grouped by their observed entries, see group_rows_by_pattern
         :param r: weight * interaction matrix
         :param s: drug/cell line similarity matrix
         :param lambda_l: regularization parameter
         :param lambda_d: drug/cell line similarity regularization parameter
         :returns: updated u or v
         """
+        mask, complement, pattern_of_row = row_patterns
+        k = u.shape[1]
         x = np.dot(r, v) + 2 * lambda_d * np.dot(s, u)
-        y = 2 * lambda_d * np.dot(u.T, u)
-        u0 = np.zeros_like(u)
-        d = np.dot(v.T, v)
-        m, _ = w.shape
-
-        for i in range(m):
-            ii = np.where(w[i, :] > 0)[0]
-            if ii.size == 0:
-                b = y + lambda_l * np.eye(u.shape[1])
-            elif ii.size == w.shape[1]:
-                b = d + y + lambda_l * np.eye(u.shape[1])
-            else:
-                a = np.dot(v[ii, :].T, v[ii, :])
-                b = a + y + lambda_l * np.eye(u.shape[1])
-
-            u0[i, :] = np.linalg.solve(b, x[i, :])
-
-        return u0
+        upper_rows, upper_cols = np.triu_indices(k)
+        outer_products = v[:, upper_rows] * v[:, upper_cols]
+        normal = np.asarray(mask @ outer_products)
+        normal[complement] = outer_products.sum(axis=0) - normal[complement]
+        # maps every entry of a k x k matrix to its entry in the upper triangle
+        symmetric = np.empty((k, k), dtype=np.intp)
+        symmetric[upper_rows, upper_cols] = np.arange(len(upper_rows))
+        symmetric[upper_cols, upper_rows] = np.arange(len(upper_rows))
+        b = np.take(normal, symmetric, axis=1) + 2 * lambda_d * np.dot(u.T, u) + lambda_l * np.eye(k)
+        return np.linalg.solve(b[pattern_of_row], x[:, :, None])[:, :, 0]
 
     def load_cell_line_features(self, data_path: str, dataset_name: str) -> FeatureDataset:
         """
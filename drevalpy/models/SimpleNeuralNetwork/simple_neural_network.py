@@ -47,36 +47,52 @@ class SimpleNeuralNetwork(DRPModel):
         """
         self.hyperparameters = hyperparameters
 
-    def train(
+    def preprocess_features(
         self,
         output: DrugResponseDataset,
         cell_line_input: FeatureDataset,
         drug_input: FeatureDataset | None = None,
         output_earlystopping: DrugResponseDataset | None = None,
-    ) -> None:
+    ) -> tuple[FeatureDataset, FeatureDataset | None]:
         """
-        First scales the gene expression data and trains the model.
+        Scales the gene expression data.
 
         The gene expression data is first arcsinh transformed. Afterward, the StandardScaler() is fitted on the
         training gene expression data only. Then, it transforms all gene expression data.
         :param output: training data associated with the response output
         :param cell_line_input: cell line omics features
         :param drug_input: drug omics features
-        :param output_earlystopping: optional early stopping dataset
-        :raises ValueError: if drug_input (fingerprints) is missing
-
+        :param output_earlystopping: optional early stopping dataset, not used
+        :returns: cell line features with scaled gene expression and the drug features
         """
-        if drug_input is None:
-            raise ValueError("drug_input (fingerprints) are required for SimpleNeuralNetwork.")
-
-        # Apply arcsinh transformation and scaling to gene expression features
         if "gene_expression" in self.cell_line_views:
             cell_line_input.apply(function=np.arcsinh, view="gene_expression")
             self.gene_expression_scaler = cell_line_input.fit_transform_features(
                 train_ids=np.unique(output.cell_line_ids),
-                transformer=self.gene_expression_scaler,
+                transformer=StandardScaler(),
                 view="gene_expression",
             )
+        return cell_line_input, drug_input
+
+    def train(
+        self,
+        output: DrugResponseDataset,
+        cell_line_input: FeatureDataset,
+        drug_input: FeatureDataset | None = None,
+        output_earlystopping: DrugResponseDataset | None = None,
+    ) -> None:
+        """
+        Trains the model on the features scaled by preprocess_features.
+
+        :param output: training data associated with the response output
+        :param cell_line_input: cell line omics features
+        :param drug_input: drug omics features
+        :param output_earlystopping: optional early stopping dataset
+        :raises ValueError: if drug_input (fingerprints) is missing
+
+        """
+        if drug_input is None:
+            raise ValueError("drug_input (fingerprints) are required for SimpleNeuralNetwork.")
 
         dim_gex = next(iter(cell_line_input.features.values()))["gene_expression"].shape[0]
         dim_fingerprint = next(iter(drug_input.features.values()))["fingerprints"].shape[0]
@@ -41,6 +41,10 @@ class RegressionDataset(Dataset):
         self.cell_line_views = cell_line_views
         self.drug_views = drug_views
         self.output = output
+        # decode the ids and gather the response once instead of for every sample
+        self.cell_line_ids = output.cell_line_ids
+        self.drug_ids = output.drug_ids
+        self.response = output.response
         self.cell_line_input = cell_line_input
         self.drug_input = drug_input
         for cl_view in self.cell_line_views:
@@ -61,9 +65,9 @@ class RegressionDataset(Dataset):
         :returns: the cell line feature(s) and the response
         :raises TypeError: if the features are not numpy arrays
         """
-        cell_line_id = self.output.cell_line_ids[idx]
-        drug_id = self.output.drug_ids[idx]
-        response = self.output.response[idx]
+        cell_line_id = self.cell_line_ids[idx]
+        drug_id = self.drug_ids[idx]
+        response = self.response[idx]
         cell_line_features = None
         drug_features = None
         for cl_view in self.cell_line_views:
@@ -99,7 +103,7 @@ class RegressionDataset(Dataset):
 
         :returns: the length of the output
         """
-        return len(self.output.response)
+        return len(self.response)
 
 
 class FeedForwardNetwork(pl.LightningModule):
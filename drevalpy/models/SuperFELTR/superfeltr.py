@@ -35,6 +35,7 @@ class SuperFELTR(DRPModel):
     cell_line_views = ["gene_expression", "mutations", "copy_number_variation_gistic"]
     drug_views = []
     early_stopping = True
+    preprocessing_hyperparameters = ["expression_var_threshold", "mutation_var_threshold", "cnv_var_threshold"]
 
     def __init__(self) -> None:
         """
@@ -78,6 +79,26 @@ class SuperFELTR(DRPModel):
         """
         self.hyperparameters = hyperparameters
 
+    def preprocess_features(
+        self,
+        output: DrugResponseDataset,
+        cell_line_input: FeatureDataset,
+        drug_input: FeatureDataset | None = None,
+        output_earlystopping: DrugResponseDataset | None = None,
+    ) -> tuple[FeatureDataset, FeatureDataset | None]:
+        """
+        Selects the features of all omics with the variance thresholds, if there is training data.
+
+        :param output: training data associated with the response output
+        :param cell_line_input: cell line omics features
+        :param drug_input: not needed, as it is a single drug model
+        :param output_earlystopping: optional early stopping dataset, not used
+        :returns: cell line omics features with selected features and the drug input
+        """
+        if len(output) > 0:
+            cell_line_input = self._feature_selection(output, cell_line_input)
+        return cell_line_input, drug_input
+
     def train(
         self,
         output: DrugResponseDataset,
@@ -86,7 +107,7 @@ class SuperFELTR(DRPModel):
         output_earlystopping: DrugResponseDataset | None = None,
     ) -> None:
         """
-        Does feature selection, trains the encoders sequentially, and then trains the regressor.
+        Trains the encoders sequentially on the features selected in preprocess_features, then trains the regressor.
 
         If there is not enough training data, the model is trained with random initialization, if there is no
         training data at all, the model is skipped and later on, NA is predicted.
@@ -101,7 +122,6 @@ class SuperFELTR(DRPModel):
             raise ValueError("SuperFELTR is a single drug model and does not require drug input.")
 
         if len(output) > 0:
-            cell_line_input = self._feature_selection(output, cell_line_input)
             if output_earlystopping is not None and self.early_stopping and len(output_earlystopping) < 2:
                 output_earlystopping = None
             dim_gex, dim_mut, dim_cnv = get_dimensions_of_omics_data(cell_line_input)
@@ -1,4 +1,10 @@
-"""Module containing all drug response prediction models."""
+"""
+Module containing all drug response prediction models.
+
+The models are imported on first access, e.g., by MODEL_FACTORY["SimpleNeuralNetwork"] or by
+``from drevalpy.models import SimpleNeuralNetwork``. Heavy dependencies such as torch are thus only imported for the
+models that need them.
+"""
 
 __all__ = [
     "NaivePredictor",
@@ -21,41 +27,171 @@ __all__ = [
     "DIPKModel",
 ]
 
-from .baselines.multi_omics_random_forest import MultiOmicsRandomForest
-from .baselines.naive_pred import NaiveCellLineMeanPredictor, NaiveDrugMeanPredictor, NaivePredictor
-from .baselines.singledrug_random_forest import SingleDrugRandomForest
-from .baselines.sklearn_models import ElasticNetModel, GradientBoosting, RandomForest, SVMRegressor
-from .DIPK.dipk import DIPKModel
+import importlib
+from collections.abc import Iterator, MutableMapping
+from typing import TYPE_CHECKING, Union
+
 from .drp_model import DRPModel
-from .MOLIR.molir import MOLIR
-from .SimpleNeuralNetwork.multiomics_neural_network import MultiOmicsNeuralNetwork
-from .SimpleNeuralNetwork.simple_neural_network import SimpleNeuralNetwork
-from .SRMF.srmf import SRMF
-from .SuperFELTR.superfeltr import SuperFELTR
 
-# SINGLE_DRUG_MODEL_FACTORY is used in the pipeline!
-SINGLE_DRUG_MODEL_FACTORY: dict[str, type[DRPModel]] = {
-    "SingleDrugRandomForest": SingleDrugRandomForest,
-    "MOLIR": MOLIR,
-    "SuperFELTR": SuperFELTR,
+if TYPE_CHECKING:
+    from .baselines.multi_omics_random_forest import MultiOmicsRandomForest
+    from .baselines.naive_pred import NaiveCellLineMeanPredictor, NaiveDrugMeanPredictor, NaivePredictor
+    from .baselines.singledrug_random_forest import SingleDrugRandomForest
+    from .baselines.sklearn_models import ElasticNetModel, GradientBoosting, RandomForest, SVMRegressor
+    from .DIPK.dipk import DIPKModel
+    from .MOLIR.molir import MOLIR
+    from .SimpleNeuralNetwork.multiomics_neural_network import MultiOmicsNeuralNetwork
+    from .SimpleNeuralNetwork.simple_neural_network import SimpleNeuralNetwork
+    from .SRMF.srmf import SRMF
+    from .SuperFELTR.superfeltr import SuperFELTR
+
+# module of every model class, relative to this package
+_MODEL_MODULES = {
+    "NaivePredictor": ".baselines.naive_pred",
+    "NaiveDrugMeanPredictor": ".baselines.naive_pred",
+    "NaiveCellLineMeanPredictor": ".baselines.naive_pred",
+    "ElasticNetModel": ".baselines.sklearn_models",
+    "RandomForest": ".baselines.sklearn_models",
+    "SVMRegressor": ".baselines.sklearn_models",
+    "GradientBoosting": ".baselines.sklearn_models",
+    "MultiOmicsRandomForest": ".baselines.multi_omics_random_forest",
+    "SingleDrugRandomForest": ".baselines.singledrug_random_forest",
+    "SimpleNeuralNetwork": ".SimpleNeuralNetwork.simple_neural_network",
+    "MultiOmicsNeuralNetwork": ".SimpleNeuralNetwork.multiomics_neural_network",
+    "SRMF": ".SRMF.srmf",
+    "MOLIR": ".MOLIR.molir",
+    "SuperFELTR": ".SuperFELTR.superfeltr",
+    "DIPKModel": ".DIPK.dipk",
 }
 
-# MULTI_DRUG_MODEL_FACTORY is used in the pipeline!
-MULTI_DRUG_MODEL_FACTORY: dict[str, type[DRPModel]] = {
-    "NaivePredictor": NaivePredictor,
-    "NaiveDrugMeanPredictor": NaiveDrugMeanPredictor,
-    "NaiveCellLineMeanPredictor": NaiveCellLineMeanPredictor,
-    "ElasticNet": ElasticNetModel,
-    "RandomForest": RandomForest,
-    "SVR": SVMRegressor,
-    "SimpleNeuralNetwork": SimpleNeuralNetwork,
-    "MultiOmicsNeuralNetwork": MultiOmicsNeuralNetwork,
-    "MultiOmicsRandomForest": MultiOmicsRandomForest,
-    "GradientBoosting": GradientBoosting,
-    "SRMF": SRMF,
-    "DIPK": DIPKModel,
+
+def __getattr__(name: str) -> type[DRPModel]:
+    """
+    Imports a model class on first access.
+
+    :param name: name of the model class, e.g., SimpleNeuralNetwork
+    :returns: the model class
+    :raises AttributeError: if there is no model class with this name
+    """
+    if name not in _MODEL_MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    model_class = getattr(importlib.import_module(_MODEL_MODULES[name], __name__), name)
+    globals()[name] = model_class
+    return model_class
+
+
+class LazyModelFactory(MutableMapping[str, type[DRPModel]]):
+    """
+    Mapping from model names to model classes, which imports the module of a model on its first lookup.
+
+    Membership tests, iteration and len do not import any model. Custom models can be registered by assigning the
+    class, e.g., MODEL_FACTORY["MyModel"] = MyModel.
+    """
+
+    def __init__(self, models: dict[str, Union[str, type[DRPModel]]]) -> None:
+        """
+        Initializes the factory.
+
+        :param models: model name mapped to the model class or to the name of a model class of this package
+        """
+        self._models = dict(models)
+
+    def __getitem__(self, model_name: str) -> type[DRPModel]:
+        """
+        Returns the model class, importing its module if needed.
+
+        :param model_name: name of the model, e.g., SimpleNeuralNetwork
+        :returns: the model class
+        """
+        model_class = self._models[model_name]
+        if isinstance(model_class, str):
+            model_class = self._models[model_name] = __getattr__(model_class)
+        return model_class
+
+    def __setitem__(self, model_name: str, model_class: type[DRPModel]) -> None:
+        """
+        Registers a model class.
+
+        :param model_name: name of the model
+        :param model_class: the model class
+        """
+        self._models[model_name] = model_class
+
+    def __delitem__(self, model_name: str) -> None:
+        """
+        Removes a model.
+
+        :param model_name: name of the model
+        """
+        del self._models[model_name]
+
+    def __contains__(self, model_name: object) -> bool:
+        """
+        Checks whether a model is registered without importing it.
+
+        :param model_name: name of the model
+        :returns: whether the model is registered
+        """
+        return model_name in self._models
+
+    def __iter__(self) -> Iterator[str]:
+        """
+        Iterates over the model names.
+
+        :returns: iterator over the model names
+        """
+        return iter(self._models)
+
+    def __len__(self) -> int:
+        """
+        Returns the number of models.
+
+        :returns: number of models
+        """
+        return len(self._models)
+
+    def __repr__(self) -> str:
+        """
+        Returns the model names, the models are not imported.
+
+        :returns: string representation of the factory
+        """
+        return f"{type(self).__name__}({list(self._models)})"
+
+    def copy(self) -> "LazyModelFactory":
+        """
+        Returns a shallow copy which shares the already imported model classes.
+
+        :returns: copy of the factory
+        """
+        return LazyModelFactory(self._models)
+
+
+_SINGLE_DRUG_MODELS: dict[str, Union[str, type[DRPModel]]] = {
+    "SingleDrugRandomForest": "SingleDrugRandomForest",
+    "MOLIR": "MOLIR",
+    "SuperFELTR": "SuperFELTR",
+}
+_MULTI_DRUG_MODELS: dict[str, Union[str, type[DRPModel]]] = {
+    "NaivePredictor": "NaivePredictor",
+    "NaiveDrugMeanPredictor": "NaiveDrugMeanPredictor",
+    "NaiveCellLineMeanPredictor": "NaiveCellLineMeanPredictor",
+    "ElasticNet": "ElasticNetModel",
+    "RandomForest": "RandomForest",
+    "SVR": "SVMRegressor",
+    "SimpleNeuralNetwork": "SimpleNeuralNetwork",
+    "MultiOmicsNeuralNetwork": "MultiOmicsNeuralNetwork",
+    "MultiOmicsRandomForest": "MultiOmicsRandomForest",
+    "GradientBoosting": "GradientBoosting",
+    "SRMF": "SRMF",
+    "DIPK": "DIPKModel",
 }
 
+# SINGLE_DRUG_MODEL_FACTORY is used in the pipeline!
+SINGLE_DRUG_MODEL_FACTORY = LazyModelFactory(_SINGLE_DRUG_MODELS)
+
+# MULTI_DRUG_MODEL_FACTORY is used in the pipeline!
+MULTI_DRUG_MODEL_FACTORY = LazyModelFactory(_MULTI_DRUG_MODELS)
+
 # MODEL_FACTORY is used in the pipeline!
-MODEL_FACTORY = MULTI_DRUG_MODEL_FACTORY.copy()
-MODEL_FACTORY.update(SINGLE_DRUG_MODEL_FACTORY)
+MODEL_FACTORY = LazyModelFactory({**_MULTI_DRUG_MODELS, **_SINGLE_DRUG_MODELS})
@@ -92,3 +92,13 @@ class SingleDrugRandomForest(RandomForest):
             drug_input=None,
         )
         return self.model.predict(x)
+
+    def load_drug_features(self, data_path: str, dataset_name: str) -> FeatureDataset | None:
+        """
+        Returns None, as drug features are not needed for SingleDrugRandomForest.
+
+        :param data_path: path to the data
+        :param dataset_name: name of the dataset
+        :returns: None
+        """
+        return None
@@ -1,10 +1,11 @@
 """Contains sklearn baseline models: ElasticNet, RandomForest, SVM."""
 
-from typing import Optional
+from typing import Any, Optional
 
 import numpy as np
 from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
-from sklearn.linear_model import ElasticNet, Lasso, Ridge
+from sklearn.linear_model import ElasticNet, Lasso, Ridge, enet_path
+from sklearn.metrics.pairwise import rbf_kernel
 from sklearn.svm import SVR
 
 from drevalpy.datasets.dataset import DrugResponseDataset, FeatureDataset
@@ -160,6 +161,74 @@ class ElasticNetModel(SklearnModel):
                 l1_ratio=hyperparameters["l1_ratio"],
             )
 
+    def predict_hyperparameter_path(
+        self,
+        hpam_set: list[dict[str, Any]],
+        output: DrugResponseDataset,
+        cell_line_ids: np.ndarray,
+        drug_ids: np.ndarray,
+        cell_line_input: FeatureDataset,
+        drug_input: FeatureDataset | None = None,
+    ) -> list[np.ndarray]:
+        """
+        Fits the regularization path once per l1 ratio and predicts the response for every alpha.
+
+        Ridge (l1 ratio 0) is solved in closed form for all alphas from one decomposition of the training matrix. For
+        the other l1 ratios, one warm-started coordinate descent over the decreasing alphas (enet_path) replaces the
+        separate fits. The feature matrices are only built once.
+
+        :param hpam_set: hyperparameter configurations, each containing l1_ratio and alpha
+        :param output: training dataset containing the response output
+        :param cell_line_ids: cell line ids to predict
+        :param drug_ids: drug ids to predict
+        :param cell_line_input: dataset containing gene expression data
+        :param drug_input: dataset containing fingerprints data
+        :returns: predicted response for every configuration, in the order of hpam_set
+        :raises ValueError: If drug_input is None.
+        """
+        if drug_input is None:
+            raise ValueError("drug_input (fingerprints) is required for the sklearn models.")
+
+        x_train = self.get_concatenated_features(
+            cell_line_view="gene_expression",
+            drug_view="fingerprints",
+            cell_line_ids_output=output.cell_line_ids,
+            drug_ids_output=output.drug_ids,
+            cell_line_input=cell_line_input,
+            drug_input=drug_input,
+        ).astype(np.float64)
+        x_predict = self.get_concatenated_features(
+            cell_line_view="gene_expression",
+            drug_view="fingerprints",
+            cell_line_ids_output=cell_line_ids,
+            drug_ids_output=drug_ids,
+            cell_line_input=cell_line_input,
+            drug_input=drug_input,
+        ).astype(np.float64)
+        # the sklearn models fit an intercept, which is equivalent to solving on centered data
+        x_mean = x_train.mean(axis=0)
+        y_mean = output.response.mean()
+        x_train -= x_mean
+        x_predict -= x_mean
+        y_train = output.response - y_mean
+
+        predictions: list[np.ndarray] = [np.array([])] * len(hpam_set)
+        for l1_ratio in dict.fromkeys(hyperparameters["l1_ratio"] for hyperparameters in hpam_set):
+            indices = [i for i, hyperparameters in enumerate(hpam_set) if hyperparameters["l1_ratio"] == l1_ratio]
+            alphas = np.array([hpam_set[i]["alpha"] for i in indices], dtype=np.float64)
+            if l1_ratio == 0.0:
+                coefs = _ridge_path(x_train, y_train, alphas)
+            else:
+                # enet_path expects decreasing alphas
+                order = np.argsort(-alphas, kind="stable")
+                _, path_coefs, _ = enet_path(x_train, y_train, l1_ratio=l1_ratio, alphas=alphas[order])
+                coefs = np.empty_like(path_coefs)
+                coefs[:, order] = path_coefs
+            path_predictions = x_predict @ coefs + y_mean
+            for column, i in enumerate(indices):
+                predictions[i] = path_predictions[:, column]
+        return predictions
+
 
 class RandomForest(SklearnModel):
     """RandomForest model for drug response prediction."""
@@ -191,7 +260,15 @@ class RandomForest(SklearnModel):
 
 
 class SVMRegressor(SklearnModel):
-    """SVM model for drug response prediction."""
+    """
+    SVM model for drug response prediction.
+
+    During the grid search of hpam_tune, the RBF kernel matrices are computed once and shared by all C/epsilon
+    combinations, see predict_hyperparameter_path. Successive halving and raytune train the combinations separately.
+    """
+
+    # maximum size of the cached training and prediction kernel matrices, larger folds are fitted without the cache
+    kernel_cache_max_bytes = 4 * 1024**3
 
     @classmethod
     def get_model_name(cls) -> str:
@@ -215,6 +292,87 @@ class SVMRegressor(SklearnModel):
             max_iter=hyperparameters["max_iter"],
         )
 
+    def predict_hyperparameter_path(
+        self,
+        hpam_set: list[dict[str, Any]],
+        output: DrugResponseDataset,
+        cell_line_ids: np.ndarray,
+        drug_ids: np.ndarray,
+        cell_line_input: FeatureDataset,
+        drug_input: FeatureDataset | None = None,
+    ) -> list[np.ndarray]:
+        """
+        Fits all hyperparameter configurations on one precomputed kernel matrix and predicts the response with each.
+
+        The RBF kernel between the training samples and the kernel between the samples to predict and the training
+        samples only depend on the training matrix, not on C or epsilon. Both are computed once per fold and all RBF
+        configurations are fitted with kernel="precomputed", which gives the same models as kernel="rbf" with the
+        default gamma="scale". Other kernels, and folds whose kernel matrices would exceed kernel_cache_max_bytes,
+        are trained separately.
+
+        :param hpam_set: hyperparameter configurations, each containing kernel, C, epsilon, and max_iter
+        :param output: training dataset containing the response output
+        :param cell_line_ids: cell line ids to predict
+        :param drug_ids: drug ids to predict
+        :param cell_line_input: dataset containing gene expression data
+        :param drug_input: dataset containing fingerprints data
+        :returns: predicted response for every configuration, in the order of hpam_set
+        :raises ValueError: If drug_input is None.
+        """
+        if drug_input is None:
+            raise ValueError("drug_input (fingerprints) is required for the sklearn models.")
+
+        n_train = len(output)
+        kernel_bytes = 8 * n_train * (n_train + len(cell_line_ids))
+        use_cache = kernel_bytes <= self.kernel_cache_max_bytes
+        train_kernel = predict_kernel = None
+        if use_cache and any(hyperparameters["kernel"] == "rbf" for hyperparameters in hpam_set):
+            x_train = self.get_concatenated_features(
+                cell_line_view="gene_expression",
+                drug_view="fingerprints",
+                cell_line_ids_output=output.cell_line_ids,
+                drug_ids_output=output.drug_ids,
+                cell_line_input=cell_line_input,
+                drug_input=drug_input,
+            ).astype(np.float64)
+            x_predict = self.get_concatenated_features(
+                cell_line_view="gene_expression",
+                drug_view="fingerprints",
+                cell_line_ids_output=cell_line_ids,
+                drug_ids_output=drug_ids,
+                cell_line_input=cell_line_input,
+                drug_input=drug_input,
+            ).astype(np.float64)
+            # gamma="scale" as in sklearn's SVR
+            variance = x_train.var()
+            gamma = 1.0 / (x_train.shape[1] * variance) if variance != 0 else 1.0
+            train_kernel = _blockwise_rbf_kernel(x_train, x_train, gamma)
+            predict_kernel = _blockwise_rbf_kernel(x_predict, x_train, gamma)
+
+        predictions = []
+        for hyperparameters in hpam_set:
+            if train_kernel is not None and hyperparameters["kernel"] == "rbf":
+                self.model = SVR(
+                    kernel="precomputed",
+                    C=hyperparameters["C"],
+                    epsilon=hyperparameters["epsilon"],
+                    max_iter=hyperparameters["max_iter"],
+                )
+                self.model.fit(train_kernel, output.response)
+                predictions.append(self.model.predict(predict_kernel))
+            else:
+                self.build_model(hyperparameters)
+                self.train(output=output, cell_line_input=cell_line_input, drug_input=drug_input)
+                predictions.append(
+                    self.predict(
+                        cell_line_ids=cell_line_ids,
+                        drug_ids=drug_ids,
+                        cell_line_input=cell_line_input,
+                        drug_input=drug_input,
+                    )
+                )
+        return predictions
+
 
 class GradientBoosting(SklearnModel):
     """Gradient Boosting model for drug response prediction."""
@@ -243,3 +401,46 @@ class GradientBoosting(SklearnModel):
             max_depth=hyperparameters.get("max_depth", 3),
             subsample=hyperparameters.get("subsample", 1.0),
         )
+
+
+def _ridge_path(x: np.ndarray, y: np.ndarray, alphas: np.ndarray) -> np.ndarray:
+    """
+    Solves ridge regression without intercept for several alphas from one decomposition of x.
+
+    With the singular value decomposition x = U S V^T, the solution is V diag(s / (s^2 + alpha)) U^T y. If there are
+    more samples than features, V and s^2 are computed from the smaller matrix x^T x instead.
+
+    :param x: centered feature matrix, samples x features
+    :param y: centered response
+    :param alphas: regularization strengths
+    :returns: coefficients, features x alphas
+    """
+    if x.shape[0] > x.shape[1]:
+        squared_singular_values, v = np.linalg.eigh(x.T @ x)
+        squared_singular_values = np.clip(squared_singular_values, 0, None)
+        projected_y = v.T @ (x.T @ y)
+        return v @ (projected_y[:, None] / (squared_singular_values[:, None] + alphas[None, :]))
+    u, singular_values, v_transposed = np.linalg.svd(x, full_matrices=False)
+    projected_y = u.T @ y
+    shrinkage = singular_values[:, None] / (singular_values[:, None] ** 2 + alphas[None, :])
+    return v_transposed.T @ (shrinkage * projected_y[:, None])
+
+
+def _blockwise_rbf_kernel(x: np.ndarray, y: np.ndarray, gamma: float, block_bytes: int = 256 * 1024**2) -> np.ndarray:
+    """
+    Computes the RBF kernel matrix between the rows of x and y in blocks of rows of x.
+
+    The blocks limit the memory of the temporary distance matrices to about block_bytes on top of the result.
+
+    :param x: feature matrix, samples x features
+    :param y: feature matrix, samples x features
+    :param gamma: RBF kernel coefficient
+    :param block_bytes: approximate memory of one block
+    :returns: kernel matrix, samples of x x samples of y
+    """
+    kernel = np.empty((x.shape[0], y.shape[0]), dtype=np.float64)
+    block_rows = max(1, block_bytes // (8 * max(1, y.shape[0])))
+    for start in range(0, x.shape[0], block_rows):
+        rows = slice(start, start + block_rows)
+        kernel[rows] = rbf_kernel(x[rows], y, gamma=gamma)
+    return kernel
@@ -9,6 +9,7 @@ The DRPModel class is an abstract wrapper class for drug response prediction mod
 import inspect
 import os
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from typing import Any, Optional
 
 import numpy as np
@@ -32,6 +33,11 @@ class DRPModel(ABC):
     early_stopping = False
     # Then, the model is trained per drug
     is_single_drug_model = False
+    # Hyperparameters preprocess_features depends on. The preprocessing is fitted once per training data and value of
+    # these hyperparameters and reused for all other hyperparameter configurations, see get_preprocessed_features.
+    preprocessing_hyperparameters: list[str] = []
+    # number of fitted preprocessings kept by get_preprocessed_features
+    preprocessing_cache_size = 2
 
     @classmethod
     @abstractmethod
@@ -104,6 +110,82 @@ class DRPModel(ABC):
             self.model = ElasticNet(alpha=hyperparameters["alpha"], l1_ratio=hyperparameters["l1_ratio"])
         """
 
+    def preprocess_features(
+        self,
+        output: DrugResponseDataset,
+        cell_line_input: FeatureDataset,
+        drug_input: FeatureDataset | None = None,
+        output_earlystopping: DrugResponseDataset | None = None,
+    ) -> tuple[FeatureDataset, FeatureDataset | None]:
+        """
+        Fits the preprocessing of the input features on the training data and transforms the features.
+
+        Optional. Models which, e.g., scale or select their features override this instead of transforming the
+        features in train. The inputs are copies which may be modified in place. The result may only depend on the
+        cell lines and drugs (not the responses) of the training and early stopping data and on the hyperparameters
+        listed in preprocessing_hyperparameters. The pipeline calls it through get_preprocessed_features and passes
+        the result to train and predict.
+
+        :param output: training data associated with the response output
+        :param cell_line_input: input associated with the cell line
+        :param drug_input: input associated with the drug
+        :param output_earlystopping: optional early stopping dataset
+        :returns: preprocessed cell line and drug features, per default the unchanged inputs
+        """
+        return cell_line_input, drug_input
+
+    @pipeline_function
+    def get_preprocessed_features(
+        self,
+        hyperparameters: dict[str, Any],
+        output: DrugResponseDataset,
+        cell_line_input: FeatureDataset,
+        drug_input: FeatureDataset | None = None,
+        output_earlystopping: DrugResponseDataset | None = None,
+    ) -> tuple[FeatureDataset, FeatureDataset | None]:
+        """
+        Returns the preprocessed features, fitting preprocess_features only once for the same inputs.
+
+        The fitted preprocessings are cached per cell lines and drugs of the training and early stopping data, values
+        of the preprocessing_hyperparameters and input FeatureDatasets. The responses are not part of the key, as the
+        preprocessing must not depend on them. The input features are identified by object identity, since the
+        pipeline passes the same shared features for all hyperparameter configurations of a split; the cache keeps
+        references to them. The returned features are copy-on-write copies of the cached ones, so their matrices
+        are read-only and models modifying them in train do not change the cache.
+
+        :param hyperparameters: hyperparameters the model was built with
+        :param output: training data associated with the response output
+        :param cell_line_input: input associated with the cell line, not modified
+        :param drug_input: input associated with the drug, not modified
+        :param output_earlystopping: optional early stopping dataset
+        :returns: copy-on-write copies of the preprocessed cell line and drug features
+        """
+        key = (
+            repr([hyperparameters.get(name) for name in self.preprocessing_hyperparameters]),
+            _ids_key(output),
+            _ids_key(output_earlystopping) if output_earlystopping is not None else None,
+            id(cell_line_input),
+            id(drug_input),
+        )
+        cache: OrderedDict[tuple, tuple] = self.__dict__.setdefault("_preprocessing_cache", OrderedDict())
+        if key in cache:
+            cache.move_to_end(key)
+        else:
+            preprocessed = self.preprocess_features(
+                output=output,
+                cell_line_input=cell_line_input.copy_on_write(),
+                drug_input=drug_input.copy_on_write() if drug_input is not None else None,
+                output_earlystopping=output_earlystopping,
+            )
+            # the inputs are stored with their result, so their ids cannot be reused by other objects
+            cache[key] = (cell_line_input, drug_input, *preprocessed)
+            while len(cache) > self.preprocessing_cache_size:
+                cache.popitem(last=False)
+        _, _, cell_line_features, drug_features = cache[key]
+        return cell_line_features.copy_on_write(), (
+            drug_features.copy_on_write() if drug_features is not None else None
+        )
+
     @abstractmethod
     def train(
         self,
@@ -140,6 +222,42 @@ class DRPModel(ABC):
         :returns: predicted response
         """
 
+    def predict_hyperparameter_path(
+        self,
+        hpam_set: list[dict[str, Any]],
+        output: DrugResponseDataset,
+        cell_line_ids: np.ndarray,
+        drug_ids: np.ndarray,
+        cell_line_input: FeatureDataset,
+        drug_input: FeatureDataset | None = None,
+    ) -> list[np.ndarray]:
+        """
+        Trains the model for all hyperparameter configurations at once and predicts the response with each of them.
+
+        Optional. Models whose configurations share most of their computation, e.g., a regularization path, can
+        override this. The grid search of hpam_tune then calls it once instead of training every configuration
+        separately, see has_hyperparameter_path.
+
+        :param hpam_set: hyperparameter configurations
+        :param output: training data associated with the response output
+        :param cell_line_ids: cell line ids to predict
+        :param drug_ids: drug ids to predict
+        :param cell_line_input: input associated with the cell line
+        :param drug_input: input associated with the drug
+        :returns: predicted response for every configuration, in the order of hpam_set
+        :raises NotImplementedError: if the model does not implement a hyperparameter path
+        """
+        raise NotImplementedError(f"{self.get_model_name()} does not implement a hyperparameter path.")
+
+    @classmethod
+    def has_hyperparameter_path(cls) -> bool:
+        """
+        Whether the model overrides predict_hyperparameter_path.
+
+        :returns: True if hpam_tune can use predict_hyperparameter_path
+        """
+        return cls.predict_hyperparameter_path is not DRPModel.predict_hyperparameter_path
+
     @abstractmethod
     def load_cell_line_features(self, data_path: str, dataset_name: str) -> FeatureDataset:
         """
@@ -292,14 +410,27 @@ class DRPModel(ABC):
             for cell_line_view in self.cell_line_views:
                 if cell_line_view not in cell_line_input.view_names:
                     raise ValueError(f"Cell line input does not contain view {cell_line_view}")
-                cell_line_feature_matrices[cell_line_view] = cell_line_input.get_feature_matrix(
-                    view=cell_line_view, identifiers=cell_line_ids
-                )
+            # one identifier lookup, then one gather per view
+            cell_line_feature_matrices = cell_line_input.get_feature_matrices(
+                views=self.cell_line_views, identifiers=cell_line_ids
+            )
         drug_feature_matrices = {}
         if drug_input is not None:
             for drug_view in self.drug_views:
                 if drug_view not in drug_input.view_names:
                     raise ValueError(f"Drug input does not contain view {drug_view}")
-                drug_feature_matrices[drug_view] = drug_input.get_feature_matrix(view=drug_view, identifiers=drug_ids)
+            drug_feature_matrices = drug_input.get_feature_matrices(views=self.drug_views, identifiers=drug_ids)
 
         return {**cell_line_feature_matrices, **drug_feature_matrices}
+
+
+def _ids_key(dataset: DrugResponseDataset) -> tuple:
+    """
+    Returns a hashable key of the cell lines and drugs of every row of a dataset, ignoring the responses.
+
+    :param dataset: drug response dataset
+    :returns: dataset name, sorted unique cell line and drug ids and the codes of every row into them
+    """
+    cell_lines, cell_line_codes = dataset.factorize_ids("cell_line")
+    drugs, drug_codes = dataset.factorize_ids("drug")
+    return dataset.dataset_name, tuple(cell_lines), cell_line_codes.tobytes(), tuple(drugs), drug_codes.tobytes()
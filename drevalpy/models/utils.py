@@ -8,6 +8,7 @@ import numpy as np
 import pandas as pd
 
 from drevalpy.datasets.dataset import FeatureDataset
+from drevalpy.datasets.utils import CACHE_DIR_NAME, load_feature_matrix
 
 
 def load_cl_ids_from_csv(path: str, dataset_name: str) -> FeatureDataset:
@@ -38,15 +39,19 @@ def load_and_reduce_gene_features(
     :returns: FeatureDataset with the reduced features
     :raises ValueError: if genes from gene_list are missing in the dataset
     """
-    ge = pd.read_csv(f"{data_path}/{dataset_name}/{feature_type}.csv", index_col=1)
-    # remove column
-    ge = ge.drop(columns=["cellosaurus_id"])
-    cl_features = FeatureDataset(
-        features=iterate_features(df=ge, feature_type=feature_type),
-        meta_info={feature_type: ge.columns.values},
+    cell_line_ids, genes, matrix = load_feature_matrix(
+        os.path.join(data_path, dataset_name, f"{feature_type}.csv"),
+        index_col=1,
+        drop_columns=["cellosaurus_id"],
+        cache_dir=os.path.join(data_path, dataset_name, CACHE_DIR_NAME),
     )
+    cell_line_ids, matrix = _drop_duplicate_rows(cell_line_ids, matrix, feature_type=feature_type)
+    # convert to float values, a no-op for cached float matrices
+    matrix = matrix.astype(float, copy=False)
     if gene_list is None:
-        return cl_features
+        return FeatureDataset.from_matrices(
+            identifiers=cell_line_ids, views={feature_type: matrix}, meta_info={feature_type: genes}
+        )
 
     gene_info = pd.read_csv(
         f"{data_path}/{dataset_name}/gene_lists/{gene_list}.csv",
@@ -54,10 +59,7 @@ def load_and_reduce_gene_features(
     )
 
     genes_in_list = set(gene_info["Symbol"])
-    if cl_features.meta_info is None:
-        raise ValueError("No meta information available in the dataset.")
-
-    genes_in_features = set(cl_features.meta_info[feature_type])
+    genes_in_features = set(genes)
     # Ensure that all genes from gene_list are in the dataset
     missing_genes = genes_in_list - genes_in_features
     if missing_genes:
@@ -73,12 +75,34 @@ def load_and_reduce_gene_features(
                 f"{', '.join(missing_genes_list)}"
             )
 
-    # Only proceed with genes that are available
-    gene_mask = np.array([gene in genes_in_list for gene in cl_features.meta_info[feature_type]])
-    cl_features.meta_info[feature_type] = cl_features.meta_info[feature_type][gene_mask]
-    for cell_line in cl_features.features.keys():
-        cl_features.features[cell_line][feature_type] = cl_features.features[cell_line][feature_type][gene_mask]
-    return cl_features
+    # Only proceed with genes that are available: column selection on the whole matrix
+    gene_mask = np.isin(genes, list(genes_in_list))
+    return FeatureDataset.from_matrices(
+        identifiers=cell_line_ids,
+        views={feature_type: matrix[:, gene_mask]},
+        meta_info={feature_type: genes[gene_mask]},
+    )
+
+
+def _drop_duplicate_rows(
+    identifiers: np.ndarray, matrix: np.ndarray, feature_type: str
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Keeps only the first row of identifiers occurring multiple times.
+
+    :param identifiers: row identifiers
+    :param matrix: feature matrix
+    :param feature_type: type of feature, e.g., gene_expression, methylation, etc.
+    :returns: unique identifiers and the corresponding rows of the matrix
+    """
+    duplicated = pd.Index(identifiers).duplicated()
+    if not duplicated.any():
+        return identifiers, matrix
+    for identifier in unique(identifiers[duplicated]):
+        warnings.warn(
+            f"Multiple rows returned for {identifier} in feature {feature_type}, taking the first one.", stacklevel=3
+        )
+    return identifiers[~duplicated], matrix[~duplicated]
 
 
 def iterate_features(df: pd.DataFrame, feature_type: str) -> dict[str, dict[str, np.ndarray]]:
@@ -123,16 +147,19 @@ def load_drug_fingerprint_features(data_path: str, dataset_name: str) -> Feature
     :param dataset_name: name of the dataset, e.g., GDSC2
     :returns: FeatureDataset with the drug fingerprints
     """
+    cache_dir = os.path.join(data_path, dataset_name, CACHE_DIR_NAME)
     if dataset_name == "Toy_Data":
-        fingerprints = pd.read_csv(os.path.join(data_path, dataset_name, "fingerprints.csv"), index_col=0)
+        drug_ids, _, fingerprints = load_feature_matrix(
+            os.path.join(data_path, dataset_name, "fingerprints.csv"), index_col=0, cache_dir=cache_dir
+        )
     else:
-        fingerprints = pd.read_csv(
+        drug_ids, _, fingerprints = load_feature_matrix(
             os.path.join(data_path, dataset_name, "drug_fingerprints", "drug_name_to_demorgan_128_map.csv"),
             index_col=0,
-        ).T
-    return FeatureDataset(
-        features={drug: {"fingerprints": fingerprints.loc[drug].values} for drug in fingerprints.index}
-    )
+            transpose=True,
+            cache_dir=cache_dir,
+        )
+    return FeatureDataset.from_matrices(identifiers=drug_ids, views={"fingerprints": fingerprints})
 
 
 def get_multiomics_feature_dataset(
@@ -0,0 +1,229 @@
+"""
+Tracing of the stages of an experiment.
+
+Stages such as feature loading, training, prediction, evaluation and CSV writes are wrapped in named spans::
+
+    with trace_span("train", model="ElasticNet", split=0):
+        model.train(...)
+
+While tracing is active (see start_tracing), every span records its wall time and the peak resident set size (RSS)
+of the process. The spans can be saved as a Chrome trace (open trace.json in chrome://tracing or
+https://ui.perfetto.dev) and summarized per stage. Without an active tracer, spans do nothing.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any, Optional
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None  # type: ignore[assignment]
+
+TRACE_FILE_NAME = "trace.json"
+SUMMARY_FILE_NAME = "timing_summary.csv"
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """
+    Returns the peak resident set size of the current process.
+
+    :returns: peak RSS in bytes or None if it cannot be determined on this platform
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Tracer:
+    """Collects the spans of one process as Chrome trace events."""
+
+    def __init__(self):
+        """Initializes an empty tracer."""
+        self.events: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, category: str = "experiment", **args: Any) -> Iterator[None]:
+        """
+        Records the wall time and peak RSS of the enclosed block as a complete event.
+
+        :param name: name of the stage, e.g., "train"
+        :param category: category of the stage, e.g., "model"
+        :param args: context of the span, e.g., model name, split index, drug or hyperparameters
+        :yields: nothing, the block is timed
+        """
+        peak_before = peak_rss_bytes()
+        # wall clock times align the spans of worker processes
+        start_ns = time.time_ns()
+        try:
+            yield
+        finally:
+            end_ns = time.time_ns()
+            peak_after = peak_rss_bytes()
+            event_args = {key: _to_json_value(value) for key, value in args.items()}
+            if peak_before is not None and peak_after is not None:
+                event_args["peak_rss_mb"] = peak_after / 2**20
+                event_args["peak_rss_increase_mb"] = (peak_after - peak_before) / 2**20
+            event = {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                # Chrome traces use microseconds. Integer start times keep the sub-microsecond precision of the
+                # durations when spans are compared.
+                "ts": start_ns // 1000,
+                "dur": (end_ns - start_ns) / 1e3,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": event_args,
+            }
+            with self._lock:
+                self.events.append(event)
+
+    def add_events(self, events: list[dict[str, Any]]) -> None:
+        """
+        Adds events recorded by another tracer, e.g., of a worker process.
+
+        :param events: Chrome trace events
+        """
+        with self._lock:
+            self.events.extend(events)
+
+    def drain_events(self) -> list[dict[str, Any]]:
+        """
+        Returns the recorded events and removes them from the tracer.
+
+        :returns: Chrome trace events
+        """
+        with self._lock:
+            events, self.events = self.events, []
+        return events
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Summarizes the spans per stage.
+
+        Times are inclusive, i.e., the time of a span contains the time of the spans nested in it.
+
+        :returns: table with one row per stage, sorted by total wall time: calls, total, mean and max wall time in
+            seconds, share of the traced wall time, maximum peak RSS and largest peak RSS increase of one call in MB.
+            The increases are not summed, as nested calls of a stage would count the same increase twice.
+        """
+        columns = [
+            "stage",
+            "calls",
+            "total_s",
+            "mean_s",
+            "max_s",
+            "share_of_wall_time",
+            "peak_rss_mb",
+            "peak_rss_increase_mb",
+        ]
+        if not self.events:
+            return pd.DataFrame(columns=columns)
+        events = pd.DataFrame(
+            {
+                "stage": [event["name"] for event in self.events],
+                "duration": [event["dur"] / 1e6 for event in self.events],
+                "peak_rss_mb": [event["args"].get("peak_rss_mb", float("nan")) for event in self.events],
+                "peak_rss_increase_mb": [
+                    event["args"].get("peak_rss_increase_mb", float("nan")) for event in self.events
+                ],
+            }
+        )
+        first_start = min(event["ts"] for event in self.events)
+        wall_time = max((event["ts"] - first_start) + event["dur"] for event in self.events) / 1e6
+        summary = events.groupby("stage").agg(
+            calls=("duration", "size"),
+            total_s=("duration", "sum"),
+            mean_s=("duration", "mean"),
+            max_s=("duration", "max"),
+            peak_rss_mb=("peak_rss_mb", "max"),
+            peak_rss_increase_mb=("peak_rss_increase_mb", "max"),
+        )
+        summary["share_of_wall_time"] = summary["total_s"] / wall_time if wall_time > 0 else float("nan")
+        return summary.reset_index()[columns].sort_values("total_s", ascending=False, ignore_index=True)
+
+    def save(self, path: str) -> None:
+        """
+        Saves the Chrome trace and the summary table to a directory.
+
+        :param path: output directory, the files are named TRACE_FILE_NAME and SUMMARY_FILE_NAME
+        """
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, TRACE_FILE_NAME), "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+        self.summary().to_csv(os.path.join(path, SUMMARY_FILE_NAME), index=False)
+
+
+_active_tracer: Optional[Tracer] = None
+
+
+def start_tracing() -> Tracer:
+    """
+    Starts tracing in the current process. Spans are recorded until stop_tracing is called.
+
+    :returns: the active tracer
+    """
+    global _active_tracer
+    _active_tracer = Tracer()
+    return _active_tracer
+
+
+def stop_tracing() -> Optional[Tracer]:
+    """
+    Stops tracing in the current process.
+
+    :returns: the tracer that was active or None if tracing was not active
+    """
+    global _active_tracer
+    tracer, _active_tracer = _active_tracer, None
+    return tracer
+
+
+def get_tracer() -> Optional[Tracer]:
+    """
+    Returns the active tracer.
+
+    :returns: the active tracer or None if tracing is not active
+    """
+    return _active_tracer
+
+
+@contextmanager
+def trace_span(name: str, category: str = "experiment", **args: Any) -> Iterator[None]:
+    """
+    Records the enclosed block as a span of the active tracer, see Tracer.span. Does nothing if tracing is not active.
+
+    :param name: name of the stage, e.g., "train"
+    :param category: category of the stage, e.g., "model"
+    :param args: context of the span, e.g., model name, split index, drug or hyperparameters
+    :yields: nothing, the block is timed
+    """
+    tracer = _active_tracer
+    if tracer is None:
+        yield
+        return
+    with tracer.span(name, category, **args):
+        yield
+
+
+def _to_json_value(value: Any) -> Any:
+    """
+    Converts span arguments that are not JSON serializable, e.g., hyperparameter dictionaries with numpy values.
+
+    :param value: span argument
+    :returns: value itself if it is a JSON scalar, its string representation otherwise
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
@@ -10,6 +10,7 @@ from sklearn.preprocessing import MinMaxScaler, RobustScaler, StandardScaler
 from .datasets import AVAILABLE_DATASETS
 from .datasets.dataset import DrugResponseDataset
 from .datasets.loader import load_dataset
+from .datasets.utils import RESULT_FORMATS, result_file_suffix
 from .evaluation import AVAILABLE_METRICS
 from .experiment import drug_response_experiment, pipeline_function
 from .models import MODEL_FACTORY
@@ -174,6 +175,51 @@ def get_parser() -> argparse.ArgumentParser:
         default=False,
         help="Whether to use multiprocessing for the evaluation. Default is False",
     )
+    parser.add_argument(
+        "--n_jobs",
+        type=int,
+        default=1,
+        help="Number of cross-validation splits to run in parallel in a local process pool. Cannot be combined "
+        "with --multiprocessing. Default is 1, which runs the splits one after another.",
+    )
+    parser.add_argument(
+        "--cpus_per_trial",
+        type=int,
+        default=1,
+        help="Number of CPUs per raytune trial for hyperparameter tuning with --multiprocessing. Default is 1.",
+    )
+    parser.add_argument(
+        "--gpus_per_trial",
+        type=float,
+        default=None,
+        help="Number of GPUs per raytune trial for hyperparameter tuning with --multiprocessing, can be fractional to "
+        "share a GPU. Default is one GPU per trial if a GPU is available.",
+    )
+    parser.add_argument(
+        "--n_hpam_repeats",
+        type=int,
+        default=1,
+        help="Number of raytune trials per hyperparameter configuration with --multiprocessing. The configuration "
+        "with the best mean score is chosen. Default is 1.",
+    )
+    parser.add_argument(
+        "--hpam_search",
+        type=str,
+        default="grid",
+        choices=["grid", "successive_halving"],
+        help="Hyperparameter search strategy. 'grid' trains every configuration on the full training set. "
+        "'successive_halving' trains all configurations on a subsample of the training set first and only trains "
+        "the most promising ones on larger subsamples (ASHA with --multiprocessing). Default is grid.",
+    )
+    parser.add_argument(
+        "--result_format",
+        type=str,
+        default="csv",
+        choices=list(RESULT_FORMATS),
+        help="File format of the cv splits and predictions. 'parquet' and 'feather' store the ids as categoricals "
+        "and the values as float32, which makes the files much smaller and faster to read. Both need pyarrow "
+        "(pip install drevalpy[parquet]). Default is csv.",
+    )
 
     return parser
 
@@ -185,7 +231,9 @@ def check_arguments(args) -> None:
 
     :param args: arguments passed from the command line
     :raises AssertionError: if any of the arguments is invalid
-    :raises ValueError: if the number of cross-validation splits or curve_curator_cores is less than 1
+    :raises ValueError: if the number of cross-validation splits, n_jobs, cpus_per_trial, n_hpam_repeats or
+        curve_curator_cores is less than 1 or gpus_per_trial is negative
+    :raises ImportError: if the result format needs pyarrow, which is not installed
     """
     if not args.models:
         raise AssertionError("At least one model must be specified")
@@ -228,6 +276,15 @@ def check_arguments(args) -> None:
     if args.n_cv_splits <= 1:
         raise ValueError("Number of cross-validation splits must be greater than 1.")
 
+    if args.n_jobs < 1:
+        raise ValueError("Number of parallel jobs must be greater than 0.")
+    if args.n_jobs > 1 and args.multiprocessing:
+        raise AssertionError("--n_jobs > 1 cannot be combined with --multiprocessing (raytune).")
+    if args.cpus_per_trial < 1 or args.n_hpam_repeats < 1:
+        raise ValueError("Number of CPUs per trial and number of hyperparameter repeats must be greater than 0.")
+    if args.gpus_per_trial is not None and args.gpus_per_trial < 0:
+        raise ValueError("Number of GPUs per trial must not be negative.")
+
     # TODO Allow for custom randomization tests maybe via config file
     if args.randomization_mode[0] != "None":
         if not all(randomization in ["SVCC", "SVRC", "SVCD", "SVRD"] for randomization in args.randomization_mode):
@@ -256,6 +313,9 @@ def check_arguments(args) -> None:
             f"Invalid optim_metric for hyperparameter tuning. Choose from" f" {list(AVAILABLE_METRICS.keys())}"
         )
 
+    # parquet and feather need pyarrow, fail before the data is loaded
+    result_file_suffix(args.result_format)
+
 
 def main(args) -> None:
     """
@@ -305,6 +365,12 @@ def main(args) -> None:
             run_id=args.run_id,
             overwrite=args.overwrite,
             path_data=args.path_data,
+            n_jobs=args.n_jobs,
+            cpus_per_trial=args.cpus_per_trial,
+            gpus_per_trial=args.gpus_per_trial,
+            n_hpam_repeats=args.n_hpam_repeats,
+            hpam_search=args.hpam_search,
+            result_format=args.result_format,
         )
 
 
@@ -1,16 +1,23 @@
 """Utility functions for the visualization part of the package."""
 
+import hashlib
+import json
 import os
 import pathlib
+import pickle  # noqa: S403
 import re
 import shutil
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
 from typing import Optional, TextIO
 
 import importlib_resources
 import pandas as pd
 
 from ..datasets.dataset import DrugResponseDataset
-from ..evaluation import AVAILABLE_METRICS, evaluate
+from ..datasets.utils import CACHE_DIR_NAME, file_hash, is_result_file, result_file_suffix, write_json, write_table
+from ..evaluation import AVAILABLE_METRICS, evaluate, evaluate_per_group
 from ..pipeline_function import pipeline_function
 from .corr_comp_scatter import CorrelationComparisonScatter
 from .critical_difference_plot import CriticalDifferencePlot
@@ -18,6 +25,9 @@ from .html_tables import HTMLTable
 from .regression_slider_plot import RegressionSliderPlot
 from .vioheat import VioHeat
 
+# increase if the evaluation of result files changes, cached evaluations of older versions are not used
+EVALUATION_CACHE_VERSION = 1
+
 
 def _parse_layout(f: TextIO, path_to_layout: str) -> None:
     """
@@ -37,67 +47,67 @@ def _parse_layout(f: TextIO, path_to_layout: str) -> None:
     f.write("".join(layout))
 
 
-def parse_results(path_to_results: str) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+def parse_results(
+    path_to_results: str, n_jobs: int = 1, use_cache: bool = True
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     """
     Parse the results from the given directory.
 
+    The evaluation of every result file is cached in path_to_results/.cache/evaluation, so only new or changed files
+    are evaluated when the results are parsed again, e.g., after adding a model. Note that with the default
+    use_cache=True, this writes a .cache directory into the results directory as a side effect. Pass use_cache=False
+    to evaluate all files without reading or writing the cache.
+
     :param path_to_results: path to the results directory
+    :param n_jobs: number of result files to evaluate in parallel in a local process pool
+    :param use_cache: whether to use and update the evaluation cache
     :returns: evaluation results, evaluation results per drug, evaluation results per cell line, and true vs. predicted
         values
+    :raises ValueError: if n_jobs is smaller than 1
     """
+    if n_jobs < 1:
+        raise ValueError("n_jobs must be at least 1.")
     print("Generating result tables ...")
     # generate list of all result files
     result_dir = pathlib.Path(path_to_results)
-    result_files = list(result_dir.rglob("*.csv"))
+    result_files = sorted(file for file in result_dir.rglob("*") if is_result_file(file))
     # filter for all files that follow this pattern:
-    # result_dir/*/{predictions|cross_study|randomization|robustness}/*.csv
+    # result_dir/*/{predictions|cross_study|randomization|robustness}/*.{csv|parquet|feather}
     # Convert the path to a forward-slash version for the regex (for Windows)
     result_dir_str = str(result_dir).replace("\\", "/")
     pattern = re.compile(
-        rf"{result_dir_str}/(LPO|LCO|LDO)/[^/]+/(predictions|cross_study|randomization|robustness)/.*\.csv$"
+        rf"{result_dir_str}/(LPO|LCO|LDO)/[^/]+/(predictions|cross_study|randomization|robustness)/[^/]+$"
     )
     result_files = [file for file in result_files if pattern.match(str(file).replace("\\", "/"))]
 
-    # inititalize dictionaries to store the evaluation results
-    evaluation_results = None
-    evaluation_results_per_drug = None
-    evaluation_results_per_cell_line = None
-    true_vs_pred = None
-
-    # read every result file and compute the evaluation metrics
-    for file in result_files:
-        rel_file = str(os.path.normpath(file.relative_to(result_dir))).replace("\\", "/")
-        print(f'Evaluating file: "{rel_file}" ...')
-        file_parts = rel_file.split("/")
-        lpo_lco_ldo = file_parts[0]
-        algorithm = file_parts[1]
-        (
-            overall_eval,
-            eval_results_per_drug,
-            eval_results_per_cl,
-            t_vs_p,
-            model_name,
-        ) = evaluate_file(pred_file=file, test_mode=lpo_lco_ldo, model_name=algorithm)
-
-        evaluation_results = (
-            overall_eval if evaluation_results is None else pd.concat([evaluation_results, overall_eval])
-        )
-        true_vs_pred = t_vs_p if true_vs_pred is None else pd.concat([true_vs_pred, t_vs_p])
-
-        if eval_results_per_drug is not None:
-            evaluation_results_per_drug = (
-                eval_results_per_drug
-                if evaluation_results_per_drug is None
-                else pd.concat([evaluation_results_per_drug, eval_results_per_drug])
-            )
-
-        if eval_results_per_cl is not None:
-            evaluation_results_per_cell_line = (
-                eval_results_per_cl
-                if evaluation_results_per_cell_line is None
-                else pd.concat([evaluation_results_per_cell_line, eval_results_per_cl])
-            )
-
+    cache_dir = result_dir / CACHE_DIR_NAME / "evaluation" if use_cache else None
+    file_results: list[Optional[tuple[pd.DataFrame, ...]]] = [None] * len(result_files)
+    if cache_dir is not None:
+        file_results = [_read_evaluation_cache(file, cache_dir) for file in result_files]
+    to_evaluate = [i for i, file_result in enumerate(file_results) if file_result is None]
+    print(f"Evaluating {len(to_evaluate)} of {len(result_files)} result files, the others are cached.")
+
+    # read every new result file and compute the evaluation metrics
+    arguments = [(result_files[i], result_dir) for i in to_evaluate]
+    if n_jobs > 1 and len(to_evaluate) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs, mp_context=get_context("spawn")) as executor:
+            evaluated = list(executor.map(_evaluate_result_file, *zip(*arguments, strict=True)))
+    else:
+        evaluated = [_evaluate_result_file(file, result_dir) for file, result_dir in arguments]
+    for i, file_result in zip(to_evaluate, evaluated, strict=True):
+        file_results[i] = file_result
+        if cache_dir is not None:
+            try:
+                _write_evaluation_cache(result_files[i], cache_dir, file_result)
+            except OSError as e:
+                warnings.warn(f"Could not write the evaluation cache for {result_files[i]}: {e}", stacklevel=2)
+
+    # one concatenation per table instead of growing the tables file by file
+    tables: list[Optional[pd.DataFrame]] = []
+    for index in range(4):
+        frames = [file_result[index] for file_result in file_results if file_result[index] is not None]
+        tables.append(pd.concat(frames) if frames else None)
+    evaluation_results, evaluation_results_per_drug, evaluation_results_per_cell_line, true_vs_pred = tables
     return (
         evaluation_results,
         evaluation_results_per_drug,
@@ -106,6 +116,103 @@ def parse_results(path_to_results: str) -> tuple[pd.DataFrame, pd.DataFrame, pd.
     )
 
 
+def _evaluate_result_file(
+    file: pathlib.Path, result_dir: pathlib.Path
+) -> tuple[pd.DataFrame, Optional[pd.DataFrame], Optional[pd.DataFrame], pd.DataFrame]:
+    """
+    Evaluates a result file, also in worker processes of parse_results.
+
+    :param file: path to the result file
+    :param result_dir: results directory, the file is in result_dir/{LPO|LCO|LDO}/algorithm/
+    :returns: evaluation results, evaluation results per drug, evaluation results per cell line (None if not computed
+        for the test mode), and true vs. predicted values
+    """
+    rel_file = str(os.path.normpath(file.relative_to(result_dir))).replace("\\", "/")
+    print(f'Evaluating file: "{rel_file}" ...')
+    file_parts = rel_file.split("/")
+    lpo_lco_ldo = file_parts[0]
+    algorithm = file_parts[1]
+    (
+        overall_eval,
+        eval_results_per_drug,
+        eval_results_per_cl,
+        t_vs_p,
+        _,
+    ) = evaluate_file(pred_file=file, test_mode=lpo_lco_ldo, model_name=algorithm)
+    return overall_eval, eval_results_per_drug, eval_results_per_cl, t_vs_p
+
+
+def _evaluation_cache_entry(file: pathlib.Path, cache_dir: pathlib.Path) -> pathlib.Path:
+    """
+    Returns the cache entry of a result file, it is keyed by the absolute path.
+
+    :param file: path to the result file
+    :param cache_dir: directory of the evaluation cache
+    :returns: directory of the cache entry
+    """
+    return cache_dir / hashlib.sha256(str(file.resolve()).encode()).hexdigest()
+
+
+def _read_evaluation_cache(file: pathlib.Path, cache_dir: pathlib.Path) -> Optional[tuple[pd.DataFrame, ...]]:
+    """
+    Loads the cached evaluation of a result file if it is valid for the current state of the file.
+
+    Like the feature cache, the entry is used directly if size and modification time are unchanged. If only the
+    modification time changed, the content hash decides.
+
+    :param file: path to the result file
+    :param cache_dir: directory of the evaluation cache
+    :returns: evaluation results as returned by _evaluate_result_file, or None if the entry is missing or outdated
+    """
+    entry = _evaluation_cache_entry(file, cache_dir)
+    source_file = entry / "source.json"
+    if not source_file.exists():
+        return None
+    try:
+        with open(source_file, encoding="utf-8") as f:
+            source = json.load(f)
+        stat = file.stat()
+        if source["version"] != EVALUATION_CACHE_VERSION or source["size"] != stat.st_size:
+            return None
+        if source["mtime_ns"] != stat.st_mtime_ns:
+            if source["sha256"] != file_hash(file):
+                return None
+            source["mtime_ns"] = stat.st_mtime_ns
+            write_json(source_file, source)
+        return pd.read_pickle(entry / "results.pkl")  # noqa: S301, written by _write_evaluation_cache
+    except (OSError, ValueError, KeyError, pickle.UnpicklingError):
+        return None
+
+
+def _write_evaluation_cache(file: pathlib.Path, cache_dir: pathlib.Path, file_result: tuple[pd.DataFrame, ...]) -> None:
+    """
+    Writes the evaluation of a result file to the cache. The source information is written last, so partially written
+    entries are never used.
+
+    :param file: path to the result file
+    :param cache_dir: directory of the evaluation cache
+    :param file_result: evaluation results as returned by _evaluate_result_file
+    """
+    entry = _evaluation_cache_entry(file, cache_dir)
+    entry.mkdir(parents=True, exist_ok=True)
+    source_file = entry / "source.json"
+    source_file.unlink(missing_ok=True)
+    stat = file.stat()
+    tmp_file = entry / f"results.{os.getpid()}.tmp.pkl"
+    pd.to_pickle(file_result, tmp_file)
+    os.replace(tmp_file, entry / "results.pkl")
+    write_json(
+        source_file,
+        {
+            "path": str(file),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": file_hash(file),
+            "version": EVALUATION_CACHE_VERSION,
+        },
+    )
+
+
 @pipeline_function
 def evaluate_file(
     pred_file: pathlib.Path, test_mode: str, model_name: str
@@ -293,7 +400,7 @@ def _evaluate_per_group(
             drug_ids=norm_df["drug"].to_numpy(),
             predictions=norm_df["y_pred"].to_numpy(),
         ),
-        list(AVAILABLE_METRICS.keys() - {"MSE", "RMSE", "MAE"}),
+        [metric for metric in AVAILABLE_METRICS if metric not in ["MSE", "RMSE", "MAE"]],
     )
     # evaluation per group
     eval_results_per_group = compute_evaluation(df, eval_results_per_group, group_by, model)
@@ -310,19 +417,18 @@ def compute_evaluation(df: pd.DataFrame, return_df: pd.DataFrame | None, group_b
     :param model: model name
     :returns: dataframe with the evaluation results per group
     """
-    result_per_group = df.groupby(group_by)[["y_true", "cell_line", "drug", "y_pred"]].apply(
-        lambda x: evaluate(
-            DrugResponseDataset(
-                response=x["y_true"].to_numpy(),
-                cell_line_ids=x["cell_line"].to_numpy(),
-                drug_ids=x["drug"].to_numpy(),
-                predictions=x["y_pred"].to_numpy(),
-            ),
-            list(AVAILABLE_METRICS.keys()),
-        )
+    result_per_group = evaluate_per_group(
+        DrugResponseDataset(
+            response=df["y_true"].to_numpy(),
+            cell_line_ids=df["cell_line"].to_numpy(),
+            drug_ids=df["drug"].to_numpy(),
+            predictions=df["y_pred"].to_numpy(),
+        ),
+        group_by=group_by,
+        metric=list(AVAILABLE_METRICS.keys()),
     )
     groups = result_per_group.index
-    result_per_group = pd.json_normalize(result_per_group)
+    result_per_group = result_per_group.reset_index(drop=True)
     result_per_group[group_by] = groups
     result_per_group["model"] = model
     if return_df is None:
@@ -339,22 +445,25 @@ def write_results(
     eval_results_per_drug: pd.DataFrame,
     eval_results_per_cl: pd.DataFrame,
     t_vs_p: pd.DataFrame,
+    result_format: str = "csv",
 ) -> None:
     """
-    Write the results to csv files.
+    Write the results to csv files, or Parquet or Feather files.
 
     :param path_out: path to the output directory, e.g., results/my_run/
     :param eval_results: evaluation results
     :param eval_results_per_drug: evaluation results per drug
     :param eval_results_per_cl: evaluation results per cell line
     :param t_vs_p: true vs. predicted values
+    :param result_format: file format of the tables, one of RESULT_FORMATS
     """
-    eval_results.to_csv(f"{path_out}evaluation_results.csv", index=True)
+    suffix = result_file_suffix(result_format)
+    write_table(eval_results, f"{path_out}evaluation_results{suffix}", index=True)
     if eval_results_per_drug is not None:
-        eval_results_per_drug.to_csv(f"{path_out}evaluation_results_per_drug.csv", index=True)
+        write_table(eval_results_per_drug, f"{path_out}evaluation_results_per_drug{suffix}", index=True)
     if eval_results_per_cl is not None:
-        eval_results_per_cl.to_csv(f"{path_out}evaluation_results_per_cl.csv", index=True)
-    t_vs_p.to_csv(f"{path_out}true_vs_pred.csv", index=True)
+        write_table(eval_results_per_cl, f"{path_out}evaluation_results_per_cl{suffix}", index=True)
+    write_table(t_vs_p, f"{path_out}true_vs_pred{suffix}", index=True)
 
 
 @pipeline_function
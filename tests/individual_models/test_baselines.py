@@ -8,6 +8,7 @@ from sklearn.linear_model import ElasticNet, Ridge
 
 from drevalpy.datasets.dataset import DrugResponseDataset, FeatureDataset
 from drevalpy.evaluation import evaluate, pearson
+from drevalpy.experiment import train_and_predict
 from drevalpy.models import (
     MODEL_FACTORY,
     NaiveCellLineMeanPredictor,
@@ -93,6 +94,92 @@ def test_baselines(
         )
 
 
+def test_elastic_net_hyperparameter_path(
+    sample_dataset: tuple[DrugResponseDataset, FeatureDataset, FeatureDataset],
+) -> None:
+    """
+    Test that the regularization path of ElasticNet predicts the same as separately trained models.
+
+    :param sample_dataset: from conftest.py
+    """
+    drug_response, cell_line_input, drug_input = sample_dataset
+    drug_response.split_dataset(n_cv_splits=5, mode="LPO")
+    assert drug_response.cv_splits is not None
+    split = drug_response.cv_splits[0]
+    train_dataset = split["train"]
+    val_dataset = split["validation"]
+
+    model = MODEL_FACTORY["ElasticNet"]()
+    assert model.has_hyperparameter_path()
+    assert not MODEL_FACTORY["GradientBoosting"].has_hyperparameter_path()
+    hpam_set = [
+        {"l1_ratio": 0.0, "alpha": 10.0},
+        {"l1_ratio": 0.5, "alpha": 0.1},
+        {"l1_ratio": 0.0, "alpha": 0.5},
+        {"l1_ratio": 1.0, "alpha": 0.05},
+        {"l1_ratio": 0.5, "alpha": 1.0},
+    ]
+    path_predictions = model.predict_hyperparameter_path(
+        hpam_set=hpam_set,
+        output=train_dataset,
+        cell_line_ids=val_dataset.cell_line_ids,
+        drug_ids=val_dataset.drug_ids,
+        cell_line_input=cell_line_input,
+        drug_input=drug_input,
+    )
+    assert len(path_predictions) == len(hpam_set)
+    for hpams, predictions in zip(hpam_set, path_predictions):
+        model.build_model(hpams)
+        model.train(output=train_dataset, cell_line_input=cell_line_input, drug_input=drug_input)
+        expected = model.predict(
+            cell_line_ids=val_dataset.cell_line_ids,
+            drug_ids=val_dataset.drug_ids,
+            cell_line_input=cell_line_input,
+            drug_input=drug_input,
+        )
+        assert np.allclose(predictions, expected, atol=1e-3)
+
+
+def test_svr_precomputed_kernel(sample_dataset: tuple[DrugResponseDataset, FeatureDataset, FeatureDataset]) -> None:
+    """
+    Test that SVR fitted on the cached kernel matrices predicts the same as separately trained models.
+
+    :param sample_dataset: from conftest.py
+    """
+    drug_response, cell_line_input, drug_input = sample_dataset
+    drug_response.split_dataset(n_cv_splits=5, mode="LPO")
+    assert drug_response.cv_splits is not None
+    split = drug_response.cv_splits[0]
+    train_dataset = split["train"]
+    val_dataset = split["validation"]
+
+    model = MODEL_FACTORY["SVR"]()
+    assert model.has_hyperparameter_path()
+    hpam_set = [
+        {"kernel": "rbf", "C": 1, "epsilon": 0.1, "max_iter": 500},
+        {"kernel": "linear", "C": 0.1, "epsilon": 0.1, "max_iter": 500},
+        {"kernel": "rbf", "C": 10, "epsilon": 0.5, "max_iter": 500},
+    ]
+    path_predictions = model.predict_hyperparameter_path(
+        hpam_set=hpam_set,
+        output=train_dataset,
+        cell_line_ids=val_dataset.cell_line_ids,
+        drug_ids=val_dataset.drug_ids,
+        cell_line_input=cell_line_input,
+        drug_input=drug_input,
+    )
+    for hpams, predictions in zip(hpam_set, path_predictions):
+        model.build_model(hpams)
+        model.train(output=train_dataset, cell_line_input=cell_line_input, drug_input=drug_input)
+        expected = model.predict(
+            cell_line_ids=val_dataset.cell_line_ids,
+            drug_ids=val_dataset.drug_ids,
+            cell_line_input=cell_line_input,
+            drug_input=drug_input,
+        )
+        assert np.allclose(predictions, expected, atol=1e-6)
+
+
 @pytest.mark.parametrize("model_name", ["SingleDrugRandomForest"])
 @pytest.mark.parametrize("test_mode", ["LPO", "LCO"])
 def test_single_drug_baselines(
@@ -145,6 +232,31 @@ def test_single_drug_baselines(
     assert pcc_drug > 0.0
 
 
+def test_single_drug_random_forest_in_pipeline(
+    sample_dataset: tuple[DrugResponseDataset, FeatureDataset, FeatureDataset],
+) -> None:
+    """
+    Test that the pipeline does not load drug features for SingleDrugRandomForest, which rejects drug input.
+
+    :param sample_dataset: from conftest.py
+    """
+    drug_response, cell_line_input, _ = sample_dataset
+    model = SingleDrugRandomForest()
+    assert model.load_drug_features(data_path="../data", dataset_name="Toy_Data") is None
+    drug_response.mask(drug_response.drug_ids == drug_response.drug_ids[0])
+    hpam_combi = {**model.get_hyperparameter_set()[0], "n_estimators": 2, "max_depth": 2}
+    predictions = train_and_predict(
+        model=model,
+        hpams=hpam_combi,
+        path_data="../data",
+        train_dataset=drug_response.copy(),
+        prediction_dataset=drug_response.copy(),
+        cl_features=cell_line_input,
+    )
+    assert predictions.predictions is not None
+    assert not np.isnan(predictions.predictions).any()
+
+
 def _call_naive_predictor(
     train_dataset: DrugResponseDataset,
     val_dataset: DrugResponseDataset,
@@ -67,6 +67,12 @@ def test_molir_superfeltr(
     es_dataset_drug.mask(es_mask)
     # smaller dataset for faster testing
     drug_train.remove_rows(indices=np.array([list(range(len(drug_train) - 100))]))
+    cell_line_input, _ = model.get_preprocessed_features(
+        hyperparameters=hpam_combi,
+        output=drug_train,
+        cell_line_input=cell_line_input,
+        output_earlystopping=es_dataset_drug,
+    )
     model.train(
         output=drug_train,
         cell_line_input=cell_line_input,
@@ -85,9 +91,7 @@ def test_molir_superfeltr(
 
     # subset the dataset to only the drugs that were used
     val_es_mask = np.isin(val_es_dataset.drug_ids, random_drug)
-    val_es_dataset._cell_line_ids = val_es_dataset.cell_line_ids[val_es_mask]
-    val_es_dataset._drug_ids = val_es_dataset.drug_ids[val_es_mask]
-    val_es_dataset._response = val_es_dataset.response[val_es_mask]
+    val_es_dataset.mask(val_es_mask)
     val_es_dataset._predictions = all_predictions[val_es_mask]
     metrics = evaluate(val_es_dataset, metric=["Pearson"])
     print(f"{test_mode}: Collapsed performance of {model_name}: PCC = {metrics['Pearson']}")
@@ -128,6 +132,13 @@ def test_dipk(
     train_dataset.reduce_to(cell_line_ids=cell_lines_to_keep, drug_ids=drugs_to_keep)
     val_es_dataset.reduce_to(cell_line_ids=cell_lines_to_keep, drug_ids=drugs_to_keep)
 
+    cell_line_input, drug_input = model.get_preprocessed_features(
+        hyperparameters=hpam_combi,
+        output=train_dataset,
+        cell_line_input=cell_line_input,
+        drug_input=drug_input,
+        output_earlystopping=val_es_dataset,
+    )
     model.train(
         output=train_dataset,
         cell_line_input=cell_line_input,
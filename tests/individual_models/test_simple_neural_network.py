@@ -4,11 +4,15 @@ from typing import cast
 
 import numpy as np
 import pytest
+from scipy.spatial.distance import jaccard
+from sklearn.preprocessing import StandardScaler
 
 from drevalpy.datasets.dataset import DrugResponseDataset, FeatureDataset
 from drevalpy.evaluation import evaluate
+from drevalpy.experiment import hpam_tune
 from drevalpy.models import MODEL_FACTORY
 from drevalpy.models.drp_model import DRPModel
+from drevalpy.models.SRMF.srmf import SRMF, group_rows_by_pattern, jaccard_similarity
 
 
 @pytest.mark.parametrize("test_mode", ["LPO"])
@@ -50,6 +54,13 @@ def test_simple_neural_network(
     hpam_combi = hpams[0]
     hpam_combi["units_per_layer"] = [2, 2]
     model.build_model(hyperparameters=hpam_combi)
+    cell_line_input, drug_input = model.get_preprocessed_features(
+        hyperparameters=hpam_combi,
+        output=train_dataset,
+        cell_line_input=cell_line_input,
+        drug_input=drug_input,
+        output_earlystopping=es_dataset,
+    )
     model.train(
         output=train_dataset,
         cell_line_input=cell_line_input,
@@ -66,3 +77,159 @@ def test_simple_neural_network(
 
     metrics = evaluate(val_es_dataset, metric=["Pearson"])
     assert metrics["Pearson"] >= -1
+
+
+def test_preprocessing_is_cached(sample_dataset: tuple[DrugResponseDataset, FeatureDataset, FeatureDataset]) -> None:
+    """
+    Test that the preprocessing is fitted once per training data and does not modify the shared features.
+
+    :param sample_dataset: from conftest.py
+    """
+    drug_response, cell_line_input, drug_input = sample_dataset
+    model = cast(DRPModel, MODEL_FACTORY["SimpleNeuralNetwork"]())
+    n_calls = 0
+    preprocess_features = model.preprocess_features
+
+    def counting_preprocess_features(**kwargs):
+        nonlocal n_calls
+        n_calls += 1
+        return preprocess_features(**kwargs)
+
+    model.preprocess_features = counting_preprocess_features  # type: ignore[method-assign]
+    cell_line_ids = np.unique(drug_response.cell_line_ids)
+    original = cell_line_input.get_feature_matrix(view="gene_expression", identifiers=cell_line_ids)
+
+    results = []
+    for hpam_combi in model.get_hyperparameter_set()[:2]:
+        results.append(
+            model.get_preprocessed_features(
+                hyperparameters=hpam_combi,
+                output=drug_response,
+                cell_line_input=cell_line_input,
+                drug_input=drug_input,
+            )
+        )
+    assert n_calls == 1
+    scaled = results[0][0].get_feature_matrix(view="gene_expression", identifiers=cell_line_ids)
+    np.testing.assert_allclose(scaled.mean(axis=0), 0, atol=1e-5)
+    np.testing.assert_array_equal(
+        original, cell_line_input.get_feature_matrix(view="gene_expression", identifiers=cell_line_ids)
+    )
+    # modifying the returned features neither changes the cache nor the other copies
+    results[0][0].apply(function=np.negative, view="gene_expression")
+    np.testing.assert_array_equal(
+        scaled, results[1][0].get_feature_matrix(view="gene_expression", identifiers=cell_line_ids)
+    )
+
+    subset = drug_response.copy()
+    subset.mask(subset.cell_line_ids != cell_line_ids[0])
+    model.get_preprocessed_features(
+        hyperparameters={}, output=subset, cell_line_input=cell_line_input, drug_input=drug_input
+    )
+    assert n_calls == 2
+
+
+def test_preprocessing_is_cached_during_tuning(
+    sample_dataset: tuple[DrugResponseDataset, FeatureDataset, FeatureDataset],
+) -> None:
+    """
+    Test that hpam_tune fits the preprocessing once for all configurations, also with a response transformation.
+
+    :param sample_dataset: from conftest.py
+    """
+    drug_response, cell_line_input, drug_input = sample_dataset
+    drug_response.split_dataset(n_cv_splits=2, mode="LPO", split_validation=False, random_state=42)
+    split = drug_response.cv_splits[0]
+    train_response = split["train"].response.copy()
+    model = cast(DRPModel, MODEL_FACTORY["SimpleNeuralNetwork"]())
+    n_calls = 0
+    preprocess_features = model.preprocess_features
+
+    def counting_preprocess_features(**kwargs):
+        nonlocal n_calls
+        n_calls += 1
+        return preprocess_features(**kwargs)
+
+    # only the preprocessing is of interest here, training the networks would take too long
+    model.preprocess_features = counting_preprocess_features  # type: ignore[method-assign]
+    model.train = lambda **kwargs: None  # type: ignore[method-assign]
+    model.predict = lambda cell_line_ids, **kwargs: np.zeros(len(cell_line_ids))  # type: ignore[method-assign]
+    hpam_tune(
+        model=model,
+        train_dataset=split["train"],
+        validation_dataset=split["test"],
+        hpam_set=model.get_hyperparameter_set()[:4],
+        response_transformation=StandardScaler(),
+        path_data="../data",
+        cl_features=cell_line_input,
+        drug_features=drug_input,
+    )
+    assert n_calls == 1
+    np.testing.assert_array_equal(split["train"].response, train_response)
+
+
+def test_srmf_drug_similarity(sample_dataset: tuple[DrugResponseDataset, FeatureDataset, FeatureDataset]) -> None:
+    """
+    Test the vectorized Jaccard similarity of SRMF against scipy and its cache for the drugs of a training.
+
+    :param sample_dataset: from conftest.py
+    """
+    rng = np.random.default_rng(0)
+    fingerprints = (rng.random((30, 64)) < 0.3).astype(float)
+    fingerprints[[3, 7]] = 0
+    expected = np.array([[1 - jaccard(a, b) for b in fingerprints] for a in fingerprints])
+    np.testing.assert_allclose(jaccard_similarity(fingerprints), expected)
+
+    _, _, drug_input = sample_dataset
+    model = SRMF()
+    drugs = np.unique(drug_input.identifiers)
+    similarity = model._get_drug_similarity(drug_input, drugs)
+    np.testing.assert_allclose(
+        similarity, jaccard_similarity(drug_input.get_feature_matrix(view="fingerprints", identifiers=drugs))
+    )
+    assert model._get_drug_similarity(drug_input, drugs) is similarity
+    # a different drug set or different fingerprints of the same drugs are not served from the cache
+    np.testing.assert_allclose(model._get_drug_similarity(drug_input, drugs[1:]), similarity[1:, 1:])
+    drug_input.apply(function=np.logical_not, view="fingerprints")
+    np.testing.assert_allclose(
+        model._get_drug_similarity(drug_input, drugs),
+        jaccard_similarity(drug_input.get_feature_matrix(view="fingerprints", identifiers=drugs)),
+    )
+
+
+@pytest.mark.parametrize("observed_fraction", [0.01, 0.5, 0.9])
+def test_srmf_batched_update(observed_fraction: float) -> None:
+    """
+    Test the batched ALS update and the loss of SRMF against a row-by-row computation.
+
+    :param observed_fraction: fraction of observed entries of the response matrix
+    """
+    rng = np.random.default_rng(0)
+    n_drugs, n_cell_lines, k = 40, 60, 5
+    w = rng.random((n_drugs, n_cell_lines)) < observed_fraction
+    # fully observed, unobserved and duplicated rows
+    w[0] = True
+    w[1] = False
+    w[2] = w[3]
+    int_mat = rng.normal(size=w.shape) * w
+    u = rng.normal(size=(n_drugs, k))
+    v = rng.normal(size=(n_cell_lines, k))
+    drug_mat = np.corrcoef(rng.normal(size=(n_drugs, 10)))
+    model = SRMF()
+    model.build_model({"K": k, "lambda_d": 0.1})
+
+    updated = model._alg_update(u, v, group_rows_by_pattern(w), w * int_mat, drug_mat, 0.01, 0.1)
+    x = np.dot(w * int_mat, v) + 2 * 0.1 * np.dot(drug_mat, u)
+    for i in range(n_drugs):
+        observed = w[i]
+        b = v[observed].T @ v[observed] + 2 * 0.1 * u.T @ u + 0.01 * np.eye(k)
+        np.testing.assert_allclose(updated[i], np.linalg.solve(b, x[i]), rtol=1e-8, atol=1e-10)
+
+    cell_mat = np.corrcoef(rng.normal(size=(n_cell_lines, 10)))
+    expected_loss = (
+        np.sum((w * (int_mat - u @ v.T)) ** 2)
+        + model.lambda_l * (np.sum(u**2) + np.sum(v**2))
+        + model.lambda_d * np.sum((drug_mat - u @ u.T) ** 2)
+        + model.lambda_c * np.sum((cell_mat - v @ v.T) ** 2)
+    )
+    np.testing.assert_allclose(model._compute_loss(u, v, w, int_mat, drug_mat, cell_mat), expected_loss)
@@ -0,0 +1,47 @@
+"""Tests for the synthetic data generator of the benchmark suite."""
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import SCALES, generate_synthetic_data
+
+
+def test_synthetic_data_shapes() -> None:
+    """Test that the synthetic response data and features have the requested sizes."""
+    data = generate_synthetic_data("tiny", n_cell_lines=30, n_drugs=20, n_genes=50, missing_fraction=0.2)
+    assert data.gene_expression.shape == (30, 50)
+    assert data.fingerprints.shape == (20, SCALES["tiny"]["n_fingerprint_bits"])
+    assert len(np.unique(data.response.cell_line_ids)) <= 30
+    assert set(data.response.drug_ids) <= set(data.drug_ids)
+    # about 80% of the 600 cell line-drug pairs are measured
+    assert 400 < len(data.response) < 560
+    assert not np.isnan(data.response.response).any()
+
+    cell_line_features = data.cell_line_features()
+    assert set(cell_line_features.view_names) == {
+        "gene_expression",
+        "methylation",
+        "mutations",
+        "copy_number_variation_gistic",
+    }
+    assert cell_line_features.get_feature_matrix(view="mutations", identifiers=data.cell_line_ids).shape == (30, 50)
+    drug_features = data.drug_features()
+    assert drug_features.get_feature_matrix(view="fingerprints", identifiers=data.drug_ids).shape == (20, 128)
+
+    with pytest.raises(ValueError):
+        generate_synthetic_data("huge")
+    with pytest.raises(ValueError):
+        generate_synthetic_data("tiny", missing_fraction=1.0)
+
+
+def test_synthetic_data_is_seeded() -> None:
+    """Test that the same random state generates the same data and a different one different data."""
+    sizes = {"n_cell_lines": 20, "n_drugs": 10, "n_genes": 30}
+    data = generate_synthetic_data("tiny", random_state=1, **sizes)
+    same = generate_synthetic_data("tiny", random_state=1, **sizes)
+    other = generate_synthetic_data("tiny", random_state=2, **sizes)
+    np.testing.assert_array_equal(data.gene_expression, same.gene_expression)
+    np.testing.assert_array_equal(data.fingerprints, same.fingerprints)
+    np.testing.assert_array_equal(data.response.response, same.response.response)
+    np.testing.assert_array_equal(data.response.cell_line_ids, same.response.cell_line_ids)
+    assert not np.array_equal(data.gene_expression, other.gene_expression)
@@ -1,6 +1,8 @@
 """Tests for the DRPModel."""
 
 import os
+import subprocess
+import sys
 import tempfile
 from typing import Optional
 
@@ -8,7 +10,7 @@ import numpy as np
 import pandas as pd
 import pytest
 
-from drevalpy.models import MODEL_FACTORY
+from drevalpy.models import MODEL_FACTORY, SINGLE_DRUG_MODEL_FACTORY, SimpleNeuralNetwork
 from drevalpy.models.utils import (
     get_multiomics_feature_dataset,
     iterate_features,
@@ -38,6 +40,24 @@ def test_factory() -> None:
     assert "SuperFELTR" in MODEL_FACTORY
     assert "DIPK" in MODEL_FACTORY
     assert len(MODEL_FACTORY) == 15
+    assert MODEL_FACTORY["SimpleNeuralNetwork"] is SimpleNeuralNetwork
+    assert MODEL_FACTORY["SimpleNeuralNetwork"].get_model_name() == "SimpleNeuralNetwork"
+    assert set(SINGLE_DRUG_MODEL_FACTORY) == {"SingleDrugRandomForest", "MOLIR", "SuperFELTR"}
+    with pytest.raises(KeyError):
+        MODEL_FACTORY["NotAModel"]
+
+
+def test_entry_points_do_not_import_heavy_dependencies() -> None:
+    """Test that the pipeline entry points and lightweight models do not import torch or ray."""
+    code = (
+        "import sys\n"
+        "import drevalpy.utils\n"
+        "from drevalpy.models import MODEL_FACTORY\n"
+        "MODEL_FACTORY['ElasticNet']\n"
+        "print(sorted(m for m in ('torch', 'ray', 'pytorch_lightning') if m in sys.modules))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
 
 
 def test_load_cl_ids_from_csv() -> None:
@@ -147,6 +167,40 @@ def test_load_and_reduce_gene_features(gene_list: Optional[str]) -> None:
         assert "The following genes are missing from the dataset GDSC1_small" in str(valerr.value)
 
 
+def test_load_gene_features_cache() -> None:
+    """Test that gene features are served from the binary cache and that changed csv files invalidate it."""
+    temp = tempfile.TemporaryDirectory()
+    os.mkdir(os.path.join(temp.name, "GDSC1_small"))
+    temp_file = os.path.join(temp.name, "GDSC1_small", "gene_expression.csv")
+    with open(temp_file, "w") as f:
+        f.write(
+            "cellosaurus_id,CELL_LINE_NAME,TSPAN6,TNMD,BRCA1\n"
+            "CVCL_1104,CAL-120,1.0,2.0,3.0\n"
+            "CVCL_1174,DMS 114,4.0,5.0,6.0\n"
+            "CVCL_1104,CAL-120,7.0,8.0,9.0\n"
+        )
+    with pytest.warns(UserWarning):
+        first = load_and_reduce_gene_features("gene_expression", None, temp.name, "GDSC1_small")
+    assert os.path.exists(os.path.join(temp.name, "GDSC1_small", ".cache", "gene_expression", "values.npy"))
+    with pytest.warns(UserWarning):
+        second = load_and_reduce_gene_features("gene_expression", None, temp.name, "GDSC1_small")
+    assert np.all(second.identifiers == ["CAL-120", "DMS 114"])
+    assert np.all(second.meta_info["gene_expression"] == ["TSPAN6", "TNMD", "BRCA1"])
+    assert np.allclose(
+        second.get_feature_matrix("gene_expression", np.array(["DMS 114", "CAL-120"])),
+        first.get_feature_matrix("gene_expression", np.array(["DMS 114", "CAL-120"])),
+    )
+    # cached matrices are read-only, writing to a FeatureDataset copies them
+    second.features["CAL-120"]["gene_expression"] = np.zeros(3)
+    assert np.allclose(first.features["CAL-120"]["gene_expression"], [1.0, 2.0, 3.0])
+
+    with open(temp_file, "w") as f:
+        f.write("cellosaurus_id,CELL_LINE_NAME,TSPAN6,TNMD,BRCA1\nCVCL_1110,CAL-51,1.5,2.5,3.5\n")
+    third = load_and_reduce_gene_features("gene_expression", None, temp.name, "GDSC1_small")
+    assert np.all(third.identifiers == ["CAL-51"])
+    assert np.allclose(third.features["CAL-51"]["gene_expression"], [1.5, 2.5, 3.5])
+
+
 def test_iterate_features() -> None:
     """Test the iteration over features."""
     df = pd.DataFrame({"GeneA": [1, 2, 3, 2], "GeneB": [4, 5, 6, 2], "GeneC": [7, 8, 9, 2]})
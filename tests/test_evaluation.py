@@ -7,7 +7,15 @@ from flaky import flaky
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 
 from drevalpy.datasets.dataset import DrugResponseDataset
-from drevalpy.evaluation import evaluate, kendall, partial_correlation, pearson, spearman
+from drevalpy.evaluation import (
+    AVAILABLE_METRICS,
+    evaluate,
+    evaluate_per_group,
+    kendall,
+    partial_correlation,
+    pearson,
+    spearman,
+)
 
 
 def test_evaluate() -> None:
@@ -135,6 +143,82 @@ def test_partial_correlation(generate_mock_data_drug_mean: tuple[np.ndarray, np.
         assert np.isclose(pc, 0.0, atol=0.1)
 
 
+@pytest.mark.parametrize("method", ["pearson", "spearman"])
+def test_partial_correlation_matches_one_hot_regression(method: str) -> None:
+    """
+    Test that the partial correlation equals the one conditioned on one-hot encoded cell lines and drugs.
+
+    :param method: pearson or spearman
+    """
+    pg = pytest.importorskip("pingouin")
+    rng = np.random.default_rng(42)
+    # unbalanced design: not every cell line is measured with every drug
+    cell_line_codes, drug_codes = np.nonzero(rng.random((60, 25)) < 0.5)
+    cell_line_ids = np.array([f"cell_line_{i}" for i in cell_line_codes])
+    drug_ids = np.array([f"drug_{i}" for i in drug_codes])
+    cell_line_effect = rng.normal(size=60)[cell_line_codes]
+    response = cell_line_effect + rng.normal(size=25)[drug_codes] + rng.normal(size=len(drug_ids))
+    y_pred = response + 0.5 * cell_line_effect + rng.normal(scale=2.0, size=len(drug_ids))
+
+    r, p = partial_correlation(y_pred, response, cell_line_ids, drug_ids, method=method, return_pvalue=True)
+
+    df = pd.DataFrame({"response": response, "predictions": y_pred, "cell_line": cell_line_codes, "drug": drug_codes})
+    df_encoded = pd.get_dummies(df, columns=["cell_line", "drug"], dtype=int)
+    expected = pg.partial_corr(
+        data=df_encoded,
+        x="predictions",
+        y="response",
+        covar=[col for col in df_encoded.columns if col.startswith(("cell_line_", "drug_"))],
+        method=method,
+    )
+    assert np.isclose(r, expected["r"].iloc[0], rtol=1e-8)
+    assert np.isclose(p, expected["p-val"].iloc[0], rtol=1e-6)
+
+
+@pytest.mark.parametrize("group_by", ["drug", "cell_line"])
+def test_evaluate_per_group(group_by: str) -> None:
+    """
+    Test that evaluating all groups at once equals evaluating every group separately.
+
+    :param group_by: drug or cell_line
+    """
+    rng = np.random.default_rng(0)
+    n = 2000
+    cell_line_ids = rng.integers(0, 50, n).astype(str)
+    drug_ids = rng.integers(0, 20, n).astype(str)
+    # rounding creates ties for the rank correlations
+    response = np.round(rng.normal(size=n), 1)
+    predictions = np.round(response + rng.normal(size=n), 1)
+    # constant predictions, constant response and a group with a single sample
+    predictions[drug_ids == "3"] = 1.0
+    response[drug_ids == "4"] = 2.0
+    cell_line_ids = np.append(cell_line_ids, "single")
+    drug_ids = np.append(drug_ids, "single")
+    response = np.append(response, 1.0)
+    predictions = np.append(predictions, 2.0)
+    dataset = DrugResponseDataset(
+        response=response, cell_line_ids=cell_line_ids, drug_ids=drug_ids, predictions=predictions
+    )
+
+    result = evaluate_per_group(dataset, group_by=group_by, metric=list(AVAILABLE_METRICS))
+
+    group_ids = drug_ids if group_by == "drug" else cell_line_ids
+    assert list(result.index) == sorted(np.unique(group_ids))
+    for group in result.index:
+        mask = group_ids == group
+        expected = evaluate(
+            DrugResponseDataset(
+                response=response[mask],
+                cell_line_ids=cell_line_ids[mask],
+                drug_ids=drug_ids[mask],
+                predictions=predictions[mask],
+            ),
+            list(AVAILABLE_METRICS),
+        )
+        for metric, value in expected.items():
+            assert np.isclose(result.loc[group, metric], value, equal_nan=True), f"{metric} of {group}"
+
+
 def test_pearson_correlated(generate_mock_correlated_data: tuple[np.ndarray, np.ndarray]) -> None:
     """
     Test the pearson correlation function.
@@ -248,7 +332,7 @@ def test_kendall_uncorrelated(generate_mock_uncorrelated_data):
 
 
 def test_correlations_constant_prediction(
-    generate_mock_data_constant_prediction: tuple[np.ndarray, np.ndarray]
+    generate_mock_data_constant_prediction: tuple[np.ndarray, np.ndarray],
 ) -> None:
     """
     Test the correlation functions with constant prediction.
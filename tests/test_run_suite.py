@@ -1,11 +1,28 @@
 """Tests whether the main function of the package runs without errors and produces the expected output."""
 
+import json
+import math
 import os
 import tempfile
 from argparse import Namespace
 
+import numpy as np
+import pandas as pd
 import pytest
+from ray.tune.schedulers import TrialScheduler
 
+from drevalpy.datasets.dataset import DrugResponseDataset
+from drevalpy.datasets.loader import load_toy
+from drevalpy.experiment import (
+    _successive_halving_result,
+    _successive_halving_scheduler,
+    drug_response_experiment,
+    hpam_tune,
+    hpam_tune_raytune,
+    successive_halving_budgets,
+)
+from drevalpy.models import MODEL_FACTORY
+from drevalpy.tracing import TRACE_FILE_NAME, get_tracer
 from drevalpy.utils import main
 from drevalpy.visualization.utils import parse_results, prep_results
 
@@ -32,7 +49,39 @@ from drevalpy.visualization.utils import parse_results, prep_results
             "response_transformation": "None",
             "multiprocessing": False,
             "path_data": "../data",
-        }
+            "n_jobs": 1,
+            "cpus_per_trial": 1,
+            "gpus_per_trial": None,
+            "n_hpam_repeats": 1,
+            "hpam_search": "grid",
+            "result_format": "csv",
+        },
+        {
+            "run_id": "test_run",
+            "dataset_name": "Toy_Data",
+            "models": ["NaiveCellLineMeanPredictor"],
+            "baselines": ["NaiveDrugMeanPredictor"],
+            "test_mode": ["LPO"],
+            "randomization_mode": ["SVRC"],
+            "randomization_type": "permutation",
+            "n_trials_robustness": 1,
+            "cross_study_datasets": [],
+            "curve_curator": False,
+            "curve_curator_cores": 1,
+            "measure": "LN_IC50",
+            "overwrite": False,
+            "optim_metric": "RMSE",
+            "n_cv_splits": 2,
+            "response_transformation": "None",
+            "multiprocessing": False,
+            "path_data": "../data",
+            "n_jobs": 2,
+            "cpus_per_trial": 1,
+            "gpus_per_trial": None,
+            "n_hpam_repeats": 1,
+            "hpam_search": "successive_halving",
+            "result_format": "parquet",
+        },
     ],
 )
 def test_run_suite(args):
@@ -46,6 +95,12 @@ def test_run_suite(args):
     args = Namespace(**args)
     main(args)
     assert os.listdir(temp_dir.name) == ["test_run"]
+    for test_mode in args.test_mode:
+        with open(os.path.join(temp_dir.name, args.run_id, test_mode, TRACE_FILE_NAME), encoding="utf-8") as f:
+            trace_events = json.load(f)["traceEvents"]
+        stages = {event["name"] for event in trace_events}
+        assert {"fold", "train", "predict", "write csv"} <= stages
+        assert sum(event["name"] == "fold" for event in trace_events) == 2 * args.n_cv_splits
 
     (
         evaluation_results,
@@ -53,6 +108,14 @@ def test_run_suite(args):
         evaluation_results_per_cell_line,
         true_vs_pred,
     ) = parse_results(path_to_results=os.path.join(temp_dir.name, args.run_id))
+    # the second time, all result files are read from the evaluation cache
+    cached_results = parse_results(path_to_results=os.path.join(temp_dir.name, args.run_id))
+    for table, cached_table in zip(
+        [evaluation_results, evaluation_results_per_drug, evaluation_results_per_cell_line, true_vs_pred],
+        cached_results,
+        strict=True,
+    ):
+        pd.testing.assert_frame_equal(table, cached_table)
 
     (
         evaluation_results,
@@ -86,3 +149,215 @@ def test_run_suite(args):
     assert all(test_mode in evaluation_results.LPO_LCO_LDO.unique() for test_mode in args.test_mode)
     assert evaluation_results.CV_split.astype(int).max() == (args.n_cv_splits - 1)
     assert evaluation_results.Pearson.astype(float).max() > 0.5
+
+
+def test_single_drug_model_splits_in_parallel() -> None:
+    """Test that parallel jobs of a single drug model select their drug from the splits held by the workers."""
+    response_data = load_toy(path_data="../data")
+    drug_ids = np.unique(response_data.drug_ids)[:2]
+    response_data.reduce_to(drug_ids=drug_ids)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        drug_response_experiment(
+            models=[MODEL_FACTORY["SingleDrugRandomForest"]],
+            response_data=response_data,
+            run_id="parallel_run",
+            n_cv_splits=2,
+            path_out=temp_dir,
+            path_data="../data",
+            n_jobs=2,
+        )
+        predictions_path = os.path.join(temp_dir, "parallel_run", "LPO", "SingleDrugRandomForest", "predictions")
+        predictions = [
+            DrugResponseDataset.from_csv(os.path.join(predictions_path, f"predictions_split_{split_index}.csv"))
+            for split_index in range(2)
+        ]
+    # every split is predicted on its own test set, also when the drugs are run in separate jobs
+    for split, split_predictions in zip(response_data.cv_splits, predictions, strict=True):
+        assert sorted(zip(split_predictions.cell_line_ids, split_predictions.drug_ids)) == sorted(
+            zip(split["test"].cell_line_ids, split["test"].drug_ids)
+        )
+
+
+@pytest.mark.parametrize("multiprocessing", [False, True])
+def test_failing_experiment_cleans_up(monkeypatch: pytest.MonkeyPatch, multiprocessing: bool) -> None:
+    """
+    Test that a failing experiment stops tracing and ray and still saves the trace of the stages run so far.
+
+    :param monkeypatch: pytest fixture to let the experiment fail in the first cv split
+    :param multiprocessing: whether the experiment starts a ray session
+    """
+    import ray
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("cv split failed")
+
+    monkeypatch.setattr("drevalpy.experiment.run_cv_split", fail)
+    rng = np.random.default_rng(42)
+    cell_line_ids, drug_ids = np.meshgrid([f"CL{i}" for i in range(20)], [f"D{i}" for i in range(10)])
+    response_data = DrugResponseDataset(
+        response=rng.normal(size=cell_line_ids.size),
+        cell_line_ids=cell_line_ids.ravel(),
+        drug_ids=drug_ids.ravel(),
+        dataset_name="Failing",
+    )
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with pytest.raises(RuntimeError, match="cv split failed"):
+            drug_response_experiment(
+                models=[MODEL_FACTORY["NaivePredictor"]],
+                response_data=response_data,
+                run_id="failing_run",
+                n_cv_splits=2,
+                multiprocessing=multiprocessing,
+                path_out=temp_dir,
+            )
+        assert get_tracer() is None
+        assert not ray.is_initialized()
+        with open(os.path.join(temp_dir, "failing_run", "LPO", TRACE_FILE_NAME), encoding="utf-8") as f:
+            stages = {event["name"] for event in json.load(f)["traceEvents"]}
+        assert {"split creation", "fold"} <= stages
+
+
+def test_hpam_tune_successive_halving(capsys: pytest.CaptureFixture) -> None:
+    """
+    Tests the successive halving hyperparameter search against the grid search.
+
+    :param capsys: pytest fixture to capture the printed output
+    """
+    assert successive_halving_budgets(30) == [1 / 9, 1 / 3, 1.0]
+    assert successive_halving_budgets(2) == [1.0]
+    assert successive_halving_budgets(100, reduction_factor=2, min_budget=0.25) == [0.25, 0.5, 1.0]
+    with pytest.raises(ValueError):
+        successive_halving_budgets(10, reduction_factor=1)
+
+    response_data = load_toy("../data")
+    response_data.split_dataset(n_cv_splits=2, mode="LPO", split_validation=True, validation_ratio=0.1)
+    split = response_data.cv_splits[0]
+    # SVR has a hyperparameter path, which is only used by the grid search
+    model_class = MODEL_FACTORY["SVR"]
+    hpam_set = model_class.get_hyperparameter_set()[:9]
+    tuning_inputs = {
+        "model": model_class(),
+        "train_dataset": split["train"],
+        "validation_dataset": split["validation"],
+        "hpam_set": hpam_set,
+        "path_data": "../data",
+    }
+    best_hpams = hpam_tune(**tuning_inputs, search="successive_halving")
+    assert best_hpams in hpam_set
+    output = capsys.readouterr().out
+    # 9 configurations: 9 on 1/9, 3 on 1/3 and 1 on the full training set
+    assert output.count("Training model with hyperparameters") == 1
+    assert "compute saved" in output
+    assert "hyperparameter path" not in output
+    assert hpam_tune(**tuning_inputs, search="grid") in hpam_set
+    assert "Training model along the hyperparameter path of 9 configurations" in capsys.readouterr().out
+    with pytest.raises(ValueError):
+        hpam_tune(**tuning_inputs, search="random")
+
+
+def test_hpam_tune_raytune_shuts_down_its_ray_session() -> None:
+    """Test that hpam_tune_raytune shuts down the ray session it started and takes the GPUs per trial."""
+    import ray
+
+    if ray.is_initialized():
+        ray.shutdown()
+    response_data = load_toy("../data")
+    response_data.split_dataset(n_cv_splits=2, mode="LPO", split_validation=True, validation_ratio=0.1)
+    split = response_data.cv_splits[0]
+    hpam_set = [{"alpha": alpha, "l1_ratio": 0.5} for alpha in [0.1, 1.0]]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        best_hpams = hpam_tune_raytune(
+            model=MODEL_FACTORY["ElasticNet"](),
+            train_dataset=split["train"],
+            validation_dataset=split["validation"],
+            early_stopping_dataset=None,
+            hpam_set=hpam_set,
+            ray_path=os.path.abspath(temp_dir),
+            path_data=os.path.abspath("../data"),
+            gpus_per_trial=0,
+        )
+    assert best_hpams in hpam_set
+    assert not ray.is_initialized()
+
+
+@pytest.mark.parametrize("n_configs, reduction_factor", [(27, 3), (16, 2)])
+def test_raytune_successive_halving_stops_at_every_budget(n_configs: int, reduction_factor: int) -> None:
+    """
+    Test that ASHA stops trials at every intermediate training set fraction, not only at the first one.
+
+    The trials are mocked: they report their score after every fraction, as the successive halving trainable does. In
+    every round, the best 1/reduction_factor of the running trials report first, so the asynchronous ASHA keeps exactly
+    the trials the synchronous successive halving of hpam_tune keeps.
+
+    :param n_configs: number of hyperparameter configurations
+    :param reduction_factor: reduction factor of the successive halving
+    """
+    budgets = successive_halving_budgets(n_configs, reduction_factor=reduction_factor, min_budget=0.01)
+    assert len(budgets) >= 3
+    scheduler = _successive_halving_scheduler(budgets, reduction_factor=reduction_factor)
+    scheduler.set_search_properties(metric="RMSE", mode="min")
+    trials = [Namespace(trial_id=str(trial_index)) for trial_index in range(n_configs)]
+    for trial in trials:
+        scheduler.on_trial_add(None, trial)
+    scores = np.random.default_rng(0).permutation(n_configs).astype(float)
+
+    running = list(range(n_configs))
+    for budget_index, budget in enumerate(budgets):
+        by_score = sorted(running, key=lambda trial_index: scores[trial_index])
+        n_keep = math.ceil(len(running) / reduction_factor)
+        # the kept trials report from worst to best, then the others
+        report_order = by_score[:n_keep][::-1] + by_score[n_keep:]
+        stopped = []
+        for trial_index in report_order:
+            result = _successive_halving_result(
+                {"RMSE": scores[trial_index]},
+                budget=budget,
+                budgets=budgets,
+                budget_used=sum(budgets[: budget_index + 1]),
+            )
+            if scheduler.on_trial_result(None, trials[trial_index], result) == TrialScheduler.STOP:
+                stopped.append(trial_index)
+        running = [trial_index for trial_index in running if trial_index not in stopped]
+        if budget < 1:
+            assert sorted(running) == sorted(by_score[:n_keep])
+    # the full training set ends all remaining trials
+    assert not running
+
+
+def test_parse_results_evaluates_only_changed_files(capsys: pytest.CaptureFixture) -> None:
+    """
+    Test that parse_results reuses cached evaluations and evaluates only new or changed files, also in parallel.
+
+    :param capsys: pytest fixture to capture the output
+    """
+    temp_dir = tempfile.TemporaryDirectory()
+    prediction_dir = os.path.join(temp_dir.name, "LPO", "NaivePredictor", "predictions")
+    os.makedirs(prediction_dir)
+    rng = np.random.default_rng(0)
+
+    def write_predictions(split_index: int) -> None:
+        response = rng.normal(size=60)
+        DrugResponseDataset(
+            response=response,
+            cell_line_ids=np.repeat([f"CL-{i}" for i in range(10)], 6),
+            drug_ids=np.tile([f"Drug-{i}" for i in range(6)], 10),
+            predictions=response + rng.normal(size=60),
+        ).save(os.path.join(prediction_dir, f"predictions_split_{split_index}.csv"))
+
+    for split_index in range(3):
+        write_predictions(split_index)
+    evaluation_results = parse_results(temp_dir.name, n_jobs=2)[0]
+    assert "Evaluating 3 of 3 result files" in capsys.readouterr().out
+    assert len(evaluation_results) == 3
+
+    write_predictions(1)
+    evaluation_results_updated = parse_results(temp_dir.name)[0]
+    assert "Evaluating 1 of 3 result files" in capsys.readouterr().out
+    changed = "NaivePredictor_predictions_LPO_split_1"
+    pd.testing.assert_frame_equal(
+        evaluation_results.drop(index=changed), evaluation_results_updated.drop(index=changed)
+    )
+    assert not evaluation_results.loc[changed].equals(evaluation_results_updated.loc[changed])
+
+    parse_results(temp_dir.name, use_cache=False)
+    assert "Evaluating 3 of 3 result files" in capsys.readouterr().out
@@ -0,0 +1,72 @@
+"""Tests for the tracing of experiment stages."""
+
+import json
+import os
+import tempfile
+
+from drevalpy.tracing import (
+    SUMMARY_FILE_NAME,
+    TRACE_FILE_NAME,
+    Tracer,
+    get_tracer,
+    start_tracing,
+    stop_tracing,
+    trace_span,
+)
+
+
+def test_trace_span_without_tracer() -> None:
+    """Test that spans do nothing if tracing is not active."""
+    stop_tracing()
+    with trace_span("train", model="ElasticNet"):
+        pass
+    assert get_tracer() is None
+
+
+def test_tracer_spans_and_summary() -> None:
+    """Test that nested spans are recorded as Chrome trace events and summarized per stage."""
+    tracer = start_tracing()
+    try:
+        with trace_span("fold", "fold", model="ElasticNet", split=0, hpams={"alpha": 1.0}):
+            for _ in range(2):
+                with trace_span("train", "model"):
+                    sum(range(1000))
+    finally:
+        assert stop_tracing() is tracer
+
+    assert [event["name"] for event in tracer.events] == ["train", "train", "fold"]
+    fold = tracer.events[-1]
+    assert fold["ph"] == "X"
+    assert fold["args"]["model"] == "ElasticNet"
+    assert fold["args"]["hpams"] == "{'alpha': 1.0}"
+    assert all(fold["dur"] >= event["dur"] for event in tracer.events)
+
+    summary = tracer.summary()
+    assert list(summary["stage"]) == ["fold", "train"]
+    assert list(summary["calls"]) == [1, 2]
+    assert summary["share_of_wall_time"].iloc[0] <= 1.0
+
+    other = Tracer()
+    other.add_events(tracer.drain_events())
+    assert tracer.events == []
+    assert len(other.events) == 3
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        other.save(temp_dir)
+        with open(os.path.join(temp_dir, TRACE_FILE_NAME), encoding="utf-8") as f:
+            assert len(json.load(f)["traceEvents"]) == 3
+        assert os.path.isfile(os.path.join(temp_dir, SUMMARY_FILE_NAME))
+
+
+def test_summary_does_not_sum_nested_memory_increases() -> None:
+    """Test that the peak RSS increase of nested spans of the same stage is not counted twice."""
+    tracer = Tracer()
+    outer = {"name": "fold", "ph": "X", "ts": 0, "dur": 2e6, "args": {"peak_rss_mb": 300.0}}
+    inner = {"name": "fold", "ph": "X", "ts": 1, "dur": 1e6, "args": {"peak_rss_mb": 300.0}}
+    outer["args"]["peak_rss_increase_mb"] = 100.0
+    inner["args"]["peak_rss_increase_mb"] = 100.0
+    tracer.add_events([inner, outer])
+
+    summary = tracer.summary()
+    assert list(summary["calls"]) == [2]
+    assert summary["peak_rss_increase_mb"].iloc[0] == 100.0